@@ -4,6 +4,8 @@
  * 2) /api/youdao-tts 代理，有道 TTS → 解决浏览器端 CORS 下载问题
  * 3) 支持 _headers 文件配置（Cloudflare Pages 兼容）
  * 4) 文件缓存优化
+ * 5) 按 audio/index.json 提供音频：相同内容只存一份的别名（如 deer → dear）、基于 sha256 的 ETag
+ * 6) HTTP Range（单段 bytes=start-end），用于测试 audio/packs 词库音频包的按偏移读取
  *
  * 启动：
  *   node proj/dev-server.js
@@ -28,6 +30,10 @@ const CACHE_ENABLED = process.env.CACHE === '1';
 let headersConfig = null;
 let headersConfigMtime = 0;
 
+// 音频索引缓存（proj/audio/index.json，由 tools/audio_index.py 维护）
+let audioIndex = null;
+let audioIndexMtime = 0;
+
 const contentTypeByExt = (ext) => {
   switch (ext) {
     case '.html': return 'text/html; charset=utf-8';
@@ -108,6 +114,28 @@ async function loadHeadersConfig() {
   }
 }
 
+// 加载音频索引：文件名 -> { word, file, bytes, sha256, duration }
+async function loadAudioIndex() {
+  const indexPath = path.join(PROJ_ROOT, 'audio', 'index.json');
+  try {
+    const st = await stat(indexPath);
+    if (st.mtimeMs === audioIndexMtime && audioIndex) {
+      return audioIndex;
+    }
+    const data = JSON.parse(await readFile(indexPath, 'utf-8'));
+    audioIndex = data.files || {};
+    audioIndexMtime = st.mtimeMs;
+    console.log(`✓ Loaded audio index (${Object.keys(audioIndex).length} files)`);
+    return audioIndex;
+  } catch (e) {
+    if (e.code !== 'ENOENT') {
+      console.warn('Warning: Failed to load audio index:', e.message);
+    }
+    audioIndex = null;
+    return {};
+  }
+}
+
 // 匹配 URL 路径到 _headers 规则
 function matchHeadersForPath(pathname, config) {
   const headers = {};
@@ -164,6 +192,31 @@ function send(res, status, body, headers = {}) {
   }
 }
 
+// 解析单段 Range 头：返回 { start, end }；无效返回 null（416）；多段或缺省返回 undefined（整个文件）
+function parseRange(header, size) {
+  const match = /^bytes=(\d*)-(\d*)$/.exec((header || '').trim());
+  if (!match) {
+    return undefined;
+  }
+  let start;
+  let end;
+  if (match[1] === '') {
+    // 后缀范围：bytes=-500 表示最后 500 字节
+    if (match[2] === '') {
+      return null;
+    }
+    start = Math.max(0, size - Number(match[2]));
+    end = size - 1;
+  } else {
+    start = Number(match[1]);
+    end = match[2] === '' ? size - 1 : Math.min(Number(match[2]), size - 1);
+  }
+  if (start > end || start >= size) {
+    return null;
+  }
+  return { start, end };
+}
+
 function notFound(res, msg = 'Not Found') {
   send(res, 404, msg, { 'Content-Type': 'text/plain; charset=utf-8' });
 }
@@ -212,6 +265,25 @@ async function handleStatic(req, res, pathname) {
   let filePath = safePath;
   let actualPathname = pathname;
 
+  // 音频：按索引解析别名（内容相同的单词共用一个文件）
+  let audioEntry = null;
+  if (pathname.startsWith('/audio/') && pathname.endsWith('.mp3')) {
+    const index = await loadAudioIndex();
+    let name = pathname.slice('/audio/'.length);
+    try {
+      name = decodeURIComponent(name);
+    } catch {
+      // 保留原样
+    }
+    audioEntry = index[name] || null;
+    if (audioEntry && audioEntry.file !== name && path.basename(audioEntry.file) === audioEntry.file) {
+      filePath = path.join(PROJ_ROOT, 'audio', audioEntry.file);
+    }
+    if (audioEntry && req.headers['if-none-match'] === `"${audioEntry.sha256}"`) {
+      return send(res, 304, '', { ETag: `"${audioEntry.sha256}"` });
+    }
+  }
+
   try {
     const st = await stat(filePath);
     if (st.isDirectory()) {
@@ -239,7 +311,10 @@ async function handleStatic(req, res, pathname) {
 
   // 准备响应头
   const ext = path.extname(filePath).toLowerCase();
-  const responseHeaders = { 'Content-Type': contentTypeByExt(ext) };
+  const responseHeaders = { 'Content-Type': contentTypeByExt(ext), 'Accept-Ranges': 'bytes' };
+  if (audioEntry) {
+    responseHeaders.ETag = `"${audioEntry.sha256}"`;
+  }
 
   // 加载并应用 _headers 配置
   const config = await loadHeadersConfig();
@@ -255,6 +330,21 @@ async function handleStatic(req, res, pathname) {
     }
   }
 
+  // Range 请求：只返回请求的字节段
+  if (req.headers.range) {
+    const range = parseRange(req.headers.range, data.length);
+    if (range === null) {
+      return send(res, 416, '', { ...responseHeaders, 'Content-Range': `bytes */${data.length}` });
+    }
+    if (range) {
+      return send(res, 206, data.subarray(range.start, range.end + 1), {
+        ...responseHeaders,
+        'Content-Range': `bytes ${range.start}-${range.end}/${data.length}`,
+        'Content-Length': String(range.end - range.start + 1)
+      });
+    }
+  }
+
   send(res, 200, data, responseHeaders);
 }
 
@@ -271,8 +361,8 @@ const server = http.createServer(async (req, res) => {
   return handleStatic(req, res, pathname);
 });
 
-// 启动时加载 _headers 配置
-loadHeadersConfig().then(() => {
+// 启动时加载 _headers 配置和音频索引
+Promise.all([loadHeadersConfig(), loadAudioIndex()]).then(() => {
   // 只监听本地回环地址，防止外部直接访问
   server.listen(PORT, '127.0.0.1', () => {
     console.log('');
@@ -284,6 +374,7 @@ loadHeadersConfig().then(() => {
     console.log(`║  📁 根目录: ${PROJ_ROOT}`.padEnd(61) + '║');
     console.log(`║  ⚡ 文件缓存: ${CACHE_ENABLED ? '已启用 (CACHE=1)' : '已禁用 (设置 CACHE=1 启用)'}`.padEnd(61) + '║');
     console.log(`║  📋 _headers: ${headersConfig ? `已加载 (${headersConfig.length} 条规则)` : '未找到'}`.padEnd(61) + '║');
+    console.log(`║  🎵 音频索引: ${audioIndex ? `已加载 (${Object.keys(audioIndex).length} 个文件)` : '未找到'}`.padEnd(61) + '║');
     console.log('╠════════════════════════════════════════════════════════════╣');
     console.log('║  推荐访问:                                                  ║');
     console.log(`║  • http://localhost:${PORT}/`.padEnd(61) + '║');
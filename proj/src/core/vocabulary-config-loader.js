@@ -9,12 +9,27 @@ class VocabularyConfigLoader {
         this.config = null;
         this.loadError = null;
         this.manifest = null;
+        this.bundleIndex = null;
     }
     
     /**
      * 加载词库索引文件
+     * 优先使用 tools/build_word_bundles.py 生成的 bundles/index.json（含全部元数据），
+     * 其次使用 manifest.json（只有文件列表，元数据需逐个请求）
      */
     async loadManifest() {
+        try {
+            const response = await fetch('./words/bundles/index.json');
+            if (response.ok) {
+                this.bundleIndex = await response.json();
+                this.manifest = this.bundleIndex;
+                console.log('📋 元数据索引加载成功，版本:', this.bundleIndex.version);
+                return this.manifest;
+            }
+        } catch (error) {
+            console.warn('⚠️ 元数据索引不存在，回退到 manifest.json');
+        }
+        
         try {
             const response = await fetch('./words/manifest.json');
             if (response.ok) {
@@ -110,7 +125,12 @@ class VocabularyConfigLoader {
                     maxWords: 200,
                     difficultyRange: [1, 3],
                     categories: ["daily-phonics"]
-                }
+                },
+                // 分类合并包信息，供 VocabularyManagerV2 按分类一次性加载单词数据
+                bundles: this.bundleIndex ? {
+                    index: this.bundleIndex.bundles || {},
+                    entries: this.bundleIndex.entries || {}
+                } : null
             };
             
             const totalTime = performance.now() - totalStart;
@@ -527,17 +547,10 @@ class VocabularyConfigLoader {
         const filepath = `${directory}/${filename}.json`;
         
         try {
-            // 直接获取数据（不用 HEAD 预检）
-            const response = await fetch(filepath);
-            if (!response.ok) {
-                // 只对非 404 错误记录日志（404 是预期的，因为我们在探测文件）
-                if (response.status !== 404 && type === 'extracurricular') {
-                    console.warn(`⚠️ 加载文件失败 [${response.status}]: ${filepath}`);
-                }
+            const data = await this.fetchFileData(filepath, type);
+            if (!data) {
                 return null;
             }
-            
-            const data = await response.json();
             const metadata = data.metadata || {};
             
             // 根据类型构建结果
@@ -646,6 +659,31 @@ class VocabularyConfigLoader {
         }
     }
     
+    /**
+     * 获取单个文件的数据：有元数据索引时直接查表（不发请求，索引中没有即文件不存在），
+     * 否则直接请求文件（不用 HEAD 预检）
+     */
+    async fetchFileData(filepath, type) {
+        if (this.bundleIndex) {
+            const entry = this.bundleIndex.entries?.[filepath.replace('./words/', '')];
+            if (!entry) {
+                return null;
+            }
+            // 以构建时统计的单词数为准
+            return { metadata: { ...entry.metadata, wordCount: entry.wordCount } };
+        }
+        
+        const response = await fetch(filepath);
+        if (!response.ok) {
+            // 只对非 404 错误记录日志（404 是预期的，因为我们在探测文件）
+            if (response.status !== 404 && type === 'extracurricular') {
+                console.warn(`⚠️ 加载文件失败 [${response.status}]: ${filepath}`);
+            }
+            return null;
+        }
+        return response.json();
+    }
+    
     /**
      * 生成年级名称
      */
@@ -3,6 +3,7 @@ class VocabularyManagerV2 {
     constructor() {
         this.wordsConfig = null;
         this.loadedLibraries = new Map(); // 存储已加载的词库
+        this.bundlePromises = new Map(); // 分类合并包加载中的 Promise（同一分类只请求一次）
         this.allWords = [];
         this.currentVocabulary = [];
         this.missedWords = new Map(); // 存储错过的单词及其次数
@@ -253,31 +254,60 @@ class VocabularyManagerV2 {
         return null;
     }
 
-    // 加载单个词库（延迟加载优化：只加载元数据）
+    // 加载单个词库（延迟加载优化：只登记元数据）
+    // 元数据已由配置加载器提供，这里不再请求词库文件，单词数据在 loadLibraryWords 中按需加载
     async loadSingleLibrary(libraryInfo) {
-        try {
-            const response = await fetch(`./words/${libraryInfo.filename}`);
-            if (!response.ok) {
-                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-            }
-
-            const libraryData = await response.json();
+        this.loadedLibraries.set(libraryInfo.id, {
+            info: libraryInfo,
+            metadata: null,  // 单词数据加载后填充
+            filename: libraryInfo.filename,
+            wordsLoaded: false,  // 标记单词数据未加载
+            data: null  // 暂时不保存完整数据
+        });
 
-            // 延迟加载：只保存元数据和文件路径
-            this.loadedLibraries.set(libraryInfo.id, {
-                info: libraryInfo,
-                metadata: libraryData.metadata,
-                filename: libraryInfo.filename,
-                wordsLoaded: false,  // 标记单词数据未加载
-                data: null  // 暂时不保存完整数据
-            });
+        console.log(`📚 元数据加载: ${libraryInfo.name} (${libraryInfo.wordCount || 0}个单词)`);
+    }
 
-            console.log(`📚 元数据加载: ${libraryInfo.name} (${libraryInfo.wordCount || 0}个单词)`);
+    /**
+     * 获取词库文件的完整数据：优先从所属分类的合并包中取（同一分类只请求一次），
+     * 没有合并包或合并包加载失败时请求单个文件
+     */
+    async fetchLibraryData(filename) {
+        const bundles = this.wordsConfig?.bundles;
+        const bundleId = bundles?.entries?.[filename]?.bundle;
+        const bundleInfo = bundleId ? bundles.index[bundleId] : null;
+
+        if (bundleInfo) {
+            if (!this.bundlePromises.has(bundleId)) {
+                // sha1 作为版本参数，内容变化后自动绕过缓存
+                const url = `./words/${bundleInfo.file}?v=${bundleInfo.sha1.slice(0, 10)}`;
+                this.bundlePromises.set(bundleId, fetch(url)
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error(`HTTP ${response.status}`);
+                        }
+                        return response.json();
+                    })
+                    .then(bundle => {
+                        console.log(`  📦 合并包加载: ${bundleId} (${bundleInfo.fileCount}个文件)`);
+                        return bundle.files || {};
+                    })
+                    .catch(error => {
+                        console.warn(`⚠️ 合并包加载失败，改为逐个加载: ${bundleId}`, error);
+                        return {};
+                    }));
+            }
+            const files = await this.bundlePromises.get(bundleId);
+            if (files[filename]) {
+                return files[filename];
+            }
+        }
 
-        } catch (error) {
-            console.error(`❌ 词库加载失败: ${libraryInfo.name}`, error);
-            throw error;
+        const response = await fetch(`./words/${filename}`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
         }
+        return response.json();
     }
 
     /**
@@ -296,14 +326,10 @@ class VocabularyManagerV2 {
         }
 
         try {
-            const response = await fetch(`./words/${library.filename}`);
-            if (!response.ok) {
-                throw new Error(`HTTP ${response.status}`);
-            }
-
-            const libraryData = await response.json();
+            const libraryData = await this.fetchLibraryData(library.filename);
 
             library.data = libraryData;
+            library.metadata = libraryData.metadata || null;
             library.wordsLoaded = true;
 
             console.log(`  📖 单词数据加载: ${library.info.name}`);
@@ -311,6 +337,11 @@ class VocabularyManagerV2 {
             // 处理这个词库的单词数据
             this.processLibraryWords(libraryId, libraryData);
 
+            // 后台用音频包预热该词库的单词音频（一个请求代替逐词请求）
+            if (typeof AudioCacheManager !== 'undefined') {
+                AudioCacheManager.getInstance().warmLibrary(library.filename.replace(/\.json$/, ''));
+            }
+
         } catch (error) {
             console.error(`❌ 单词数据加载失败: ${library.info.name}`, error);
             throw error;
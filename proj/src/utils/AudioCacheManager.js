@@ -79,6 +79,10 @@ class AudioCacheManager {
         // Blob URL 缓存（用于内存管理）
         this.blobUrlCache = new Map(); // key: "word_provider", value: blobUrl
         
+        // 词库音频包（audio/packs，由 tools/audio_pack.py 生成）
+        this.packIndexPromise = null;
+        this.packPromises = new Map(); // key: 词库 ID，value: Promise<预热的单词数>
+        
         const envType = this.r2Config && this.r2Config.shouldUseR2() ? 'R2 CDN' : 
                        (this.isLocal ? '本地开发' : 'Vercel部署');
         audioCacheLog.info(`🗄️ AudioCacheManager: 检测到${envType}环境`);
@@ -260,6 +264,11 @@ class AudioCacheManager {
     async hasCache(word, provider) {
         const cacheKey = this._getCacheKey(word, provider);
         
+        // 0. 内存缓存（例如已由音频包预热）
+        if (this.blobUrlCache.has(cacheKey)) {
+            return true;
+        }
+        
         // 1. 优先检查 R2 CDN（如果配置了）
         if (this.r2Config && this.r2Config.shouldUseR2()) {
             // R2 CDN 模式：假设文件存在（由上传脚本保证）
@@ -570,6 +579,86 @@ class AudioCacheManager {
         }
     }
     
+    /**
+     * 音频包文件 URL（R2 CDN 或本地 /audio/packs/）
+     * @param {string} file - 相对 packs 目录的路径（如 'daily-phonics/day01.pack'）
+     */
+    getPackUrl(file) {
+        if (this.r2Config && this.r2Config.shouldUseR2()) {
+            const encodedPath = file.split('/').map(part => encodeURIComponent(part)).join('/');
+            return `${this.r2Config.R2_CDN_BASE_URL}/${this.r2Config.AUDIO_PATH}/packs/${encodedPath}`;
+        }
+        return `${this.localAudioPath}packs/${file}`;
+    }
+    
+    /**
+     * 加载音频包索引（只请求一次；没有索引时返回 null）
+     */
+    loadPackIndex() {
+        if (!this.packIndexPromise) {
+            this.packIndexPromise = fetch(this.getPackUrl('index.json'), { cache: 'no-cache' })
+                .then(response => (response.ok ? response.json() : null))
+                .catch(() => null);
+        }
+        return this.packIndexPromise;
+    }
+    
+    /**
+     * 用词库音频包预热内存缓存：一个请求取回整个词库的音频，
+     * 之后 hasCache/getCache 直接命中 Blob URL，不再逐个请求
+     * 每段音频按它实际来自的提供商（clips 中的第三项）写入缓存
+     * @param {string} libraryId - 词库 ID（词库文件路径去掉 .json，如 'daily-phonics/day01'）
+     * @returns {Promise<number>} 预热的单词数（没有音频包或失败时为 0）
+     */
+    warmLibrary(libraryId) {
+        if (!this.packPromises.has(libraryId)) {
+            this.packPromises.set(libraryId, this._warmFromPack(libraryId));
+        }
+        return this.packPromises.get(libraryId);
+    }
+    
+    async _warmFromPack(libraryId) {
+        try {
+            const index = await this.loadPackIndex();
+            // 只认识第 2 版索引（clips 为 [offset, length, provider]）
+            const pack = index && index.version === 2 ? index.packs[libraryId] : null;
+            if (!pack) {
+                return 0;
+            }
+            
+            // sha256 作为版本参数，内容变化后自动绕过缓存
+            const response = await fetch(`${this.getPackUrl(pack.file)}?v=${pack.sha256.slice(0, 10)}`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const buffer = await response.arrayBuffer();
+            
+            // 同一段数据（别名单词）只创建一个 Blob URL
+            const urlsByOffset = new Map();
+            let warmed = 0;
+            for (const [word, [offset, length, provider]] of Object.entries(pack.clips)) {
+                const cacheKey = this._getCacheKey(word, provider);
+                if (this.blobUrlCache.has(cacheKey)) {
+                    continue;
+                }
+                if (!urlsByOffset.has(offset)) {
+                    const blob = new Blob([buffer.slice(offset, offset + length)], { type: 'audio/mpeg' });
+                    urlsByOffset.set(offset, URL.createObjectURL(blob));
+                }
+                this.blobUrlCache.set(cacheKey, urlsByOffset.get(offset));
+                warmed++;
+            }
+            
+            audioCacheLog.success(`📦 AudioCacheManager: 音频包预热 ${libraryId}: ${warmed} 个单词 (${(pack.bytes / 1024).toFixed(1)} KB)`);
+            return warmed;
+            
+        } catch (error) {
+            audioCacheLog.warning(`⚠️ AudioCacheManager: 音频包加载失败 ${libraryId}: ${error.message || error}`);
+            this.packPromises.delete(libraryId);
+            return 0;
+        }
+    }
+    
     /**
      * 清理 Blob URL 缓存（释放内存）
      */
@@ -581,6 +670,7 @@ class AudioCacheManager {
         });
         
         this.blobUrlCache.clear();
+        this.packPromises.clear();
     }
     
     /**
@@ -2,65 +2,335 @@
 # -*- coding: utf-8 -*-
 """
 分析文档中的英语单词数量（去重）
+
+用法:
+  python analyze_words.py <文件路径>
+  python analyze_words.py <文件路径> --stream      # 强制流式分析（内存映射分块读取）
+  python analyze_words.py <文件路径> --no-stream   # 强制整体读入
+
+  # 多文档模式：目录和通配符，多进程并行分析，并与 proj/words 词库对比
+  python analyze_words.py ../../study ../../phonics_methods
+  python analyze_words.py "../words/extracurricular-books/**/*.json" --top 50 -j 4
+  python analyze_words.py ../../study --json study-report.json
+
+大于 8 MB 的文件默认使用流式模式：通过 mmap 分块解码，跨块边界的单词会被
+正确拼接，唯一单词和词频增量更新，内存占用与文件大小无关。
+
+多文档模式把文档分批交给进程池，每个进程把一批文档的词频合并成一个
+Counter 返回，主进程再汇总为全局词频，并输出每个文档的唯一单词数、
+高频单词和与现有词库的重合情况。JSON 文档只统计字符串值（不含键名）。
 """
 
+import argparse
+import codecs
+import glob
+import heapq
+import json
+import mmap
+import os
 import re
+import string
 import sys
+from collections import Counter
 from pathlib import Path
 
+from word_corpus import get_corpus, map_in_pool, resolve_jobs
+
+# 单词正则：字母，可带一个连字符或撇号连接的后缀（如 don't、well-known）
+WORD_RE = re.compile(r"[a-zA-Z]+(?:[-'][a-zA-Z]+)?")
+# 可能出现在单词内部的字符，流式模式据此判断块尾是否截断了单词
+WORD_CHARS = frozenset(string.ascii_letters + "-'")
+
+# 达到该大小的文件默认走流式模式
+STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+# 流式模式每次从内存映射中解码的字节数
+STREAM_CHUNK_BYTES = 1024 * 1024
+# 多文档模式默认分析的文件类型
+DEFAULT_EXTENSIONS = ".md,.txt,.html,.htm,.json"
+
 def extract_words(text):
     """提取文本中的所有英语单词"""
     # 使用正则表达式提取单词（只包含字母，包括连字符）
     # 匹配：字母、连字符、撇号（用于缩写如 don't）
-    words = re.findall(r"[a-zA-Z]+(?:[-'][a-zA-Z]+)?", text)
+    words = WORD_RE.findall(text)
     return words
 
-def analyze_document(file_path):
-    """分析文档中的单词"""
+def iter_word_batches_streaming(file_path, chunk_bytes=STREAM_CHUNK_BYTES):
+    """通过内存映射分块读取文件，每块产出一批英语单词（保持原始大小写）
+
+    每块末尾连续的字母/连字符/撇号可能是被截断的单词（如 "hel|lo"、
+    "don'|t"、"well-|known"），这段文本会留到下一块开头再匹配；正则匹配
+    不会跨越其它字符，因此结果与整体 findall 完全一致。
+    UTF-8 多字节字符被切开时由增量解码器负责拼接。
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            carry = ''
+            for start in range(0, size, chunk_bytes):
+                final = start + chunk_bytes >= size
+                text = carry + decoder.decode(mm[start:start + chunk_bytes], final)
+                cut = len(text)
+                if not final:
+                    while cut > 0 and text[cut - 1] in WORD_CHARS:
+                        cut -= 1
+                yield WORD_RE.findall(text, 0, cut)
+                carry = text[cut:]
+
+def analyze_document_streaming(file_path, chunk_bytes=STREAM_CHUNK_BYTES):
+    """流式分析：逐块增量统计词频，不保留全文和完整单词列表"""
+    counts = Counter()
+    total_words = 0
+    for words in iter_word_batches_streaming(file_path, chunk_bytes):
+        counts.update(map(str.lower, words))
+        total_words += len(words)
+    return counts, total_words
+
+def analyze_document(file_path, stream=None):
+    """分析文档中的单词
+
+    stream=None 时按文件大小自动选择：大文件流式分析，小文件整体读入。
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if stream is None:
+            stream = Path(file_path).stat().st_size >= STREAM_THRESHOLD_BYTES
+        if stream:
+            counts, total_words = analyze_document_streaming(file_path)
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            # 提取所有单词并转换为小写计数
+            all_words = extract_words(content)
+            counts = Counter(word.lower() for word in all_words)
+            total_words = len(all_words)
     except Exception as e:
         print(f"读取文件错误: {e}")
         return None
-    
-    # 提取所有单词
-    all_words = extract_words(content)
-    
-    # 转换为小写并去重
-    unique_words = set(word.lower() for word in all_words)
-    
+
     # 统计信息
-    total_words = len(all_words)
-    unique_count = len(unique_words)
-    
+    unique_count = len(counts)
+
     return {
         'total_words': total_words,
         'unique_words': unique_count,
-        'unique_word_list': sorted(unique_words)
+        'unique_word_list': sorted(counts),
+        'word_counts': counts
+    }
+
+def iter_json_strings(data):
+    """迭代 JSON 文档中的所有字符串值（不含键名）"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            yield node
+        elif isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+def analyze_document_counts(file_path):
+    """统计单个文档的词频，返回 (Counter, 总单词数)；JSON 文档只看字符串值
+
+    文件无法读取（例如列出后被删除）时返回 None，调用方按跳过处理。
+    """
+    path = Path(file_path)
+    if path.suffix.lower() == '.json':
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except ValueError:
+            data = None
+        except OSError as e:
+            print(f"读取文件错误: {e}")
+            return None
+        if data is not None:
+            counts = Counter()
+            total_words = 0
+            for value in iter_json_strings(data):
+                words = extract_words(value)
+                counts.update(map(str.lower, words))
+                total_words += len(words)
+            return counts, total_words
+    result = analyze_document(file_path)
+    if result is None:
+        return None
+    return result['word_counts'], result['total_words']
+
+def analyze_batch(paths):
+    """进程池任务：分析一批文档，返回合并后的词频、每个文档的 (路径, 总数, 唯一数) 和无法读取的文档"""
+    merged = Counter()
+    per_document = []
+    skipped = []
+    for path in paths:
+        result = analyze_document_counts(path)
+        if result is None:
+            skipped.append(path)
+            continue
+        counts, total_words = result
+        merged.update(counts)
+        per_document.append((path, total_words, len(counts)))
+    return merged, per_document, skipped
+
+def expand_inputs(inputs, extensions):
+    """把文件、目录和通配符展开成去重、排序后的文档列表"""
+    found = set()
+    for item in inputs:
+        if any(ch in item for ch in '*?['):
+            candidates = [Path(p) for p in glob.glob(item, recursive=True)]
+        else:
+            candidates = [Path(item)]
+        for candidate in candidates:
+            if candidate.is_dir():
+                found.update(p for p in candidate.rglob('*') if p.is_file() and p.suffix.lower() in extensions)
+            elif candidate.is_file():
+                found.add(candidate)
+    return sorted(found)
+
+def file_size(path):
+    """文件大小；文件已不存在时为 0（读取时再按跳过处理）"""
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+def make_batches(paths, jobs):
+    """按文件大小把文档均匀分到若干批（每个进程约 4 批，兼顾负载均衡和通信开销）"""
+    n_batches = max(1, min(len(paths), resolve_jobs(jobs) * 4))
+    sizes = {path: file_size(path) for path in paths}
+    sized = sorted(paths, key=lambda p: sizes[p], reverse=True)
+    batches = [[] for _ in range(n_batches)]
+    loads = [0] * n_batches
+    for path in sized:
+        target = loads.index(min(loads))
+        batches[target].append(str(path))
+        loads[target] += sizes[path]
+    return [b for b in batches if b]
+
+def most_common(counts, n):
+    """按次数降序、同次数按字母排序取前 n 个（与进程数和合并顺序无关）"""
+    return heapq.nsmallest(n, counts.items(), key=lambda item: (-item[1], item[0]))
+
+def analyze_corpus(paths, jobs=0, words_dir=None, top=20):
+    """并行分析多个文档，汇总全局词频，并与 proj/words 词库对比"""
+    counts = Counter()
+    documents = []
+    skipped = []
+    for batch_counts, per_document, batch_skipped in map_in_pool(analyze_batch, make_batches(paths, jobs), jobs):
+        counts.update(batch_counts)
+        documents.extend(per_document)
+        skipped.extend(batch_skipped)
+    documents.sort()
+
+    # 词库规则不收录单个字母，对比时同样忽略
+    vocabulary = {w for w in counts if len(w) >= 2}
+    report = {
+        'documents': [{'path': p, 'total_words': t, 'unique_words': u} for p, t, u in documents],
+        'skipped': sorted(skipped),
+        'total_words': sum(counts.values()),
+        'unique_words': len(counts),
+        'top_words': most_common(counts, top),
     }
+    if words_dir is not None:
+        known = get_corpus(words_dir).all_words()
+        in_library = vocabulary & known
+        missing = Counter({w: counts[w] for w in vocabulary - known})
+        covered_tokens = sum(counts[w] for w in in_library)
+        vocabulary_tokens = sum(counts[w] for w in vocabulary)
+        report['overlap'] = {
+            'library_words': len(known),
+            'in_library': len(in_library),
+            'not_in_library': len(missing),
+            'vocabulary_coverage': len(in_library) / len(vocabulary) if vocabulary else 0.0,
+            'token_coverage': covered_tokens / vocabulary_tokens if vocabulary_tokens else 0.0,
+            'library_words_used': len(in_library) / len(known) if known else 0.0,
+            'top_missing': most_common(missing, top),
+        }
+    return report
+
+def print_corpus_report(report):
+    print("\n多文档分析结果:")
+    print("=" * 60)
+    print(f"文档数: {len(report['documents'])}")
+    if report['skipped']:
+        print(f"无法读取、已跳过: {len(report['skipped'])} 个（{', '.join(report['skipped'])}）")
+    print(f"总单词数（含重复）: {report['total_words']}")
+    print(f"唯一单词数（去重）: {report['unique_words']}")
+
+    print("\n每个文档的单词数:")
+    print("-" * 60)
+    for doc in report['documents']:
+        print(f"{doc['unique_words']:8d} 唯一 / {doc['total_words']:8d} 总计  {doc['path']}")
+
+    print(f"\n高频单词 Top {len(report['top_words'])}:")
+    print("-" * 60)
+    for word, count in report['top_words']:
+        print(f"{word:20} {count}")
+
+    overlap = report.get('overlap')
+    if overlap:
+        print(f"\n与词库 (proj/words, {overlap['library_words']} 个单词) 的重合:")
+        print("-" * 60)
+        print(f"已在词库中: {overlap['in_library']} 个（占文档词汇 {overlap['vocabulary_coverage']:.1%}）")
+        print(f"不在词库中: {overlap['not_in_library']} 个")
+        print(f"按出现次数计的覆盖率: {overlap['token_coverage']:.1%}")
+        print(f"词库单词在文档中出现的比例: {overlap['library_words_used']:.1%}")
+        print(f"\n不在词库中的高频单词 Top {len(overlap['top_missing'])}:")
+        for word, count in overlap['top_missing']:
+            print(f"{word:20} {count}")
+    print("\n" + "=" * 60)
+
+def print_document_report(result):
+    print(f"\n文档分析结果:")
+    print(f"=" * 50)
+    print(f"总单词数（含重复）: {result['total_words']}")
+    print(f"唯一单词数（去重）: {result['unique_words']}")
+    print(f"\n唯一单词列表（按字母顺序）:")
+    print(f"-" * 50)
+
+    # 每行显示10个单词
+    words = result['unique_word_list']
+    for i in range(0, len(words), 10):
+        line_words = words[i:i+10]
+        print(' '.join(f"{w:15}" for w in line_words))
+
+    print(f"\n" + "=" * 50)
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("用法: python analyze_words.py <文件路径>")
+    default_words_dir = (Path(__file__).resolve().parent.parent / "words").resolve()
+
+    parser = argparse.ArgumentParser(description="分析文档中的英语单词数量（去重）")
+    parser.add_argument("paths", nargs="+", help="要分析的文档、目录或通配符（如 'docs/**/*.md'）")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--stream", dest="stream", action="store_true", default=None, help="强制使用流式模式（mmap 分块读取）")
+    mode.add_argument("--no-stream", dest="stream", action="store_false", help="强制整体读入文件")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="多文档模式的进程数（默认 0 = 所有 CPU）")
+    parser.add_argument("--top", type=int, default=20, help="多文档模式显示的高频单词数（默认 20）")
+    parser.add_argument("--ext", type=str, default=DEFAULT_EXTENSIONS, help=f"目录中要分析的文件类型（默认 {DEFAULT_EXTENSIONS}）")
+    parser.add_argument("--words-dir", type=Path, default=default_words_dir, help="用于对比的词库目录（默认 proj/words）")
+    parser.add_argument("--no-compare", action="store_true", help="不与词库对比")
+    parser.add_argument("--json", type=Path, default=None, help="把多文档分析结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    single = len(args.paths) == 1 and Path(args.paths[0]).is_file() and args.json is None
+    if single:
+        result = analyze_document(args.paths[0], stream=args.stream)
+        if not result:
+            sys.exit(1)
+        print_document_report(result)
+        sys.exit(0)
+
+    extensions = {e.strip().lower() if e.strip().startswith('.') else '.' + e.strip().lower()
+                  for e in args.ext.split(',') if e.strip()}
+    paths = expand_inputs(args.paths, extensions)
+    if not paths:
+        print("没有找到要分析的文档")
         sys.exit(1)
-    
-    file_path = sys.argv[1]
-    result = analyze_document(file_path)
-    
-    if result:
-        print(f"\n文档分析结果:")
-        print(f"=" * 50)
-        print(f"总单词数（含重复）: {result['total_words']}")
-        print(f"唯一单词数（去重）: {result['unique_words']}")
-        print(f"\n唯一单词列表（按字母顺序）:")
-        print(f"-" * 50)
-        
-        # 每行显示10个单词
-        words = result['unique_word_list']
-        for i in range(0, len(words), 10):
-            line_words = words[i:i+10]
-            print(' '.join(f"{w:15}" for w in line_words))
-        
-        print(f"\n" + "=" * 50)
 
+    report = analyze_corpus(paths, jobs=args.jobs, words_dir=None if args.no_compare else args.words_dir, top=args.top)
+    print_corpus_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"结果已写入: {args.json}")
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Maintained index of the proj/audio assets.
+
+proj/audio/index.json maps every audio file name the browser may ask for
+("hello_youdao.mp3") to the file that actually holds the bytes, plus its
+size, sha256, duration and integrity check result (see check_mp3):
+
+    {
+      "version": 1,
+      "files": {
+        "dear_youdao.mp3": {"word": "dear", "file": "dear_youdao.mp3", "bytes": 9422, "sha256": "...", "duration": 0.81, "check": "ok"},
+        "deer_youdao.mp3": {"word": "deer", "file": "dear_youdao.mp3", "bytes": 9422, "sha256": "...", "duration": 0.81, "check": "ok"}
+      }
+    }
+
+Identical audio (homophones such as dear/deer) is indexed once: the second
+name becomes an alias whose "file" points at the first. Every name keeps its
+own file on disk, since static hosts (Vercel serves proj/ as is) only see the
+directory. The downloader, upload-to-r2.js and dev-server.js read this file
+instead of globbing the directory; upload-to-r2.js uploads stored files only
+and creates alias keys with a server-side copy.
+
+Writes happen under a file lock (index.json.lock, see file_lock.py). Several
+downloader processes sharing the directory save with merge=True: index.json
+is re-read under the lock and only the entries each process changed since
+load() are applied, so no process drops what the others added. Content that
+two processes downloaded at the same time may then be stored twice instead
+of aliased; --dedupe records such copies as aliases.
+
+The hash is sha256 so that Git LFS pointer files (what a checkout without
+`git lfs pull` contains) can be indexed from their "oid"/"size" lines; the
+duration and check are only known once the real audio is present (use
+--verify, or validate_audio.py).
+
+Usage:
+  python3 audio_index.py                 # refresh index.json from proj/audio
+  python3 audio_index.py --verify        # re-hash every file and fill in durations
+  python3 audio_index.py --dedupe        # record duplicate files as aliases
+  python3 audio_index.py --check         # exit 1 if index.json is stale
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from file_lock import file_lock
+from word_corpus import map_in_pool
+
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+AUDIO_SUFFIX = ".mp3"
+LFS_POINTER_PREFIX = b"version https://git-lfs.github.com/spec/v1"
+
+
+# ---- MP3 frame parsing ----------------------------------------------------------
+
+# kbps by (is_mpeg1, layer); index 0 is "free", index 15 is invalid
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Hz by version bits (0 = MPEG 2.5, 2 = MPEG 2, 3 = MPEG 1)
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+@dataclass
+class Mp3Frame:
+    offset: int
+    length: int
+    samples: int
+    sample_rate: int
+    bitrate: int
+
+
+def parse_frame_header(data: bytes, pos: int) -> Optional[Mp3Frame]:
+    """Decode the 4-byte MPEG audio frame header at pos, or None if there is none."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x03
+    layer = 4 - ((data[pos + 1] >> 1) & 0x03)
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 0x03
+    padding = (data[pos + 2] >> 1) & 0x01
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    is_mpeg1 = version == 3
+    bitrate = _BITRATES[(is_mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        return Mp3Frame(pos, (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate, bitrate)
+    samples = 576 if layer == 3 and not is_mpeg1 else 1152
+    return Mp3Frame(pos, samples // 8 * bitrate // sample_rate + padding, samples, sample_rate, bitrate)
+
+
+def id3v2_size(data: bytes) -> int:
+    """Bytes taken by a leading ID3v2 tag (0 if there is none)."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for b in data[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def audio_end(data: bytes) -> int:
+    """Offset where frame data ends (before a trailing ID3v1 tag)."""
+    return len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+
+
+def iter_mp3_frames(data: bytes) -> Iterator[Mp3Frame]:
+    """Yield consecutive MPEG audio frames, skipping tags and resyncing on junk."""
+    pos = id3v2_size(data)
+    end = audio_end(data)
+    while pos + 4 <= end:
+        frame = parse_frame_header(data, pos)
+        if frame is None or frame.length <= 4:
+            pos = data.find(b"\xff", pos + 1, end)
+            if pos < 0:
+                return
+            continue
+        if frame.offset + frame.length > end:
+            return
+        yield frame
+        pos += frame.length
+
+
+# check_mp3 statuses; anything but CHECK_OK means the file should not be served
+CHECK_OK = "ok"
+CHECK_NOT_MP3 = "not-mp3"            # no frame sync at all (HTML/JSON error page, empty body)
+CHECK_TRUNCATED = "truncated"        # the last frame is cut off
+CHECK_CORRUPT = "corrupt"            # large runs of bytes between frames
+CHECK_INCONSISTENT = "inconsistent"  # sample rate changes between frames
+CHECK_TOO_SHORT = "too-short"
+CHECK_SILENT = "silent"              # frame payloads are (almost) all zero bytes
+
+MIN_DURATION = 0.2        # seconds; the shortest real word clips are ~0.3 s
+MIN_FRAME_COVERAGE = 0.9  # share of the audio bytes that must be inside frames
+SILENT_ZERO_RATIO = 0.95  # share of zero bytes in frame payloads that means silence
+
+
+@dataclass
+class Mp3Check:
+    status: str
+    duration: Optional[float] = None
+    frames: int = 0
+    bitrate: Optional[int] = None  # average kbps
+
+
+def check_mp3(data: bytes) -> Mp3Check:
+    """Integrity check from the frame headers alone (nothing is decoded).
+
+    Verifies frame sync, a consistent sample rate, that frames cover the
+    file and the last one is complete, and computes duration and average
+    bitrate. Silence is detected heuristically: an encoder fills silent
+    frames with zero bytes.
+    """
+    frames = list(iter_mp3_frames(data))
+    if not frames:
+        return Mp3Check(CHECK_NOT_MP3)
+    duration = round(sum(f.samples / f.sample_rate for f in frames), 3)
+    covered = sum(f.length for f in frames)
+    bitrate = round(sum(f.bitrate for f in frames) / len(frames) / 1000)
+    result = Mp3Check(CHECK_OK, duration, len(frames), bitrate)
+
+    last = frames[-1]
+    if parse_frame_header(data, last.offset + last.length) is not None:
+        # A header follows the last complete frame, but its frame runs past the end
+        result.status = CHECK_TRUNCATED
+    elif len({f.sample_rate for f in frames}) > 1:
+        result.status = CHECK_INCONSISTENT
+    elif covered < MIN_FRAME_COVERAGE * (audio_end(data) - id3v2_size(data)):
+        result.status = CHECK_CORRUPT
+    elif duration < MIN_DURATION:
+        result.status = CHECK_TOO_SHORT
+    else:
+        # The first frame is often a Xing/Info header without audio
+        body = frames[1:] or frames
+        payload = sum(f.length - 4 for f in body)
+        zeros = sum(data.count(0, f.offset + 4, f.offset + f.length) for f in body)
+        if payload and zeros / payload >= SILENT_ZERO_RATIO:
+            result.status = CHECK_SILENT
+    return result
+
+
+# ---- index ----------------------------------------------------------------------
+
+def parse_lfs_pointer(data: bytes) -> Optional[Tuple[str, int]]:
+    """(sha256, size) of the real content if data is a Git LFS pointer file."""
+    if not data.startswith(LFS_POINTER_PREFIX) or len(data) > 1024:
+        return None
+    oid = size = None
+    for line in data.decode("utf-8", "replace").splitlines():
+        if line.startswith("oid sha256:"):
+            oid = line.split(":", 1)[1].strip()
+        elif line.startswith("size "):
+            try:
+                size = int(line.split(" ", 1)[1])
+            except ValueError:
+                return None
+    if oid is None or size is None:
+        return None
+    return oid, size
+
+
+def describe_audio(data: bytes) -> Tuple[int, str, Optional[float], Optional[str]]:
+    """(bytes, sha256, duration, check status) of an audio file's content.
+
+    LFS pointers resolve to the real size and hash; duration and check are
+    then unknown (None).
+    """
+    pointer = parse_lfs_pointer(data)
+    if pointer is not None:
+        return pointer[1], pointer[0], None, None
+    check = check_mp3(data)
+    return len(data), hashlib.sha256(data).hexdigest(), check.duration, check.status
+
+
+def describe_file(path: Path) -> Tuple[int, str, Optional[float], Optional[str]]:
+    """describe_audio for a file; module level so it can run in worker processes."""
+    return describe_audio(path.read_bytes())
+
+
+def word_of(name: str) -> str:
+    """Word of an audio file name: "ice cream_youdao.mp3" -> "ice cream"."""
+    stem = name[: -len(AUDIO_SUFFIX)] if name.endswith(AUDIO_SUFFIX) else name
+    return stem.rsplit("_", 1)[0] if "_" in stem else stem
+
+
+def provider_of(name: str) -> Optional[str]:
+    """TTS provider tag of an audio file name: "ice cream_youdao.mp3" -> "youdao"."""
+    stem = name[: -len(AUDIO_SUFFIX)] if name.endswith(AUDIO_SUFFIX) else name
+    return stem.rsplit("_", 1)[1] if "_" in stem else None
+
+
+@dataclass
+class AudioEntry:
+    word: str
+    file: str
+    bytes: int
+    sha256: str
+    duration: Optional[float] = None
+    # check_mp3 status; None until the real audio has been checked
+    check: Optional[str] = None
+
+    def to_json(self) -> dict:
+        return {
+            "word": self.word,
+            "file": self.file,
+            "bytes": self.bytes,
+            "sha256": self.sha256,
+            "duration": self.duration,
+            "check": self.check,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> Optional["AudioEntry"]:
+        try:
+            duration = data.get("duration")
+            return cls(
+                word=str(data["word"]),
+                file=str(data["file"]),
+                bytes=int(data["bytes"]),
+                sha256=str(data["sha256"]),
+                duration=float(duration) if duration is not None else None,
+                check=data.get("check"),
+            )
+        except Exception:
+            return None
+
+
+class AudioIndex:
+    """In-memory view of proj/audio/index.json; not thread-safe (callers lock)."""
+
+    def __init__(self, audio_dir: Path):
+        self.audio_dir = audio_dir
+        self.entries: Dict[str, AudioEntry] = {}
+        # Entries as last loaded or saved, to tell this process's changes apart
+        self._saved: Dict[str, AudioEntry] = {}
+
+    @property
+    def path(self) -> Path:
+        return self.audio_dir / INDEX_NAME
+
+    def load(self) -> "AudioIndex":
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        files = data.get("files") if isinstance(data, dict) and data.get("version") == INDEX_VERSION else None
+        self.entries = {}
+        for name, value in (files or {}).items():
+            entry = AudioEntry.from_json(value) if isinstance(value, dict) else None
+            if entry is not None:
+                self.entries[name] = entry
+        self._snapshot()
+        return self
+
+    def _snapshot(self) -> None:
+        # Entries are mutated in place (refresh, dedupe), so keep copies
+        self._saved = {name: replace(entry) for name, entry in self.entries.items()}
+
+    def changes(self) -> Tuple[Dict[str, AudioEntry], List[str]]:
+        """(entries set, names removed) since the last load() or save()."""
+        changed = {name: entry for name, entry in self.entries.items() if self._saved.get(name) != entry}
+        removed = sorted(name for name in self._saved if name not in self.entries)
+        return changed, removed
+
+    def dumps(self) -> bytes:
+        """Serialized index, one entry per line (small, and diffs stay readable)."""
+        lines = [
+            f"  {json.dumps(name, ensure_ascii=False)}: "
+            f"{json.dumps(self.entries[name].to_json(), ensure_ascii=False, separators=(',', ':'))}"
+            for name in sorted(self.entries)
+        ]
+        body = ",\n".join(lines)
+        return f'{{"version": {INDEX_VERSION}, "files": {{\n{body}\n}}}}\n'.encode("utf-8")
+
+    def save(self, merge: bool = False) -> bool:
+        """Atomically rewrite index.json if its content changed; returns True if written.
+
+        With merge=True the file is re-read under the lock and only this
+        object's changes since load() are applied on top of it; afterwards
+        `entries` holds the merged index.
+        """
+        self.audio_dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path):
+            if merge:
+                changed, removed = self.changes()
+                self.load()
+                for name in removed:
+                    self.entries.pop(name, None)
+                self.entries.update(changed)
+            self._snapshot()
+            payload = self.dumps()
+            try:
+                if self.path.read_bytes() == payload:
+                    return False
+            except OSError:
+                pass
+            tmp_path = self.path.with_name(INDEX_NAME + ".part")
+            tmp_path.write_bytes(payload)
+            os.replace(tmp_path, self.path)
+            return True
+
+    # ---- queries ------------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[AudioEntry]:
+        return self.entries.get(name)
+
+    def stored_path(self, name: str) -> Optional[Path]:
+        """Path of the file that holds the audio for name, if indexed."""
+        entry = self.entries.get(name)
+        return self.audio_dir / entry.file if entry is not None else None
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        """sha256 -> stored file names, for content stored in more than one file."""
+        by_hash: Dict[str, List[str]] = {}
+        for name, entry in self.entries.items():
+            if entry.file == name:
+                by_hash.setdefault(entry.sha256, []).append(name)
+        return {h: sorted(names) for h, names in by_hash.items() if len(names) > 1}
+
+    # ---- updates ------------------------------------------------------------------
+
+    def _canonical_for(self, sha256: str, exclude: str) -> Optional[str]:
+        for name in sorted(self.entries):
+            entry = self.entries[name]
+            if name != exclude and entry.file == name and entry.sha256 == sha256:
+                return name
+        return None
+
+    def put(self, name: str, data: bytes) -> AudioEntry:
+        """Index new content for name.
+
+        If the same content is already stored under another name, the entry
+        becomes an alias of it. The caller still writes data to name: alias
+        copies are what static hosts serve.
+
+        Aliases of name keep their own audio: they are pointed at the file
+        that now holds it, or their own copy becomes a stored file.
+        """
+        size, sha256, duration, check = describe_audio(data)
+        canonical = self._canonical_for(sha256, exclude=name)
+        self._rehome_aliases(name, sha256, canonical or name)
+        entry = AudioEntry(word_of(name), canonical or name, size, sha256, duration, check)
+        self.entries[name] = entry
+        return entry
+
+    def _rehome_aliases(self, name: str, sha256: str, new_file: str) -> None:
+        """Repoint the aliases of name before its content changes to sha256 (stored in new_file)."""
+        aliases = sorted(other for other, entry in self.entries.items() if other != name and entry.file == name)
+        for other in aliases:
+            alias = self.entries[other]
+            if alias.sha256 == sha256:
+                target = new_file
+            else:
+                target = self._canonical_for(alias.sha256, exclude=name)
+            if target is None and (self.audio_dir / other).exists():
+                # Its own copy becomes the stored file
+                target = other
+            if target is None:
+                # Its audio is nowhere on disk any more
+                del self.entries[other]
+            else:
+                self.entries[other] = replace(alias, file=target)
+
+    def set_description(self, name: str, described: Tuple[int, str, Optional[float], Optional[str]]) -> None:
+        """Record describe_audio() output for the stored file name and its aliases."""
+        size, sha256, duration, check = described
+        for other, entry in list(self.entries.items()):
+            if other == name or (entry.file == name and entry.sha256 == sha256):
+                self.entries[other] = AudioEntry(entry.word, entry.file, size, sha256, duration, check)
+
+    def remove_stored(self, name: str) -> List[str]:
+        """Drop the stored file name and every alias of it from the index; returns the names."""
+        removed = sorted(other for other, entry in self.entries.items() if entry.file == name or other == name)
+        for other in removed:
+            del self.entries[other]
+        return removed
+
+    def refresh(self, verify: bool = False, jobs: int = 1) -> Tuple[int, int]:
+        """Reconcile with the directory; returns (entries updated, entries removed).
+
+        Only files that are not indexed yet or whose size differs from the
+        index (always the case for LFS pointers) are read, unless verify=True.
+        Those are hashed and checked across `jobs` processes. Names whose
+        file is gone are dropped.
+        """
+        on_disk: Dict[str, int] = {}
+        with os.scandir(self.audio_dir) as it:
+            for item in it:
+                if item.name.endswith(AUDIO_SUFFIX) and item.is_file():
+                    on_disk[item.name] = item.stat().st_size
+
+        to_read = [
+            name for name in sorted(on_disk)
+            if verify or name not in self.entries
+            or self.entries[name].bytes != on_disk[name]
+        ]
+        results = map_in_pool(describe_file, [self.audio_dir / name for name in to_read], jobs)
+        described = 0
+        for name, (size, sha256, duration, check) in zip(to_read, results):
+            entry = self.entries.get(name)
+            if entry is not None and entry.sha256 == sha256 and entry.file != name:
+                # Copy of an alias's audio: it stays an alias
+                continue
+            if entry is not None and entry.file == name and entry.sha256 == sha256 and check is None:
+                # LFS pointer of unchanged content: keep what was learned from the real file
+                duration, check = entry.duration, entry.check
+            updated = AudioEntry(word_of(name), name, size, sha256, duration, check)
+            if updated != entry:
+                self.entries[name] = updated
+                described += 1
+
+        removed = 0
+        for name in sorted(self.entries):
+            if name in on_disk or name not in self.entries:
+                continue
+            entry = self.entries.pop(name)
+            removed += 1
+            if entry.file == name:
+                # The stored file is gone: its aliases use another stored copy of
+                # the content, or the first alias copy on disk becomes the stored file
+                aliases = sorted(other for other, alias in self.entries.items() if alias.file == name)
+                copies = [other for other in aliases if other in on_disk]
+                target = self._canonical_for(entry.sha256, exclude=name) or (copies[0] if copies else None)
+                for other in aliases:
+                    if target is None:
+                        del self.entries[other]
+                        removed += 1
+                    else:
+                        self.entries[other].file = target
+        # Aliases pointing at a file that is now indexed with different content keep their own copy
+        for name, entry in self.entries.items():
+            stored = self.entries.get(entry.file)
+            if entry.file != name and (stored is None or stored.sha256 != entry.sha256):
+                entry.file = self._canonical_for(entry.sha256, exclude=name) or name
+        return described, removed
+
+    def dedupe(self) -> List[str]:
+        """Turn every duplicate stored file into an alias (the file stays); returns their names."""
+        aliased: List[str] = []
+        for names in self.duplicates().values():
+            keep, rest = names[0], names[1:]
+            for name in rest:
+                for other, entry in self.entries.items():
+                    if entry.file == name:
+                        entry.file = keep
+                aliased.append(name)
+        return aliased
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    default_audio_dir = (script_dir.parent / "audio").resolve()
+
+    parser = argparse.ArgumentParser(description="Refresh proj/audio/index.json (sizes, hashes, durations, aliases)")
+    parser.add_argument("--audio-dir", type=Path, default=default_audio_dir, help="Audio directory (default: proj/audio)")
+    parser.add_argument("--verify", action="store_true", help="Re-hash every file and recompute durations")
+    parser.add_argument("--dedupe", action="store_true", help="Record files whose content is already stored as aliases")
+    parser.add_argument("--check", action="store_true", help="Only report whether index.json is up to date (exit 1 if not)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Processes for hashing/checking changed files (0 = all CPUs)")
+    args = parser.parse_args()
+
+    audio_dir = args.audio_dir.resolve()
+    if not audio_dir.is_dir():
+        print(f"[ERROR] Audio directory not found: {audio_dir}")
+        return 1
+
+    index = AudioIndex(audio_dir).load()
+    before = index.dumps()
+    described, removed = index.refresh(verify=args.verify, jobs=args.jobs)
+    duplicates = index.duplicates()
+
+    if args.check:
+        stale = index.dumps() != before
+        if stale:
+            print(f"[STALE] {INDEX_NAME} ({described} files changed, {removed} entries removed)")
+        for names in duplicates.values():
+            print(f"[DUP] {', '.join(names)}")
+        if stale:
+            print("[ERROR] Audio index is out of date; run audio_index.py")
+            return 1
+        print(f"[OK] {INDEX_NAME} is up to date ({len(index.entries)} entries)")
+        return 0
+
+    if args.dedupe:
+        for name in index.dedupe():
+            print(f"[OK] {name} is now an alias of {index.entries[name].file}")
+    else:
+        for names in duplicates.values():
+            print(f"[DUP] Same audio stored as {', '.join(names)} (run with --dedupe to upload one copy)")
+
+    aliases = sum(1 for name, entry in index.entries.items() if entry.file != name)
+    written = index.save()
+    print(
+        f"[OK] {INDEX_NAME} {'written' if written else 'already up to date'}: "
+        f"{len(index.entries)} entries, {aliases} aliases, {described} updated, {removed} removed"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Per-library audio packs: one file holding every clip of a vocabulary library.
+
+For each library served to the browser (the files build_word_bundles.py puts
+in the manifest, e.g. daily-phonics/day01.json) the clips of its words are
+concatenated into proj/audio/packs/<library>.pack, and
+proj/audio/packs/index.json records where each clip lives:
+
+    {
+      "version": 2,
+      "providers": ["youdao", "baidu", "google"],
+      "packs": {
+        "daily-phonics/day01": {
+          "file": "daily-phonics/day01.pack", "bytes": 123456, "sha256": "...",
+          "clips": {"cat": [0, 9422, "youdao"], "hat": [9422, 8811, "baidu"]},
+          "missing": ["..."]
+        }
+      }
+    }
+
+Each word gets the clip of the first provider in --providers (default: all,
+in tts_providers.PROVIDERS order, like the downloader) that has usable audio
+for it ({word}_{provider}.mp3), and the clip records which provider that was.
+
+The browser fetches a lesson's pack once (AudioCacheManager.warmLibrary) and
+slices the clips out of it, instead of one request per word; single clips can
+also be read with an HTTP Range request (dev-server.js supports Range).
+Clips come from proj/audio/index.json, so alias words share one copy and
+clips that failed validation (check != "ok") are left out. Packs are only
+rewritten when their content changes.
+
+Packs need the real audio: with Git LFS pointer files in proj/audio (no
+`git lfs pull` yet) nothing is written.
+
+Usage:
+  python3 audio_pack.py                     # build/refresh every pack
+  python3 audio_pack.py --library daily-phonics/day01
+  python3 audio_pack.py --providers youdao,baidu
+  python3 audio_pack.py --read daily-phonics/day01 cat > cat.mp3
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from audio_index import CHECK_OK, AudioIndex, parse_lfs_pointer
+from build_word_bundles import category_of, write_if_changed
+from tts_providers import PROVIDERS, resolve_providers
+from word_corpus import get_corpus
+
+
+PACKS_DIR_NAME = "packs"
+PACK_INDEX_NAME = "index.json"
+PACK_SUFFIX = ".pack"
+PACK_INDEX_VERSION = 2
+
+
+class PackError(Exception):
+    """Packs cannot be built from the audio on disk."""
+
+
+def library_id(rel: str) -> str:
+    """Library id of a vocabulary file: "daily-phonics/day01.json" -> "daily-phonics/day01"."""
+    return rel[: -len(".json")] if rel.endswith(".json") else rel
+
+
+def build_pack(
+    index: AudioIndex, words: List[str], providers: List[str]
+) -> Tuple[bytes, Dict[str, list], List[str]]:
+    """Concatenate the clips for words; returns (pack bytes, {word: [offset, length, provider]}, missing words).
+
+    A word's clip comes from the first of providers with usable audio for it.
+    Words whose audio is stored in the same file (aliases) point at one copy.
+    """
+    chunks: List[bytes] = []
+    clips: Dict[str, list] = {}
+    missing: List[str] = []
+    placed: Dict[str, List[int]] = {}
+    offset = 0
+    for word in sorted(set(words)):
+        for provider in providers:
+            entry = index.get(f"{word}_{provider}.mp3")
+            if entry is not None and entry.check in (None, CHECK_OK):
+                break
+        else:
+            missing.append(word)
+            continue
+        if entry.file not in placed:
+            data = (index.audio_dir / entry.file).read_bytes()
+            if parse_lfs_pointer(data) is not None:
+                raise PackError(f"{entry.file} is a Git LFS pointer; run `git lfs pull` first")
+            placed[entry.file] = [offset, len(data)]
+            chunks.append(data)
+            offset += len(data)
+        clips[word] = [*placed[entry.file], provider]
+    return b"".join(chunks), clips, missing
+
+
+def build_packs(
+    words_dir: Path, audio_dir: Path, only: Optional[List[str]] = None, providers: Optional[List[str]] = None
+) -> Tuple[Dict[Path, bytes], dict]:
+    """Compute pack files and the pack index; nothing is written here."""
+    providers = providers or list(PROVIDERS)
+    index = AudioIndex(audio_dir).load()
+    index.refresh()
+    corpus = get_corpus(words_dir)
+    packs_dir = audio_dir / PACKS_DIR_NAME
+
+    outputs: Dict[Path, bytes] = {}
+    packs: Dict[str, dict] = {}
+    for entry in sorted(corpus.files, key=lambda f: f.rel):
+        if category_of(entry) is None or not entry.details:
+            continue
+        lib = library_id(entry.rel)
+        if only and lib not in only:
+            continue
+        payload, clips, missing = build_pack(index, list(entry.details), providers)
+        if not clips:
+            continue
+        pack_rel = lib + PACK_SUFFIX
+        outputs[packs_dir / pack_rel] = payload
+        packs[lib] = {
+            "file": pack_rel,
+            "bytes": len(payload),
+            "sha256": hashlib.sha256(payload).hexdigest(),
+            "clips": clips,
+            "missing": missing,
+        }
+    return outputs, {"version": PACK_INDEX_VERSION, "providers": providers, "packs": packs}
+
+
+class AudioPackReader:
+    """Read clips back out of the packs described by packs/index.json."""
+
+    def __init__(self, packs_dir: Path):
+        self.packs_dir = packs_dir
+        data = json.loads((packs_dir / PACK_INDEX_NAME).read_text(encoding="utf-8"))
+        if data.get("version") != PACK_INDEX_VERSION:
+            raise PackError(f"Unsupported pack index version: {data.get('version')}")
+        self.packs: Dict[str, dict] = data.get("packs", {})
+
+    def libraries(self) -> List[str]:
+        return sorted(self.packs)
+
+    def words(self, library: str) -> List[str]:
+        return sorted(self.packs[library]["clips"])
+
+    def clip_range(self, library: str, word: str) -> Tuple[Path, int, int]:
+        """(pack path, offset, length) of a word's clip; KeyError if not packed."""
+        pack = self.packs[library]
+        offset, length = pack["clips"][word][:2]
+        return self.packs_dir / pack["file"], offset, length
+
+    def read(self, library: str, word: str) -> bytes:
+        path, offset, length = self.clip_range(library, word)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        if len(data) != length:
+            raise PackError(f"{path} is shorter than its index says")
+        return data
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    default_words_dir = (script_dir.parent / "words").resolve()
+    default_audio_dir = (script_dir.parent / "audio").resolve()
+
+    parser = argparse.ArgumentParser(description="Build per-library audio packs (proj/audio/packs)")
+    parser.add_argument("--words-dir", type=Path, default=default_words_dir, help="Vocabulary directory (default: proj/words)")
+    parser.add_argument("--audio-dir", type=Path, default=default_audio_dir, help="Audio directory (default: proj/audio)")
+    parser.add_argument("--library", action="append", help="Only build this library (repeatable), e.g. daily-phonics/day01")
+    parser.add_argument("--providers", default=",".join(PROVIDERS),
+                        help="Providers whose clips may be packed, in order of preference (default: %(default)s)")
+    parser.add_argument("--read", nargs=2, metavar=("LIBRARY", "WORD"), help="Write one clip from an existing pack to stdout")
+    args = parser.parse_args()
+
+    audio_dir = args.audio_dir.resolve()
+    packs_dir = audio_dir / PACKS_DIR_NAME
+
+    try:
+        providers = [p.name for p in resolve_providers(args.providers.split(","))]
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.read:
+        try:
+            data = AudioPackReader(packs_dir).read(*args.read)
+        except (OSError, KeyError, PackError) as e:
+            print(f"[ERROR] Cannot read clip: {e}", file=sys.stderr)
+            return 1
+        sys.stdout.buffer.write(data)
+        return 0
+
+    try:
+        outputs, pack_index = build_packs(args.words_dir.resolve(), audio_dir, args.library, providers)
+    except PackError as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    index_path = packs_dir / PACK_INDEX_NAME
+    if args.library:
+        # Keep the entries of libraries that were not rebuilt (from an index of this version)
+        try:
+            previous_index = json.loads(index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            previous_index = {}
+        previous = previous_index.get("packs", {}) if previous_index.get("version") == PACK_INDEX_VERSION else {}
+        pack_index["packs"] = {**previous, **pack_index["packs"]}
+        pack_index["packs"] = {k: pack_index["packs"][k] for k in sorted(pack_index["packs"])}
+
+    written = 0
+    for path, payload in outputs.items():
+        if write_if_changed(path, payload):
+            written += 1
+            print(f"[OK] Wrote {path.relative_to(audio_dir)} ({len(payload)} bytes)")
+    payload = (json.dumps(pack_index, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    if write_if_changed(index_path, payload):
+        print(f"[OK] Wrote {index_path.relative_to(audio_dir)}")
+
+    if not args.library:
+        # Packs of libraries that no longer exist (or have no audio any more)
+        for path in sorted(packs_dir.rglob("*" + PACK_SUFFIX)):
+            if path not in outputs:
+                path.unlink()
+                print(f"[OK] Removed {path.relative_to(audio_dir)}")
+
+    missing = sum(len(p["missing"]) for p in pack_index["packs"].values())
+    print(f"[OK] {len(pack_index['packs'])} packs ({written} rewritten), {missing} words without audio")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared word extractor (word_extractor.py) against the previous
+recursive implementation on a large synthetic corpus.
+
+Three comparisons are reported:
+1) In-memory walk: legacy recursive set-union vs iterative single-set walk
+2) Whole-file: json.loads + iterative walk vs streaming tokenizer, with the
+   peak traced memory of each (tracemalloc). The streaming tokenizer is pure
+   Python and therefore slower; its point is flat memory on huge files
+3) Deep nesting: the legacy walk hits the recursion limit, the iterative and
+   streaming engines do not
+
+The corpus mirrors the day/book JSON shape (metadata, lesson, words[],
+nested chapters) and is generated from a fixed seed, so runs are comparable.
+
+Usage:
+  python3 benchmark_extract_words.py
+  python3 benchmark_extract_words.py --docs 3000 --words-per-doc 80 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, List, Set
+
+from word_extractor import (
+    WORD_PATTERN,
+    extract_words_from_json_data,
+    extract_words_from_json_file,
+)
+
+
+def legacy_extract_words_from_json_data(data: Any) -> Set[str]:
+    """The recursive implementation previously duplicated in scan_words.py and
+    download_word_audio.py, kept here verbatim as the benchmark baseline."""
+    collected: Set[str] = set()
+
+    if data is None:
+        return collected
+
+    if isinstance(data, dict):
+        if "word" in data and isinstance(data["word"], str):
+            w = data["word"].strip().lower()
+            if len(w) >= 2 and WORD_PATTERN.fullmatch(w):
+                collected.add(w)
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                collected |= legacy_extract_words_from_json_data(value)
+        return collected
+
+    if isinstance(data, list):
+        for item in data:
+            collected |= legacy_extract_words_from_json_data(item)
+        return collected
+
+    return collected
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+
+
+def make_document(rng: random.Random, index: int, words_per_doc: int) -> dict:
+    """One synthetic vocabulary file: top-level words plus nested chapters."""
+    def word_item() -> dict:
+        return {
+            "word": random_word(rng),
+            "phonetic": "[" + random_word(rng) + "]",
+            "meaning": "释义",
+            "difficulty": rng.randint(1, 3),
+        }
+
+    chapters = [
+        {
+            "id": f"ch{c:02d}",
+            "story": " ".join(random_word(rng) for _ in range(60)),
+            "sections": [{"words": [word_item() for _ in range(words_per_doc // 8)]} for _ in range(2)],
+        }
+        for c in range(2)
+    ]
+    return {
+        "metadata": {"id": f"doc{index:05d}", "name": f"Synthetic {index}", "wordCount": words_per_doc},
+        "lesson": {"pronunciationTips": [random_word(rng) for _ in range(5)]},
+        "words": [word_item() for _ in range(words_per_doc // 2)],
+        "chapters": chapters,
+    }
+
+
+def make_deep_document(depth: int) -> Any:
+    node: Any = {"word": "deep"}
+    for _ in range(depth):
+        node = {"child": [node]}
+    return node
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def traced_peak(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark word extraction engines")
+    parser.add_argument("--docs", type=int, default=1000, help="Number of synthetic documents (default: 1000)")
+    parser.add_argument("--words-per-doc", type=int, default=64, help="Word items per document (default: 64)")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of repetitions per measurement (default: 3)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the corpus (default: 42)")
+    parser.add_argument("--deep", type=int, default=5000, help="Nesting depth for the recursion test (default: 5000)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = [make_document(rng, i, args.words_per_doc) for i in range(args.docs)]
+
+    print(f"[INFO] Synthetic corpus: {args.docs} docs x {args.words_per_doc} word items (seed {args.seed})")
+
+    # 1) In-memory walk over already-parsed documents
+    def run_legacy() -> None:
+        out: Set[str] = set()
+        for d in docs:
+            out |= legacy_extract_words_from_json_data(d)
+
+    def run_iterative() -> None:
+        out: Set[str] = set()
+        for d in docs:
+            extract_words_from_json_data(d, out)
+
+    legacy_result: Set[str] = set()
+    iterative_result: Set[str] = set()
+    for d in docs:
+        legacy_result |= legacy_extract_words_from_json_data(d)
+        extract_words_from_json_data(d, iterative_result)
+    if legacy_result != iterative_result:
+        print("[ERROR] Iterative engine disagrees with the legacy implementation")
+        return 1
+
+    t_legacy = best_of(args.repeat, run_legacy)
+    t_iter = best_of(args.repeat, run_iterative)
+    print("\n[1] In-memory walk (parsed documents)")
+    print(f"    legacy recursive : {t_legacy * 1000:9.1f} ms")
+    print(f"    iterative        : {t_iter * 1000:9.1f} ms  ({t_legacy / t_iter:.2f}x)")
+
+    # 2) Whole-file extraction: one large file containing every document
+    with tempfile.TemporaryDirectory() as tmp:
+        big = Path(tmp) / "corpus.json"
+        big.write_text(json.dumps({"books": docs}, ensure_ascii=False), encoding="utf-8")
+        size_mb = big.stat().st_size / (1024 * 1024)
+
+        loaded = extract_words_from_json_file(big, stream=False)
+        streamed = extract_words_from_json_file(big, stream=True)
+        if loaded != streamed or loaded != legacy_result:
+            print("[ERROR] Streaming engine disagrees with json.loads")
+            return 1
+
+        t_load = best_of(args.repeat, lambda: extract_words_from_json_file(big, stream=False))
+        t_stream = best_of(args.repeat, lambda: extract_words_from_json_file(big, stream=True))
+        m_load = traced_peak(lambda: extract_words_from_json_file(big, stream=False))
+        m_stream = traced_peak(lambda: extract_words_from_json_file(big, stream=True))
+
+        print(f"\n[2] Single {size_mb:.1f} MB file")
+        print(f"    json.loads + walk: {t_load * 1000:9.1f} ms  peak {m_load / 1024 / 1024:8.1f} MB")
+        print(f"    streaming        : {t_stream * 1000:9.1f} ms  peak {m_stream / 1024 / 1024:8.1f} MB")
+
+        # 3) Deeply nested document
+        deep = make_deep_document(args.deep)
+        print(f"\n[3] Nesting depth {args.deep} (recursion limit {sys.getrecursionlimit()})")
+        try:
+            legacy_extract_words_from_json_data(deep)
+            print("    legacy recursive : ok")
+        except RecursionError:
+            print("    legacy recursive : RecursionError")
+        print(f"    iterative        : {sorted(extract_words_from_json_data(deep))}")
+
+        deep_file = Path(tmp) / "deep.json"
+        deep_file.write_text("[" * args.deep + '{"word": "deep"}' + "]" * args.deep, encoding="utf-8")
+        try:
+            json.loads(deep_file.read_text(encoding="utf-8"))
+            print("    json.loads       : ok")
+        except RecursionError:
+            print("    json.loads       : RecursionError")
+        streamed_deep: List[str] = sorted(extract_words_from_json_file(deep_file, stream=True))
+        print(f"    streaming        : {streamed_deep}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
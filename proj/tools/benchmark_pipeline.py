@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for the proj/tools word pipeline on synthetic corpora.
+
+For every corpus size a vocabulary tree is generated from a fixed seed, in the
+same shape as proj/words (daily-phonics days, special-practice files,
+grade-based units, extracurricular-books chapters with stories), plus one
+plain-text "book dump" for analyze_words.py. Then each stage runs in its own
+Python process so its peak memory can be measured in isolation:
+
+  scan_words               scan_words.py full scan (--no-cache): CSV + words.idx
+  read_csv_words           generate_word_images.read_csv_words on that CSV
+  collect_all_words        WordAudioDownloader.collect_all_words, no snapshot
+  collect_all_words_cached WordAudioDownloader.collect_all_words, warm snapshot
+  scan_words_cached        scan_words.py with the warm .scan_cache snapshot
+  analyze_words            analyze_words.analyze_document on the book dump
+
+Each stage records wall time (best of --repeat) and peak RSS of its process
+(max of --repeat, Unix only). Results are written as JSON; pass --baseline to
+compare against a stored results file and exit with status 1 when a stage got
+slower (or bigger) than the allowed tolerance.
+
+Usage:
+  python3 benchmark_pipeline.py                          # 1k and 10k files
+  python3 benchmark_pipeline.py --sizes 1k,10k,100k      # 100k takes several minutes
+  python3 benchmark_pipeline.py --save-baseline          # store results as the baseline
+  python3 benchmark_pipeline.py --baseline benchmark_results/baseline.json
+  python3 benchmark_pipeline.py --stages scan_words,scan_words_cached --keep-corpus
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmark_extract_words import random_word
+from word_corpus import SNAPSHOT_NAME
+
+
+RESULTS_VERSION = 1
+STAGES = [
+    "scan_words",
+    "read_csv_words",
+    "collect_all_words",
+    "collect_all_words_cached",
+    "scan_words_cached",
+    "analyze_words",
+]
+# Untimed stages that prepare state for the next timed one
+PREPARE = {
+    "collect_all_words": "drop_snapshot",
+    "collect_all_words_cached": "prime_snapshot",
+    "scan_words_cached": "prime_snapshot",
+}
+CSV_NAME = "words.csv"
+DUMP_NAME = "book-dump.txt"
+COMPLETE_MARKER = ".complete"
+
+# Share of the generated files per category (the rest are book chapters)
+DAILY_SHARE = 0.10
+SPECIAL_SHARE = 0.02
+GRADE_SHARE = 0.28
+FILES_PER_SERIES = 200
+CHAPTERS_PER_BOOK = 20
+DUMP_BYTES_PER_FILE = 512
+
+
+# ---- synthetic corpus ----------------------------------------------------------
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text.endswith("k"):
+        return int(float(text[:-1]) * 1000)
+    return int(text)
+
+
+class VocabularySampler:
+    """Zipf-distributed draws from a fixed pool, so common words repeat across files."""
+
+    def __init__(self, rng: random.Random, pool_size: int):
+        pool = {random_word(rng) for _ in range(pool_size)}
+        self.words = sorted(w for w in pool if len(w) >= 2)
+        rng.shuffle(self.words)
+        total = 0.0
+        self.cum_weights: List[float] = []
+        for rank in range(len(self.words)):
+            total += 1.0 / (rank + 1)
+            self.cum_weights.append(total)
+        self.rng = rng
+
+    def sample(self, k: int) -> List[str]:
+        return self.rng.choices(self.words, cum_weights=self.cum_weights, k=k)
+
+    def word_items(self, k: int) -> List[dict]:
+        return [
+            {
+                "word": w,
+                "phonetic": f"[{w}]",
+                "meaning": "释义",
+                "difficulty": self.rng.randint(1, 3),
+            }
+            for w in dict.fromkeys(self.sample(k))
+        ]
+
+    def story(self, n_words: int) -> str:
+        return " ".join(self.sample(n_words)).capitalize() + "."
+
+
+def corpus_layout(index: int, n_files: int) -> Tuple[str, str]:
+    """(category, relative path) of the index-th generated file."""
+    n_daily = max(1, int(n_files * DAILY_SHARE))
+    n_special = max(1, int(n_files * SPECIAL_SHARE))
+    n_grade = max(1, int(n_files * GRADE_SHARE))
+    if index < n_daily:
+        return "daily-phonics", f"daily-phonics/day{index + 1:02d}.json"
+    index -= n_daily
+    if index < n_special:
+        return "special-practice", f"special-practice/p{index + 1:03d}-practice.json"
+    index -= n_special
+    if index < n_grade:
+        grade = index % 12 + 1
+        term = (index // 12) % 2 + 1
+        unit = index // 24 + 1
+        level = "primary" if grade <= 6 else "middle" if grade <= 9 else "high"
+        return "grade-based", f"grade-based/{level}/grade{grade}-term{term}-unit{unit}.json"
+    index -= n_grade
+    series, rest = divmod(index, FILES_PER_SERIES)
+    book, chapter = divmod(rest, CHAPTERS_PER_BOOK)
+    return "extracurricular-books", (
+        f"extracurricular-books/series{series + 1:03d}/book{book + 1:02d}-ch{chapter + 1:02d}.json"
+    )
+
+
+def make_corpus_document(sampler: VocabularySampler, category: str, file_id: str) -> dict:
+    rng = sampler.rng
+    metadata = {
+        "id": file_id,
+        "name": file_id.replace("-", " ").title(),
+        "description": f"Synthetic {category} file",
+        "category": category,
+        "difficulty": rng.choice(["beginner", "intermediate", "advanced"]),
+        "lastUpdated": "2025-10-01",
+    }
+    if category == "daily-phonics":
+        metadata["phoneme"] = f"/{random_word(rng)[:2]}/"
+        words = sampler.word_items(rng.randint(8, 12))
+    elif category == "special-practice":
+        metadata["phoneme"] = f"/{random_word(rng)[:2]}/"
+        words = sampler.word_items(20)
+    elif category == "grade-based":
+        metadata["story"] = sampler.story(40)
+        words = sampler.word_items(rng.randint(8, 14))
+    else:
+        metadata["chapterTitle"] = sampler.story(4)
+        metadata["chapterSummary"] = {"brief": "章节概要", "keyThemes": ["冒险", "友谊"]}
+        metadata["story"] = sampler.story(rng.randint(60, 120))
+        words = sampler.word_items(rng.randint(15, 25))
+    metadata["wordCount"] = len(words)
+    return {"metadata": metadata, "words": words}
+
+
+def generate_corpus(root: Path, n_files: int, seed: int) -> Path:
+    """Write an n_files vocabulary tree (plus the book dump) under root; reused if complete."""
+    if (root / COMPLETE_MARKER).exists():
+        return root
+    if root.exists():
+        shutil.rmtree(root)
+    rng = random.Random(seed)
+    sampler = VocabularySampler(rng, pool_size=max(2000, n_files // 5))
+
+    words_dir = root / "words"
+    created_dirs = set()
+    for index in range(n_files):
+        category, rel = corpus_layout(index, n_files)
+        path = words_dir / rel
+        if path.parent not in created_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            created_dirs.add(path.parent)
+        document = make_corpus_document(sampler, category, path.stem)
+        path.write_text(json.dumps(document, ensure_ascii=False, indent=2), encoding="utf-8")
+    # Skipped by the downloader, scanned by scan_words.py, like the real tree
+    (words_dir / "config.json").write_text(json.dumps({"availableLibraries": []}), encoding="utf-8")
+
+    with (root / DUMP_NAME).open("w", encoding="utf-8") as f:
+        remaining = n_files * DUMP_BYTES_PER_FILE
+        while remaining > 0:
+            paragraph = sampler.story(80) + "\n"
+            f.write(paragraph)
+            remaining -= len(paragraph)
+
+    (root / COMPLETE_MARKER).write_text(f"{n_files} {seed}\n", encoding="utf-8")
+    return root
+
+
+# ---- stages (run inside a worker process) --------------------------------------
+
+
+def stage_scan_words(root: Path, use_cache: bool) -> int:
+    from scan_words import collect_words_per_file, collect_words_per_file_cached, write_outputs
+
+    words_dir = root / "words"
+    output = words_dir / CSV_NAME
+    if use_cache:
+        per_file, _parsed = collect_words_per_file_cached(words_dir, output, snapshot_path(root), jobs=1)
+    else:
+        per_file = collect_words_per_file(words_dir, output, jobs=1)
+    write_outputs(words_dir, per_file, output, output.with_suffix(".idx"))
+    return len(per_file)
+
+
+def stage_read_csv_words(root: Path) -> int:
+    from generate_word_images import read_csv_words
+
+    return len(read_csv_words(root / "words" / CSV_NAME))
+
+
+def stage_collect_all_words(root: Path) -> int:
+    from download_word_audio import WordAudioDownloader
+
+    downloader = WordAudioDownloader()
+    downloader.words_dir = root / "words"
+    return len(downloader.collect_all_words())
+
+
+def stage_analyze_words(root: Path) -> int:
+    from analyze_words import analyze_document
+
+    result = analyze_document(str(root / DUMP_NAME))
+    return result["unique_words"] if result else 0
+
+
+def snapshot_path(root: Path) -> Path:
+    # Shared by scan_words.py (CSV in the words dir) and get_corpus(words_dir)
+    return root / "words" / SNAPSHOT_NAME
+
+
+def run_stage(name: str, root: Path) -> int:
+    """Run one stage (or preparation step) and return its item count."""
+    stages: Dict[str, Callable[[], int]] = {
+        "scan_words": lambda: stage_scan_words(root, use_cache=False),
+        "scan_words_cached": lambda: stage_scan_words(root, use_cache=True),
+        "read_csv_words": lambda: stage_read_csv_words(root),
+        "collect_all_words": lambda: stage_collect_all_words(root),
+        "collect_all_words_cached": lambda: stage_collect_all_words(root),
+        "analyze_words": lambda: stage_analyze_words(root),
+    }
+    if name == "drop_snapshot":
+        if snapshot_path(root).exists():
+            snapshot_path(root).unlink()
+        return 0
+    if name == "prime_snapshot":
+        # One pass through each snapshot so the timed run only stats files
+        stage_scan_words(root, use_cache=True)
+        stage_collect_all_words(root)
+        return 0
+    return stages[name]()
+
+
+def worker_main(name: str, root: Path, result_path: Path) -> int:
+    # Stage output (progress prints) is not part of the measurement
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")
+    try:
+        start = time.perf_counter()
+        items = run_stage(name, root)
+        result = {"seconds": time.perf_counter() - start, "items": items}
+    except ImportError as e:
+        result = {"skipped": f"missing dependency: {e}"}
+    result_path.write_text(json.dumps(result), encoding="utf-8")
+    return 0
+
+
+# ---- driver -----------------------------------------------------------------------
+
+
+def spawn_stage(name: str, root: Path) -> dict:
+    """Run a stage in a fresh interpreter; returns its result plus peak RSS in KiB."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = Path(tmp) / "result.json"
+        cmd = [sys.executable, str(Path(__file__).resolve()), "--worker", name,
+               "--worker-root", str(root), "--worker-result", str(result_path)]
+        proc = subprocess.Popen(cmd, cwd=str(Path(__file__).resolve().parent))
+        peak_rss_kb: Optional[int] = None
+        if hasattr(os, "wait4"):
+            _pid, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            peak_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+        else:
+            proc.wait()
+        if proc.returncode != 0 or not result_path.exists():
+            return {"error": f"worker exited with status {proc.returncode}"}
+        result = json.loads(result_path.read_text(encoding="utf-8"))
+    if "seconds" in result:
+        result["peak_rss_kb"] = peak_rss_kb
+    return result
+
+
+def run_size(n_files: int, seed: int, work_dir: Path, stages: List[str], repeat: int) -> Dict[str, dict]:
+    root = work_dir / f"corpus-{n_files}-seed{seed}"
+    start = time.perf_counter()
+    generate_corpus(root, n_files, seed)
+    print(f"[INFO] Corpus {n_files} files ready in {time.perf_counter() - start:.1f}s: {root}")
+
+    results: Dict[str, dict] = {}
+    for name in STAGES:
+        if name not in stages:
+            continue
+        best: Optional[dict] = None
+        for _ in range(repeat):
+            if name in PREPARE:
+                spawn_stage(PREPARE[name], root)
+            current = spawn_stage(name, root)
+            if "seconds" not in current:
+                best = current
+                break
+            if best is None:
+                best = current
+            else:
+                best["seconds"] = min(best["seconds"], current["seconds"])
+                if current["peak_rss_kb"] is not None:
+                    best["peak_rss_kb"] = max(best["peak_rss_kb"] or 0, current["peak_rss_kb"])
+        assert best is not None
+        results[name] = best
+        print(f"    {format_result(name, best)}")
+    return results
+
+
+def format_result(name: str, result: dict) -> str:
+    if "seconds" not in result:
+        return f"{name:26s} {result.get('skipped') or result.get('error')}"
+    rss = result.get("peak_rss_kb")
+    rss_text = f"{rss / 1024:8.1f} MB" if rss is not None else "       n/a"
+    return f"{name:26s} {result['seconds'] * 1000:10.1f} ms  peak RSS {rss_text}  items {result['items']}"
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Print a comparison table; returns the regressions (slower/bigger beyond tolerance)."""
+    regressions: List[str] = []
+    compared = 0
+    print(f"\n[COMPARE] against baseline from {baseline.get('created', '?')} (tolerance {tolerance:.0%})")
+    for size, stages in current["results"].items():
+        base_stages = baseline.get("results", {}).get(size, {})
+        for name, result in stages.items():
+            base = base_stages.get(name)
+            if not base or "seconds" not in base or "seconds" not in result:
+                continue
+            compared += 1
+            ratio = result["seconds"] / base["seconds"] if base["seconds"] else 1.0
+            line = f"    {size:>7s} {name:26s} time x{ratio:5.2f}"
+            flagged = ratio > 1 + tolerance
+            if result.get("peak_rss_kb") and base.get("peak_rss_kb"):
+                mem_ratio = result["peak_rss_kb"] / base["peak_rss_kb"]
+                line += f"  rss x{mem_ratio:5.2f}"
+                flagged = flagged or mem_ratio > 1 + tolerance
+            if flagged:
+                line += "  <-- regression"
+                regressions.append(f"{size}/{name}")
+            print(line)
+    if not compared:
+        print("    [WARN] No corpus size/stage in common with the baseline")
+    return regressions
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    default_results_dir = script_dir / "benchmark_results"
+
+    parser = argparse.ArgumentParser(description="Benchmark the word pipeline on synthetic corpora")
+    parser.add_argument("--sizes", type=str, default="1k,10k", help="Comma-separated corpus sizes in files (default: 1k,10k)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the corpora (default: 42)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; best time and max RSS are kept (default: 1)")
+    parser.add_argument("--stages", type=str, default=",".join(STAGES), help="Comma-separated stages to run (default: all)")
+    parser.add_argument("--work-dir", type=Path, default=None, help="Where corpora are generated (default: a temporary directory)")
+    parser.add_argument("--keep-corpus", action="store_true", help="Keep generated corpora for reuse (with --work-dir)")
+    parser.add_argument("--output", type=Path, default=default_results_dir / "latest.json", help="Results file (default: benchmark_results/latest.json)")
+    parser.add_argument("--baseline", type=Path, default=None, help="Compare against this results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Also store the results as benchmark_results/baseline.json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown/growth vs baseline (default: 0.2 = 20%%)")
+    parser.add_argument("--worker", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-root", type=Path, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-result", type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker_main(args.worker, args.worker_root, args.worker_result)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+
+    temp_dir: Optional[tempfile.TemporaryDirectory] = None
+    if args.work_dir is None:
+        temp_dir = tempfile.TemporaryDirectory(prefix="word-bench-")
+        work_dir = Path(temp_dir.name)
+    else:
+        work_dir = args.work_dir.resolve()
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+    current = {
+        "version": RESULTS_VERSION,
+        "created": _dt.datetime.now().isoformat(timespec="seconds"),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": {},
+    }
+    try:
+        for n_files in sizes:
+            current["results"][str(n_files)] = run_size(n_files, args.seed, work_dir, stages, args.repeat)
+            if not args.keep_corpus and temp_dir is None:
+                shutil.rmtree(work_dir / f"corpus-{n_files}-seed{args.seed}", ignore_errors=True)
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+    print(f"\n[OK] Results written to: {args.output}")
+    if args.save_baseline:
+        baseline_path = default_results_dir / "baseline.json"
+        shutil.copyfile(args.output, baseline_path)
+        print(f"[OK] Baseline saved to: {baseline_path}")
+
+    if args.baseline:
+        if not args.baseline.exists():
+            print(f"[ERROR] Baseline not found: {args.baseline}")
+            return 1
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_results(current, baseline, args.tolerance)
+        if regressions:
+            print(f"[ERROR] {len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+        print("[OK] No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
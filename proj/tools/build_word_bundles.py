@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Build step for the browser-side vocabulary loader.
+
+Walks the category directories under proj/words and writes:
+
+1) proj/words/manifest.json
+   The file list used by vocabulary-config-loader.js, regenerated from disk
+   (no more hand-editing, no missing days), plus per-file word count,
+   byte size and sha1 in "entries"
+2) proj/words/bundles/<category>.json
+   One bundle per category holding every vocabulary file of that category,
+   so loading N libraries of one category costs one request instead of N
+3) proj/words/bundles/index.json
+   Metadata-only index: the manifest file list plus, per file, the bundle it
+   lives in, its word count and the "metadata" fields the loader displays.
+   The page fetches this single small file at startup instead of one
+   request per vocabulary file
+
+Word counts and hashes come from the shared word corpus (word_corpus.py), so
+unchanged files are not re-parsed. Outputs are only rewritten when their
+content changes, and manifest "lastUpdated" only moves when the manifest
+itself changes, so re-running the build on an unchanged tree is a no-op.
+
+Usage:
+  python3 build_word_bundles.py
+  python3 build_word_bundles.py --check          # exit 1 if outputs are stale
+  python3 build_word_bundles.py --words-dir ../words --jobs 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from word_corpus import BUNDLES_DIR_NAME, CorpusFile, get_corpus
+
+
+MANIFEST_VERSION = "2.0.0"
+INDEX_NAME = "index.json"
+
+# Category directories served to the browser, in display order
+CATEGORIES = ["daily-phonics", "special-practice", "grade-based", "extracurricular-books"]
+# Sub-directories the loader always expects, even when empty
+DEFAULT_SUBDIRS: Dict[str, List[str]] = {"grade-based": ["primary", "middle", "high"]}
+# metadata fields read by vocabulary-config-loader.js; the rest (stories,
+# summaries, ...) stays in the bundles to keep the startup index small
+INDEX_METADATA_KEYS = (
+    "id", "name", "phoneme", "description", "difficulty",
+    "wordCount", "totalWords", "chapterTitle", "title",
+)
+
+
+def category_of(entry: CorpusFile) -> Optional[str]:
+    parts = entry.rel.split("/")
+    if len(parts) >= 2 and parts[0] in CATEGORIES:
+        return parts[0]
+    return None
+
+
+def build_file_tree(category: str, rels: List[str]) -> object:
+    """Manifest "files" value: a list of ids, or {subdir: [ids]} for nested categories."""
+    flat: List[str] = []
+    nested: Dict[str, List[str]] = {name: [] for name in DEFAULT_SUBDIRS.get(category, [])}
+    for rel in rels:
+        parts = rel.split("/")[1:]
+        stem = Path(parts[-1]).stem
+        if len(parts) == 1:
+            flat.append(stem)
+        else:
+            nested.setdefault("/".join(parts[:-1]), []).append(stem)
+    if nested:
+        return {key: sorted(nested[key]) for key in nested}
+    return sorted(flat)
+
+
+def dump_json(data: object, pretty: bool) -> bytes:
+    if pretty:
+        return (json.dumps(data, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_if_changed(path: Path, payload: bytes) -> bool:
+    """Atomically replace path with payload unless it already has that content."""
+    try:
+        if path.read_bytes() == payload:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(payload)
+    os.replace(tmp_path, path)
+    return True
+
+
+def load_document(path: Path) -> Optional[dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[WARN] Skipping invalid JSON {path}: {e}")
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def build_outputs(words_dir: Path, manifest_path: Path, jobs: int = 1) -> Dict[Path, bytes]:
+    """Compute every output file's content; nothing is written here."""
+    corpus = get_corpus(words_dir, jobs=jobs)
+    by_category: Dict[str, List[Tuple[CorpusFile, dict]]] = {c: [] for c in CATEGORIES}
+    for entry in sorted(corpus.files, key=lambda f: f.rel):
+        category = category_of(entry)
+        if category is None:
+            continue
+        document = load_document(entry.path)
+        if document is None:
+            continue
+        by_category[category].append((entry, document))
+
+    bundles_dir = words_dir / BUNDLES_DIR_NAME
+    outputs: Dict[Path, bytes] = {}
+    files_tree: Dict[str, object] = {}
+    entries: Dict[str, dict] = {}
+    index_entries: Dict[str, dict] = {}
+    bundles: Dict[str, dict] = {}
+
+    for category, items in by_category.items():
+        files_tree[category] = build_file_tree(category, [entry.rel for entry, _ in items])
+        if not items:
+            continue
+        for entry, document in items:
+            entries[entry.rel] = {
+                "wordCount": len(entry.details),
+                "bytes": entry.size,
+                "sha1": entry.sha1,
+            }
+            metadata = document.get("metadata")
+            if not isinstance(metadata, dict):
+                metadata = {}
+            index_entries[entry.rel] = {
+                "bundle": category,
+                "wordCount": len(entry.details),
+                "metadata": {k: metadata[k] for k in INDEX_METADATA_KEYS if k in metadata},
+            }
+
+        payload = dump_json({
+            "category": category,
+            "files": {entry.rel: document for entry, document in items},
+        }, pretty=False)
+        bundle_path = bundles_dir / f"{category}.json"
+        outputs[bundle_path] = payload
+        bundles[category] = {
+            "file": bundle_path.relative_to(words_dir).as_posix(),
+            "bytes": len(payload),
+            "sha1": hashlib.sha1(payload).hexdigest(),
+            "fileCount": len(items),
+        }
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "lastUpdated": _dt.date.today().isoformat(),
+        "description": "词库文件索引，避免无效的文件探测（由 tools/build_word_bundles.py 生成，请勿手工编辑）",
+        "files": files_tree,
+        "entries": entries,
+        "bundles": bundles,
+    }
+    previous = load_document(manifest_path) if manifest_path.exists() else None
+    if previous is not None and dict(previous, lastUpdated=None) == dict(manifest, lastUpdated=None):
+        manifest["lastUpdated"] = previous.get("lastUpdated", manifest["lastUpdated"])
+    outputs[manifest_path] = dump_json(manifest, pretty=True)
+
+    index = {
+        "version": MANIFEST_VERSION,
+        "lastUpdated": manifest["lastUpdated"],
+        "files": files_tree,
+        "bundles": bundles,
+        "entries": index_entries,
+    }
+    outputs[bundles_dir / INDEX_NAME] = dump_json(index, pretty=False)
+    return outputs
+
+
+def stale_bundle_files(bundles_dir: Path, outputs: Dict[Path, bytes]) -> List[Path]:
+    """Bundle files left over from categories that no longer exist."""
+    if not bundles_dir.is_dir():
+        return []
+    return sorted(p for p in bundles_dir.glob("*.json") if p not in outputs)
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    default_words_dir = (script_dir.parent / "words").resolve()
+
+    parser = argparse.ArgumentParser(description="Regenerate manifest.json and per-category vocabulary bundles")
+    parser.add_argument("--words-dir", type=Path, default=default_words_dir, help="Vocabulary directory (default: proj/words)")
+    parser.add_argument("--manifest", type=Path, default=None, help="Manifest path (default: <words-dir>/manifest.json)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Parallel parse processes for changed files (0 = all CPUs)")
+    parser.add_argument("--check", action="store_true", help="Only report whether outputs are up to date (exit 1 if not)")
+    args = parser.parse_args()
+
+    words_dir = args.words_dir.resolve()
+    if not words_dir.exists() or not words_dir.is_dir():
+        print(f"[ERROR] Words directory not found: {words_dir}")
+        return 1
+    manifest_path = (args.manifest or words_dir / "manifest.json").resolve()
+    bundles_dir = words_dir / BUNDLES_DIR_NAME
+
+    outputs = build_outputs(words_dir, manifest_path, args.jobs)
+    leftovers = stale_bundle_files(bundles_dir, outputs)
+
+    if args.check:
+        stale = [p for p, payload in outputs.items() if not p.exists() or p.read_bytes() != payload]
+        for path in stale + leftovers:
+            print(f"[STALE] {path.relative_to(words_dir)}")
+        if stale or leftovers:
+            print("[ERROR] Bundles are out of date; run build_word_bundles.py")
+            return 1
+        print("[OK] manifest.json and bundles are up to date")
+        return 0
+
+    written = 0
+    for path, payload in outputs.items():
+        if write_if_changed(path, payload):
+            written += 1
+            print(f"[OK] Wrote {path.relative_to(words_dir)} ({len(payload)} bytes)")
+    for path in leftovers:
+        path.unlink()
+        print(f"[OK] Removed {path.relative_to(words_dir)}")
+    if not written and not leftovers:
+        print("[OK] manifest.json and bundles already up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,39 +2,331 @@
 # -*- coding: utf-8 -*-
 """
 批量下载单词音频脚本
-扫描 proj/words 目录下的所有 JSON 文件，通过有道 API 下载单词音频到 proj/audio 目录
+扫描 proj/words 目录下的所有 JSON 文件，通过在线 TTS（默认有道）下载单词音频到 proj/audio 目录
+
+用法:
+  python3 download_word_audio.py                       # 默认 4 个线程，总速率约 3.3 次/秒
+  python3 download_word_audio.py --workers 8 --rate 10 # 8 个线程共享每秒 10 次的请求额度
+  python3 download_word_audio.py --workers 1           # 逐个下载
+  python3 download_word_audio.py --refresh             # 条件请求复查已有音频，只重下有变化的
+  python3 download_word_audio.py --retry-failed        # 忽略退避时间，立即重试之前失败的单词
+  python3 download_word_audio.py --providers youdao,baidu --hedge-ms 800  # 有道超过 0.8 秒未返回时同时请求百度
+  python3 download_word_audio.py --base-url http://127.0.0.1:8765         # 使用本地 mock_tts_server.py 做离线压测
+  python3 download_word_audio.py --shard 1/3 & python3 download_word_audio.py --shard 2/3 & ...  # 多个进程分担同一目录
+
+扫描和下载同时进行：下载线程先启动，词库文件每解析完一个（未变化的文件直接来自
+word_corpus 的快照缓存），其中缺少音频的单词就加入优先队列；words/config.json
+中启用的词库最先扫描，其单词也排在队列最前面。
+
+所有线程共用一个令牌桶（rate_limit.TokenBucket），包括重试在内的每次请求
+都先取令牌，因此无论线程数多少，总请求速率都不超过 --rate。
+按 Ctrl-C 会停止派发新任务，等待进行中的请求结束后打印统计。
+
+每个线程使用自己的 requests.Session（keep-alive 连接池），同一线程的后续请求
+复用已建立的 TCP/TLS 连接。下载成功时记录响应的 ETag / Last-Modified
+（保存在 audio/.http_validators.json），--refresh 时据此发送
+If-None-Match / If-Modified-Since，服务器返回 304 的音频不再重新下载。
+
+下载日志 audio/.download_journal.json 记录每个单词的状态、失败次数、最后的
+错误和下次重试时间：失败的单词按指数退避（10 分钟起，最长 7 天）跨运行重试，
+退避期内的单词直接跳过。音频先写入 .part 临时文件再重命名，中途崩溃不会留下
+被当作已完成的半截文件；大小与日志记录不符的已有文件会重新下载。
+
+已有音频以 audio/index.json（audio_index.AudioIndex）为准：每个文件名对应实际
+存储文件、字节数、sha256 和时长。下载到的内容与其他单词完全相同时（如 dear/deer）
+在索引中记为别名（上传 R2 时只传一份），文件本身照常保存，静态托管可以直接访问。下载到的内容先按 MP3 帧头检查
+（audio_index.check_mp3），错误页面、截断或静音的响应按失败重试；
+已有文件可用 validate_audio.py 批量检查。
+
+提供商（tts_providers.py，与 TTSService.js 相同的有道 / 百度 / Google 接口）按
+--providers 的顺序使用：第一个是主提供商，请求失败时立即转到下一个；指定
+--hedge-ms 时，在途请求超过该时间仍未返回也会向下一个提供商发出同样的请求
+（对冲请求），先返回有效音频的结果被采用。文件按实际提供商命名
+（<单词>_<提供商>.mp3，与浏览器端 AudioCacheManager 的缓存键一致），
+任一已配置提供商的文件都算已存在。每个提供商单独限速。
+统计中会打印每个单词的耗时分位数（p50/p95/p99）和吞吐，配合
+mock_tts_server.py 的延迟和错误注入可以离线比较不同参数。
+
+多进程分片（--shard I/N）：按单词的哈希把所有单词分成 N 份，每个进程只处理
+第 I 份，N 个进程可以同时对同一个 audio 目录运行而不会重复请求同一个单词。
+各进程的临时文件名带进程号，只清理超过 1 小时的残留 .part 文件；audio/index.json、
+下载日志和 ETag 记录在文件锁（file_lock.py）内重新读取、合并本进程的改动后写入，
+互不覆盖。不同进程同时下载到的相同内容可能各存一份，之后用
+audio_index.py --dedupe 合并为别名。
+
+运行指标（tool_metrics.Metrics）：每个请求的延迟直方图、状态码、字节数、重试、
+令牌等待时间和各阶段耗时，结束时写入 tools/metrics/download_word_audio.json
+和 .prom（Prometheus 文本格式）；--live-metrics 在 stderr 上实时刷新一行状态。
 """
 
+import argparse
+import hashlib
+import itertools
 import os
 import json
+import queue
+import threading
 import time
+from collections import Counter
+from email.utils import formatdate
 import requests
-import re
+from requests.adapters import HTTPAdapter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from urllib.parse import quote
-from typing import Set, List, Dict, Any
+from typing import Set, List, Dict, Any, Callable, Optional, Tuple
+
+from word_extractor import WORD_PATTERN
+from word_corpus import get_corpus, open_corpus
+from rate_limit import TokenBucket
+from file_lock import file_lock
+from audio_index import CHECK_OK, AudioIndex, check_mp3, provider_of
+from tts_providers import DEFAULT_PROVIDER, TTSProvider, resolve_providers
+from tool_metrics import METRICS_DIR_NAME, Metrics
+
+
+# download_audio 的结果
+DOWNLOADED = 'downloaded'    # 下载并写入了新内容
+NOT_MODIFIED = 'unchanged'   # 304，或内容与本地文件相同
+FAILED = 'failed'
+
+VALIDATORS_FILE = '.http_validators.json'
+JOURNAL_FILE = '.download_journal.json'
+
+MIN_AUDIO_BYTES = 100               # 没有下载日志记录时，小于此大小的已有文件视为不完整
+RETRY_BASE_SECONDS = 600            # 第一次失败后的退避时间
+RETRY_MAX_SECONDS = 7 * 24 * 3600   # 退避时间上限
+JOURNAL_SAVE_EVERY = 25             # 每记录这么多次结果落盘一次，崩溃时最多丢失这些
+STALE_PART_SECONDS = 3600           # 超过这么久的 .part 文件视为中断残留（较新的可能属于其他分片进程）
+
+# 下载队列的优先级（越小越先处理）；启用词库的单词在各档内再 +0，其余 +1
+PRIORITY_MISSING = 0
+PRIORITY_REFRESH = 2
+PRIORITY_STOP = 4                   # 下载线程的结束标记，排在所有单词之后
+
+
+def write_temp(path: Path, data: bytes) -> Path:
+    """把 data 完整写入 path 旁边的临时文件并返回其路径；失败时不留下临时文件
+    
+    临时文件名带进程号，同一目录下的多个分片进程不会写到同一个临时文件
+    """
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.part')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+    return tmp_path
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """先写临时文件再重命名，目标文件要么是旧内容要么是完整的新内容"""
+    tmp_path = write_temp(path, data)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """解析 --shard 参数 "I/N"（I 从 1 开始），返回 (I, N)；格式错误时抛出 ValueError"""
+    index, sep, count = text.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"分片格式应为 I/N，例如 1/3: {text}") from None
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"分片格式应为 I/N 且 1 <= I <= N: {text}")
+    return index, count
+
+
+def shard_of(word: str, count: int) -> int:
+    """单词所属的分片（1..count）：与进程、运行次数无关的稳定哈希，大小写不同的写法分到同一片"""
+    digest = hashlib.sha1(word.lower().encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def load_enabled_libraries(words_dir: Path) -> Set[str]:
+    """words/config.json 中启用的词库：文件名和 ID（enabled 为 true 的词库及 defaultConfig.enabledLibraries）"""
+    try:
+        with open(words_dir / 'config.json', 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    enabled = set(config.get('defaultConfig', {}).get('enabledLibraries', []))
+    for library in config.get('availableLibraries', []):
+        if library.get('enabled'):
+            enabled.update(name for name in (library.get('id'), library.get('filename')) if name)
+    return enabled
+
+
+def is_enabled_library(rel: str, enabled: Set[str]) -> bool:
+    """词库文件（相对 words 目录的路径）是否启用：文件名、去掉 .json 的 ID 或所在目录在启用列表中"""
+    stem = rel[:-len('.json')] if rel.endswith('.json') else rel
+    return rel in enabled or stem in enabled or any(rel.startswith(name + '/') for name in enabled)
+
+
+class DownloadJournal:
+    """跨运行保存的下载日志
+    
+    word -> {'status': 'done' | 'failed', 'attempts': 失败次数, 'size': 文件字节数,
+             'provider': 文件所属提供商, 'last_error': 最后的错误, 'next_retry': 下次重试的时间戳,
+             'updated': 更新时间戳}
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._dirty: Set[str] = set()  # 本进程改过、尚未落盘的单词
+    
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = data.get('words') if isinstance(data, dict) else None
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+    
+    def load(self):
+        with self._lock:
+            self.entries = self._read()
+            self._dirty.clear()
+    
+    def save(self):
+        """在文件锁内重新读取日志（其他分片进程可能已写入），只用本进程改过的单词覆盖后写回"""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.path):
+                merged = self._read()
+                merged.update((word, self.entries[word]) for word in self._dirty)
+                self.entries = merged
+                payload = json.dumps({'version': 1, 'words': self.entries}, ensure_ascii=False, indent=1, sort_keys=True)
+                atomic_write(self.path, (payload + '\n').encode('utf-8'))
+            self._dirty.clear()
+            self._unsaved = 0
+    
+    def _update(self, word: str, entry: Dict[str, Any]):
+        with self._lock:
+            entry['updated'] = round(time.time())
+            self.entries[word] = entry
+            self._dirty.add(word)
+            self._unsaved += 1
+            due = self._unsaved >= JOURNAL_SAVE_EVERY
+        if due:
+            self.save()
+    
+    def is_complete(self, word: str, size: int, provider: str = DEFAULT_PROVIDER) -> bool:
+        """本地文件是否可信：日志记录了该提供商的文件时大小必须一致，没有记录时至少要有 MIN_AUDIO_BYTES"""
+        with self._lock:
+            entry = self.entries.get(word)
+        if (entry and entry.get('status') == 'done' and 'size' in entry
+                and entry.get('provider', DEFAULT_PROVIDER) == provider):
+            return entry['size'] == size
+        return size >= MIN_AUDIO_BYTES
+    
+    def retry_at(self, word: str) -> Optional[float]:
+        """处于退避期时返回下次可重试的时间戳，否则返回 None"""
+        with self._lock:
+            entry = self.entries.get(word)
+        if entry and entry.get('status') == 'failed' and entry.get('next_retry', 0) > time.time():
+            return entry['next_retry']
+        return None
+    
+    def record_success(self, word: str, size: int, provider: str = DEFAULT_PROVIDER):
+        self._update(word, {'status': 'done', 'size': size, 'provider': provider})
+    
+    def record_failure(self, word: str, error: str):
+        with self._lock:
+            attempts = self.entries.get(word, {}).get('attempts', 0) + 1
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        self._update(word, {
+            'status': 'failed',
+            'attempts': attempts,
+            'last_error': error,
+            'next_retry': round(time.time() + delay),
+        })
 
 
 class WordAudioDownloader:
     """单词音频下载器"""
     
-    # 单词匹配正则表达式（复用 scan_words.py 的逻辑）
-    WORD_PATTERN = re.compile(r"[A-Za-z]+(?:[-'][A-Za-z]+)*")
+    # 单词匹配正则表达式（与 scan_words.py 共用 word_extractor 中的定义）
+    WORD_PATTERN = WORD_PATTERN
     
-    def __init__(self):
+    def __init__(self, workers: int = 4, rate: float = None, refresh: bool = False, retry_failed: bool = False,
+                 audio_dir: Optional[Path] = None, providers: Optional[List[TTSProvider]] = None,
+                 hedge_after: Optional[float] = None, metrics: Optional[Metrics] = None,
+                 shard: Optional[Tuple[int, int]] = None):
         # 获取脚本所在目录的父目录（proj目录）
         self.script_dir = Path(__file__).parent
         self.proj_dir = self.script_dir.parent
         self.words_dir = self.proj_dir / 'words'
-        self.audio_dir = self.proj_dir / 'audio'
+        self.audio_dir = Path(audio_dir) if audio_dir is not None else self.proj_dir / 'audio'
         
-        # 有道 TTS API
-        self.api_url = "https://dict.youdao.com/dictvoice?audio={word}&type=1"
+        # TTS 提供商（按优先级，第一个是主提供商）
+        self.providers = list(providers) if providers else resolve_providers([DEFAULT_PROVIDER])
+        self.providers_by_name = {p.name: p for p in self.providers}
+        # 对冲请求：在途请求超过 hedge_after 秒未返回时，向下一个提供商发出同样的请求（None = 只在失败时转移）
+        self.hedge_after = hedge_after
+        # 已有音频所属的提供商：word -> provider（条件刷新只问这个提供商）
+        self.existing_providers: Dict[str, str] = {}
+        # 多进程分片：(I, N) 表示只处理 shard_of(word, N) == I 的单词（None = 全部）
+        self.shard = shard
         
         # 下载配置
         self.max_retries = 3
         self.retry_delay = 1  # 秒
-        self.request_delay = 0.3  # 请求间隔，避免频繁请求
+        self.request_delay = 0.3  # 请求间隔，避免频繁请求（未指定 rate 时换算为速率上限）
+        
+        # 并发配置：线程数和共享令牌桶（rate <= 0 表示不限速）
+        self.workers = max(1, workers)
+        if rate is None:
+            rate = 1.0 / self.request_delay
+        # 每个提供商（不同主机）一个令牌桶；容量为 1：不允许突发，任意时间段内的请求数都不超过速率上限
+        self.rate_limiters = {p.name: TokenBucket(rate, capacity=1) for p in self.providers}
+        self.rate_limiter = self.rate_limiters[self.providers[0].name]
+        
+        # 运行指标（请求延迟、状态码、字节数、重试、各阶段耗时）
+        self.metrics = metrics or Metrics('download_word_audio')
+        for name, bucket in self.rate_limiters.items():
+            self.metrics.set('rate_limit_per_second', bucket.rate, endpoint=name)
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()  # 保护 stats、validators 和进度输出
+        
+        # 连接复用：每个线程一个 Session（requests.Session 不保证线程安全）
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        # 发出单个 HTTP 请求的线程池（对冲时一个单词同时有多个请求在途）
+        self._request_pool: Optional[ThreadPoolExecutor] = None
+        
+        # 下载队列：(优先级, 序号, 单词, 是否条件刷新)，由 _run_pipeline 创建
+        self._queue: Optional[queue.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._queued = 0
+        
+        # 条件刷新：word -> {'etag': ..., 'last_modified': ...}
+        self.refresh = refresh
+        self.validators: Dict[str, Dict[str, str]] = {}
+        self._validators_dirty: Set[str] = set()  # 本进程改过的单词，保存时与磁盘上的记录合并
+        
+        # 下载日志：失败退避、已完成文件的大小校验
+        self.retry_failed = retry_failed
+        self.journal = DownloadJournal(self.audio_dir / JOURNAL_FILE)
+        
+        # 音频索引：文件名 -> 存储文件、大小、sha256、时长（相同内容只存一份）
+        self.audio_index = AudioIndex(self.audio_dir)
         
         # 统计信息
         self.stats = {
@@ -42,156 +334,478 @@ class WordAudioDownloader:
             'existing_files': 0,
             'downloaded': 0,
             'failed': 0,
-            'skipped': 0
+            'skipped': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'deferred': 0,
+            'incomplete': 0,
+            'hedged': 0,
+            'failover': 0,
+            'other_shard': 0
         }
+        self.provider_wins: Counter = Counter()  # 提供商 -> 采用其结果的单词数
+        self.elapsed = 0.0                        # 下载阶段的总耗时
         
-    def scan_json_files(self) -> List[Path]:
-        """递归扫描所有 JSON 文件"""
-        json_files = []
-        for json_file in self.words_dir.rglob('*.json'):
-            # 跳过配置文件
-            if json_file.name in ['config.json', 'manifest.json']:
-                continue
-            json_files.append(json_file)
-        return json_files
-    
-    def extract_words_from_json_data(self, data: Any) -> Set[str]:
-        """递归地从 JSON 数据中收集所有词汇项（复用 scan_words.py 的逻辑）
-        
-        规则：
-        - 如果对象包含 'word' 键且值为字符串，则收集该值
-        - 递归遍历列表
-        - 忽略其他所有字符串值（ids、names、filenames、descriptions、categories 等）
-        - 过滤掉单字母标记
-        """
-        collected: Set[str] = set()
-        
-        if data is None:
-            return collected
-        
-        if isinstance(data, dict):
-            # 如果这个字典直接定义了一个单词项
-            if "word" in data and isinstance(data["word"], str):
-                w = data["word"].strip().lower()
-                if len(w) >= 2 and self.WORD_PATTERN.fullmatch(w.replace("'", "'") if True else w):
-                    collected.add(w)
-            # 递归到其他嵌套结构
-            for value in data.values():
-                if isinstance(value, (dict, list)):
-                    collected |= self.extract_words_from_json_data(value)
-            return collected
-        
-        if isinstance(data, list):
-            for item in data:
-                collected |= self.extract_words_from_json_data(item)
-            return collected
-        
-        # 忽略没有键上下文的原始字符串
-        return collected
-    
-    def extract_words_from_json(self, json_file: Path) -> Set[str]:
-        """从 JSON 文件中提取单词列表（使用 scan_words.py 的递归扫描逻辑）"""
-        words = set()
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 使用递归方法提取所有单词
-            words = self.extract_words_from_json_data(data)
-        except Exception as e:
-            print(f"  [警告] 解析文件失败 {json_file.name}: {e}")
-        
-        return words
-    
     def collect_all_words(self) -> Set[str]:
-        """收集所有单词"""
+        """收集所有单词（共用 word_corpus 的快照缓存，未变化的文件不再解析）"""
         print("[扫描] 扫描单词文件...")
-        json_files = self.scan_json_files()
-        print(f"   找到 {len(json_files)} 个 JSON 文件")
+        corpus = get_corpus(self.words_dir)
+        json_files = [f for f in corpus.files if f.path.name not in ('config.json', 'manifest.json')]
+        print(f"   找到 {len(json_files)} 个 JSON 文件（本次解析 {corpus.last_parsed} 个，其余来自缓存）")
         
         all_words = set()
-        for json_file in json_files:
-            words = self.extract_words_from_json(json_file)
-            all_words.update(words)
+        for corpus_file in json_files:
+            if not corpus_file.valid_json:
+                print(f"  [警告] 解析文件失败 {corpus_file.path.name}: 不是有效的 JSON")
+                continue
+            all_words.update(corpus_file.details)
         
         print(f"   共收集到 {len(all_words)} 个唯一单词")
         return all_words
     
     def get_existing_audio_files(self) -> Set[str]:
-        """获取已存在的音频文件"""
+        """从音频索引获取已存在且完整的音频（不完整的文件不计入，会被重新下载）"""
         existing_words = set()
         
         if not self.audio_dir.exists():
             self.audio_dir.mkdir(parents=True, exist_ok=True)
             return existing_words
         
-        for audio_file in self.audio_dir.glob('*_youdao.mp3'):
-            # 从文件名中提取单词（去掉 _youdao.mp3 后缀）
-            word = audio_file.stem.replace('_youdao', '')
-            existing_words.add(word.lower())
+        # 上次中断留下的临时文件（较新的可能是其他分片进程正在写的，保留）
+        stale_before = time.time() - STALE_PART_SECONDS
+        for part_file in self.audio_dir.glob('*.part'):
+            try:
+                if part_file.stat().st_mtime < stale_before:
+                    part_file.unlink()
+            except OSError:
+                pass
+        
+        # 加载索引，只对新增或大小变化的文件重新计算哈希
+        self.audio_index.load()
+        updated, removed = self.audio_index.refresh()
+        if updated or removed:
+            print(f"   音频索引已更新：{updated} 个文件变化，{removed} 个已删除")
+        self.audio_index.save(merge=True)
+        
+        # 任一已配置提供商的完整文件都算已存在；有多个时记下优先级最高的提供商
+        rank = {p.name: i for i, p in enumerate(self.providers)}
+        self.existing_providers = {}
+        self.stats['incomplete'] = 0
+        for name, entry in sorted(self.audio_index.entries.items()):
+            provider = provider_of(name)
+            if provider not in rank:
+                continue
+            if not self.journal.is_complete(entry.word, entry.bytes, provider):
+                print(f"  [警告] 音频文件不完整，将重新下载: {name}")
+                self.stats['incomplete'] += 1
+                continue
+            word = entry.word.lower()
+            current = self.existing_providers.get(word)
+            if current is None or rank[provider] < rank[current]:
+                self.existing_providers[word] = provider
         
+        existing_words.update(self.existing_providers)
         return existing_words
     
-    def download_audio(self, word: str) -> bool:
-        """下载单个单词的音频"""
-        filename = f"{word}_youdao.mp3"
+    def _get_session(self) -> requests.Session:
+        """当前线程的 keep-alive Session（首次调用时创建）"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            # 一个线程同一时刻只有一个请求，每个主机保留一条长连接即可；重试由 download_audio 负责
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+    
+    def _get_request_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._request_pool is None:
+                # 每个下载线程最多同时有 len(providers) 个请求在途
+                self._request_pool = ThreadPoolExecutor(max_workers=self.workers * len(self.providers))
+            return self._request_pool
+    
+    def close_sessions(self):
+        """关闭所有线程创建的 Session，释放连接"""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+    
+    @property
+    def validators_path(self) -> Path:
+        return self.audio_dir / VALIDATORS_FILE
+    
+    def _read_validators(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.validators_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+    
+    def load_validators(self):
+        """读取上次保存的 ETag / Last-Modified"""
+        validators = self._read_validators()
+        with self._lock:
+            self.validators = validators
+            self._validators_dirty = set()
+    
+    def save_validators(self):
+        """原子写入 ETag / Last-Modified：在文件锁内与磁盘上的记录合并，只覆盖本进程改过的单词"""
+        self.audio_dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.validators_path):
+            merged = self._read_validators()
+            with self._lock:
+                for word in self._validators_dirty:
+                    if word in self.validators:
+                        merged[word] = self.validators[word]
+                    else:
+                        merged.pop(word, None)
+                self.validators = merged
+                self._validators_dirty = set()
+                payload = json.dumps(self.validators, ensure_ascii=False, indent=2, sort_keys=True)
+            atomic_write(self.validators_path, (payload + '\n').encode('utf-8'))
+    
+    def _conditional_headers(self, word: str, provider: TTSProvider, filepath: Optional[Path]) -> Dict[str, str]:
+        """为已有文件构造条件请求头；没有该提供商的记录时用文件修改时间作为 If-Modified-Since"""
+        if filepath is None or not filepath.exists():
+            return {}
+        with self._lock:
+            stored = dict(self.validators.get(word, {}))
+        if stored.get('provider', DEFAULT_PROVIDER) != provider.name:
+            stored = {}
+        headers = {}
+        if stored.get('etag'):
+            headers['If-None-Match'] = stored['etag']
+        if stored.get('last_modified'):
+            headers['If-Modified-Since'] = stored['last_modified']
+        elif not headers:
+            headers['If-Modified-Since'] = formatdate(filepath.stat().st_mtime, usegmt=True)
+        return headers
+    
+    def _remember_validators(self, word: str, provider: TTSProvider, response) -> None:
+        entry = {}
+        if response.headers.get('ETag'):
+            entry['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            entry['last_modified'] = response.headers['Last-Modified']
+        if entry:
+            entry['provider'] = provider.name
+        with self._lock:
+            if entry:
+                self.validators[word] = entry
+            else:
+                self.validators.pop(word, None)
+            self._validators_dirty.add(word)
+    
+    def _request(self, provider: TTSProvider, word: str, headers: Dict[str, str]):
+        """向一个提供商发出一次请求（先取该提供商的令牌）；非 200/304 或音频无效时抛出异常"""
+        waited = time.monotonic()
+        if not self.rate_limiters[provider.name].acquire(stop_event=self.stop_event):
+            raise Exception("已中断")
+        started = time.monotonic()
+        self.metrics.observe('rate_limit_wait_seconds', started - waited, endpoint=provider.name)
+        try:
+            response = self._get_session().get(provider.url(word), headers=headers, timeout=10)
+        except Exception:
+            self.metrics.record_request(provider.name, time.monotonic() - started, 'error')
+            raise
+        self.metrics.record_request(provider.name, time.monotonic() - started, response.status_code, len(response.content))
+        if response.status_code == 304 and headers:
+            return response
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+        # 按 MP3 帧头检查（帧同步、截断、时长、静音），错误页面等按失败处理
+        check = check_mp3(response.content)
+        if check.status != CHECK_OK:
+            raise Exception(f"音频无效（{check.status}）")
+        return response
+    
+    def _fetch(self, word: str, providers: List[TTSProvider], headers: Dict[str, str]) -> Tuple[TTSProvider, Any]:
+        """按顺序向提供商请求，返回第一个有效结果 (provider, response)
+        
+        在途请求全部失败时立即请求下一个提供商（故障转移）；设置了 hedge_after 时，
+        最近发出的请求超过该时间仍未返回也请求下一个（对冲）。落后的请求无法取消，
+        结束后直接丢弃。
+        """
+        pool = self._get_request_pool()
+        remaining = list(providers)
+        in_flight = {}
+        errors = []
+        
+        def launch(reason: Optional[str]):
+            provider = remaining.pop(0)
+            if reason:
+                with self._lock:
+                    self.stats[reason] += 1
+                self.metrics.inc('extra_requests_total', reason=reason)
+            in_flight[pool.submit(self._request, provider, word, headers)] = provider
+        
+        launch(None)
+        while in_flight:
+            hedge_timeout = self.hedge_after if remaining and self.hedge_after is not None else None
+            done, _ = wait(in_flight, timeout=hedge_timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                launch('hedged')
+                continue
+            for future in done:
+                provider = in_flight.pop(future)
+                try:
+                    return provider, future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}" if len(providers) > 1 else str(e))
+            if not in_flight and remaining and not self.stop_event.is_set():
+                launch('failover')
+        raise Exception('; '.join(errors))
+    
+    def _save_audio(self, word: str, provider: TTSProvider, content: bytes) -> str:
+        """按提供商命名保存下载到的音频（与其他单词内容相同时在索引中记为别名）"""
+        filename = f"{word}_{provider.name}.mp3"
         filepath = self.audio_dir / filename
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self.provider_wins[provider.name] += 1
+            # 服务器不支持条件请求时，内容相同也不重写文件
+            previous = self.audio_index.get(filename)
+        if previous is not None and previous.sha256 == digest:
+            self.journal.record_success(word, len(content), provider.name)
+            return NOT_MODIFIED
+        
+        # 先把内容完整写入临时文件：磁盘已满、没有权限等错误在这里抛出，
+        # 此时下载日志和音频索引都还没有改动，下次运行会重新下载
+        tmp_path = write_temp(filepath, content)
+        try:
+            with self._lock:
+                self.audio_index.put(filename, content)
+            # 保存音频文件（重命名为正式文件名）；别名也保留自己的文件
+            os.replace(tmp_path, filepath)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        
+        # 文件落盘后才记为完成
+        self.journal.record_success(word, len(content), provider.name)
+        return DOWNLOADED
+    
+    def download_audio(self, word: str, conditional: bool = False) -> str:
+        """下载单个单词的音频，返回 DOWNLOADED / NOT_MODIFIED / FAILED
         
-        # 构建 API URL
-        url = self.api_url.format(word=quote(word))
+        conditional=True 时向已有文件所属的提供商发送条件请求，未变化则不重新下载
+        """
+        if conditional:
+            provider = self.providers_by_name.get(self.existing_providers.get(word), self.providers[0])
+            filename = f"{word}_{provider.name}.mp3"
+            with self._lock:
+                # 别名的音频存放在另一个单词的文件中
+                stored_path = self.audio_index.stored_path(filename)
+            providers = [provider]
+            headers = self._conditional_headers(word, provider, stored_path)
+        else:
+            providers = self.providers
+            headers = {}
         
-        # 重试机制
+        # 重试机制（每次请求都先从对应提供商的令牌桶取令牌）
         for attempt in range(self.max_retries):
             try:
-                response = requests.get(url, timeout=10)
+                provider, response = self._fetch(word, providers, headers)
                 
-                if response.status_code == 200:
-                    # 检查是否是有效的音频文件（至少有一些字节）
-                    if len(response.content) < 100:
-                        raise Exception("音频文件太小，可能无效")
-                    
-                    # 保存音频文件
-                    with open(filepath, 'wb') as f:
-                        f.write(response.content)
-                    
-                    return True
-                else:
-                    raise Exception(f"HTTP {response.status_code}")
+                if response.status_code == 304:
+                    with self._lock:
+                        entry = self.audio_index.get(filename)
+                    self.journal.record_success(word, entry.bytes if entry else stored_path.stat().st_size, provider.name)
+                    return NOT_MODIFIED
+                
+                self._remember_validators(word, provider, response)
+                return self._save_audio(word, provider, response.content)
                     
             except Exception as e:
+                if self.stop_event.is_set():
+                    return FAILED
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
+                    self.metrics.inc('retries_total')
+                    # 可被 Ctrl-C 打断的等待
+                    if self.stop_event.wait(self.retry_delay):
+                        return FAILED
                 else:
                     print(f"  [错误] 下载失败: {word} - {e}")
-                    return False
+                    self.journal.record_failure(word, str(e))
+                    return FAILED
         
-        return False
+        return FAILED
+    
+    def _processed(self) -> int:
+        return self.stats['downloaded'] + self.stats['failed'] + self.stats['updated'] + self.stats['unchanged']
+    
+    def _download_one(self, word: str, conditional: bool = False) -> None:
+        """下载线程的任务：下载（或条件刷新）一个单词并更新统计和进度"""
+        if self.stop_event.is_set():
+            return
+        started = time.monotonic()
+        result = self.download_audio(word, conditional=conditional)
+        if self.stop_event.is_set() and result == FAILED:
+            # 中断导致的放弃不算失败，由 _run_pipeline 计入 skipped
+            return
+        self.metrics.observe('item_duration_seconds', time.monotonic() - started)
+        with self._lock:
+            if result == FAILED:
+                key, label = 'failed', '[FAIL]'
+            elif result == NOT_MODIFIED:
+                key, label = 'unchanged', '[未变化]'
+            elif conditional:
+                key, label = 'updated', '[已更新]'
+            else:
+                key, label = 'downloaded', '[OK]'
+            self.stats[key] += 1
+            self.metrics.inc('items_total', result=key)
+            print(f"[{self._processed()}/{self._queued}] {'刷新' if conditional else '下载'}: {word} {label}")
     
-    def download_missing_audio(self, words_to_download: Set[str]):
-        """批量下载缺失的音频文件"""
-        total = len(words_to_download)
+    def _enqueue(self, word: str, conditional: bool = False, enabled: bool = False) -> None:
+        """加入下载队列：启用词库的单词排在前面，缺失的音频排在条件刷新之前"""
+        priority = (PRIORITY_REFRESH if conditional else PRIORITY_MISSING) + (0 if enabled else 1)
+        with self._lock:
+            self._queued += 1
+        self._queue.put((priority, next(self._sequence), word, conditional))
+    
+    def _worker(self) -> None:
+        while True:
+            _, _, word, conditional = self._queue.get()
+            if word is None:
+                return
+            self._download_one(word, conditional)
+    
+    def _run_pipeline(self, produce: Callable[[], None]) -> None:
+        """启动下载线程，在当前线程运行 produce()（向队列添加单词），然后等待队列处理完
+        
+        下载线程从优先队列取单词，produce 还在运行（例如还在扫描词库）时就开始下载。
+        """
+        rate = f"{self.rate_limiter.rate:g} 次/秒" if self.rate_limiter.rate > 0 else "不限速"
+        print(f"\n[下载] 启动 {self.workers} 个下载线程（{rate}）")
+        providers = ' → '.join(p.name for p in self.providers)
+        hedge = f"，超过 {self.hedge_after * 1000:g} ms 未返回时对冲" if self.hedge_after is not None and len(self.providers) > 1 else ""
+        print(f"   提供商: {providers}{hedge}\n")
+        
+        self.stop_event.clear()
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._queued = 0
+        started = time.monotonic()
+        threads = [threading.Thread(target=self._worker, name=f'audio-download-{i}', daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        
+        def stop_workers():
+            # 结束标记排在所有单词之后
+            for _ in threads:
+                self._queue.put((PRIORITY_STOP, next(self._sequence), None, False))
+        
+        try:
+            produce()
+            stop_workers()
+            # 带超时地等待，主线程才能及时收到 Ctrl-C
+            with self.metrics.phase('drain'):
+                for thread in threads:
+                    while thread.is_alive():
+                        thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            print("\n[中断] 停止派发新任务，等待进行中的请求结束...")
+            stop_workers()
+            for thread in threads:
+                thread.join()
+            with self._lock:
+                self.stats['skipped'] = self._queued - self._processed()
+            raise
+        finally:
+            # 等待落后的对冲请求结束后再关闭连接
+            if self._request_pool is not None:
+                self._request_pool.shutdown(wait=True)
+                self._request_pool = None
+            self.elapsed = time.monotonic() - started
+            self.metrics.inc('phase_seconds_total', self.elapsed, phase='download')
+            self.close_sessions()
+            with self.metrics.phase('save'):
+                self.save_validators()
+                self.journal.save()
+                with self._lock:
+                    self.audio_index.save(merge=True)
         
-        if total == 0:
+        if self._queued == 0:
             print("[完成] 所有单词音频已存在，无需下载")
-            return
+    
+    def download_missing_audio(self, words_to_download: Set[str], words_to_refresh: Optional[Set[str]] = None):
+        """批量下载已知的一组单词（下载线程 + 每个提供商的令牌桶限速）
         
-        print(f"\n[下载] 开始下载 {total} 个单词的音频...\n")
+        words_to_refresh 中的单词已有本地文件，发送条件请求，只在服务器内容变化时重新下载
+        """
+        words_to_refresh = set(w for w in words_to_refresh or () if self.owns(w)) - set(words_to_download)
+        words_to_download = set(w for w in words_to_download if self.owns(w))
         
-        words_list = sorted(words_to_download)
+        def produce():
+            for word in sorted(words_to_download):
+                self._enqueue(word)
+            for word in sorted(words_to_refresh):
+                self._enqueue(word, conditional=True)
         
-        for idx, word in enumerate(words_list, 1):
-            print(f"[{idx}/{total}] 下载: {word}", end=' ')
-            
-            if self.download_audio(word):
-                print("[OK]")
-                self.stats['downloaded'] += 1
-            else:
-                print("[FAIL]")
-                self.stats['failed'] += 1
-            
-            # 请求间隔延迟
-            if idx < total:
-                time.sleep(self.request_delay)
+        self._run_pipeline(produce)
+    
+    def owns(self, word: str) -> bool:
+        """单词是否属于本进程的分片（未分片时总是 True）"""
+        return self.shard is None or shard_of(word, self.shard[1]) == self.shard[0]
+    
+    def stream_words(self, existing_words: Set[str]) -> None:
+        """边扫描边入队：每解析完一个词库文件就把其中需要下载的新单词加入队列
+        
+        config.json 中启用的词库最先扫描，其单词在队列中也排在前面。
+        """
+        enabled = load_enabled_libraries(self.words_dir)
+        corpus = open_corpus(self.words_dir)
+        seen: Set[str] = set()
+        files = 0
+        deferred = 0
+        other_shard = 0
+        print(f"[扫描] 扫描单词文件（{len(enabled)} 个启用的词库优先）...")
+        for corpus_file in corpus.stream(first=lambda rel: is_enabled_library(rel, enabled)):
+            files += 1
+            if corpus_file.path.name in ('config.json', 'manifest.json'):
+                continue
+            if not corpus_file.valid_json:
+                print(f"  [警告] 解析文件失败 {corpus_file.path.name}: 不是有效的 JSON")
+                continue
+            is_enabled = is_enabled_library(corpus_file.rel, enabled)
+            for word in sorted(corpus_file.details):
+                if word in seen:
+                    continue
+                seen.add(word)
+                if not self.owns(word):
+                    # 由其他分片进程处理
+                    other_shard += 1
+                    continue
+                if word in existing_words:
+                    # --refresh 时已有的音频也发送条件请求复查
+                    if self.refresh:
+                        self._enqueue(word, conditional=True, enabled=is_enabled)
+                    continue
+                # 之前失败、仍在退避期内的单词本次不重试
+                if not self.retry_failed and self.journal.retry_at(word) is not None:
+                    deferred += 1
+                    continue
+                self._enqueue(word, enabled=is_enabled)
+        
+        self.stats['total_words'] = len(seen) - other_shard
+        self.stats['deferred'] = deferred
+        self.stats['other_shard'] = other_shard
+        print(f"[扫描] 扫描完成：{files} 个 JSON 文件（解析 {corpus.last_parsed} 个，其余来自缓存），"
+              f"{len(seen)} 个唯一单词，入队 {self._queued} 个")
+        if other_shard:
+            print(f"   {other_shard} 个单词属于其他分片，由其他进程处理")
+        if deferred:
+            print(f"   {deferred} 个之前失败的单词仍在退避期内，本次跳过")
     
     def print_statistics(self):
         """打印下载统计信息"""
@@ -199,48 +813,108 @@ class WordAudioDownloader:
         print("[统计] 下载统计")
         print("=" * 50)
         print(f"总单词数:     {self.stats['total_words']}")
+        if self.shard is not None:
+            print(f"分片:         {self.shard[0]}/{self.shard[1]}（其他分片 {self.stats['other_shard']} 个单词）")
         print(f"已存在文件:   {self.stats['existing_files']}")
         print(f"成功下载:     {self.stats['downloaded']}")
         print(f"下载失败:     {self.stats['failed']}")
+        if self.refresh:
+            print(f"刷新已更新:   {self.stats['updated']}")
+            print(f"刷新未变化:   {self.stats['unchanged']}")
+        if self.stats['skipped'] > 0:
+            print(f"中断跳过:     {self.stats['skipped']}")
+        if self.stats['deferred'] > 0:
+            print(f"退避中未重试: {self.stats['deferred']}")
+        if self.stats['incomplete'] > 0:
+            print(f"不完整重下:   {self.stats['incomplete']}")
+        if len(self.providers) > 1:
+            print(f"对冲请求:     {self.stats['hedged']}")
+            print(f"故障转移:     {self.stats['failover']}")
+            wins = ', '.join(f"{p.name} {self.provider_wins[p.name]}" for p in self.providers)
+            print(f"采用提供商:   {wins}")
+        item_times = self.metrics.values('item_duration_seconds')
+        if item_times and self.elapsed > 0:
+            p50, p95, p99 = (self.metrics.quantile('item_duration_seconds', q) * 1000 for q in (0.5, 0.95, 0.99))
+            print(f"单词耗时:     p50 {p50:.0f} ms / p95 {p95:.0f} ms / p99 {p99:.0f} ms / 最大 {item_times[-1] * 1000:.0f} ms")
+            print(f"吞吐:         {len(item_times) / self.elapsed:.1f} 个/秒（{self.elapsed:.1f} 秒）")
+            requests_sent = self.metrics.total('requests_total')
+            print(f"HTTP 请求:    {requests_sent:.0f} 次，重试 {self.metrics.total('retries_total'):.0f} 次，"
+                  f"{self.metrics.total('response_bytes_total') / 1024 / 1024:.1f} MB")
         print("=" * 50)
         
-        if self.stats['failed'] > 0:
-            print("[警告] 部分文件下载失败，请稍后重新运行脚本重试")
-        elif self.stats['downloaded'] > 0:
+        if self.stats['failed'] > 0 or self.stats['skipped'] > 0:
+            print("[警告] 部分文件下载失败或未完成，请稍后重新运行脚本重试")
+        elif self.stats['deferred'] > 0:
+            print("[提示] 之前失败的单词仍在退避期内，可用 --retry-failed 立即重试")
+        elif self.stats['downloaded'] > 0 or self.stats['updated'] > 0:
             print("[完成] 所有音频文件下载完成！")
         else:
             print("[完成] 所有音频文件已是最新状态！")
     
     def run(self):
-        """运行下载流程"""
+        """运行下载流程：扫描词库和下载同时进行"""
         print("\n" + "=" * 50)
         print("[音频下载] 单词音频批量下载工具")
         print("=" * 50 + "\n")
+        if self.shard is not None:
+            print(f"[分片] 本进程处理第 {self.shard[0]}/{self.shard[1]} 份单词\n")
         
-        # 1. 收集所有单词
-        all_words = self.collect_all_words()
-        self.stats['total_words'] = len(all_words)
-        
-        # 2. 检查已存在的音频文件
-        print("\n[检查] 检查已存在的音频文件...")
-        existing_words = self.get_existing_audio_files()
+        # 1. 检查已存在的音频文件（读取音频索引，日志用于校验文件完整性和失败退避）
+        print("[检查] 检查已存在的音频文件...")
+        with self.metrics.phase('index'):
+            self.journal.load()
+            existing_words = self.get_existing_audio_files()
+            self.load_validators()
         self.stats['existing_files'] = len(existing_words)
         print(f"   已存在 {len(existing_words)} 个音频文件")
         
-        # 3. 计算需要下载的单词
-        words_to_download = all_words - existing_words
+        # 2. 扫描词库，每个文件解析完就把缺失的单词交给下载线程
+        def produce():
+            with self.metrics.phase('scan'):
+                self.stream_words(existing_words)
         
-        # 4. 下载缺失的音频
-        self.download_missing_audio(words_to_download)
+        self._run_pipeline(produce)
         
-        # 5. 打印统计信息
+        # 3. 打印统计信息
         self.print_statistics()
 
 
 def main():
     """主函数"""
-    downloader = WordAudioDownloader()
+    parser = argparse.ArgumentParser(description="批量下载单词音频（在线 TTS，默认有道）")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="并发下载线程数（默认 4）")
+    parser.add_argument("--rate", type=float, default=None, help="所有线程合计的每秒请求数上限（默认约 3.3，0 = 不限速）")
+    parser.add_argument("--refresh", action="store_true", help="对已有音频发送条件请求（ETag / Last-Modified），只重新下载有变化的")
+    parser.add_argument("--retry-failed", action="store_true", help="忽略退避时间，立即重试之前失败的单词")
+    parser.add_argument("--providers", default=DEFAULT_PROVIDER,
+                        help="按优先级排列的提供商，逗号分隔：youdao,baidu,google（默认 youdao）")
+    parser.add_argument("--hedge-ms", type=float, default=None,
+                        help="在途请求超过这么多毫秒未返回时同时请求下一个提供商（默认只在失败时转移）")
+    parser.add_argument("--base-url", default=None,
+                        help="把所有提供商指向另一个地址（如本地 mock_tts_server.py: http://127.0.0.1:8765）")
+    parser.add_argument("--metrics-dir", type=Path, default=Path(__file__).resolve().parent / METRICS_DIR_NAME,
+                        help="运行指标（JSON 和 Prometheus 文本格式）的输出目录（默认 tools/metrics）")
+    parser.add_argument("--live-metrics", action="store_true", help="在 stderr 上实时显示请求数、延迟和错误数")
+    parser.add_argument("--shard", default=None, metavar="I/N",
+                        help="只处理按单词哈希分成 N 份中的第 I 份，N 个进程可同时对同一目录运行（如 1/3）")
+    args = parser.parse_args()
+    
+    try:
+        providers = resolve_providers(args.providers.split(','), base_url=args.base_url)
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    
+    # 分片进程各写一份指标文件
+    tool = f"download_word_audio-shard{shard[0]}of{shard[1]}" if shard else 'download_word_audio'
+    downloader = WordAudioDownloader(
+        workers=args.workers, rate=args.rate, refresh=args.refresh, retry_failed=args.retry_failed,
+        providers=providers, hedge_after=args.hedge_ms / 1000 if args.hedge_ms is not None else None,
+        metrics=Metrics(tool), shard=shard
+    )
     
+    if args.live_metrics:
+        downloader.metrics.start_live()
     try:
         downloader.run()
     except KeyboardInterrupt:
@@ -250,6 +924,10 @@ def main():
         print(f"\n\n[错误] 发生错误: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        downloader.metrics.stop_live()
+        json_path, prom_path = downloader.metrics.write(args.metrics_dir)
+        print(f"[指标] {json_path}，{prom_path}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Inter-process file locks for state files shared by several tool processes.
+
+Several download_word_audio.py processes may work on the same proj/audio
+directory (see --shard). Their shared state files (index.json, the download
+journal, the HTTP validators) are read, merged and rewritten while holding
+an exclusive lock on a sibling "<name>.lock" file:
+
+    with file_lock(audio_dir / "index.json"):
+        ...  # re-read, merge, write atomically
+
+Uses fcntl.flock on Unix and msvcrt.locking on Windows. The lock is
+released when the block exits (or the process dies), and the .lock file is
+left in place.
+"""
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+LOCK_SUFFIX = ".lock"
+
+
+def lock_path(path: Path) -> Path:
+    return path.with_name(path.name + LOCK_SUFFIX)
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on path + ".lock" for the duration of the block (blocking)."""
+    target = lock_path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(target, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            # LK_LOCK retries for about 10 seconds before raising; keep waiting
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Minimal directory watchers used by `scan_words.py --watch`.
+
+Two interchangeable implementations, both standard-library only:
+
+- InotifyWatcher: Linux inotify through ctypes, one watch per directory,
+  new sub-directories are picked up automatically
+- PollingWatcher: periodic stat() snapshot diff, works everywhere
+
+Both expose the same interface:
+
+    watcher.poll(timeout) -> Set[Path]   # paths that may have changed
+    watcher.close()
+
+poll(None) blocks until something changes; poll(t) returns an empty set if
+nothing happened within t seconds. Returned paths can be files or
+directories (a directory means "anything below here may have changed");
+callers decide what still exists by looking at the filesystem.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Detect changes by diffing (mtime_ns, size) snapshots every `interval` seconds."""
+
+    def __init__(self, root: Path, suffix: str = ".json", interval: float = 1.0):
+        self.root = root
+        self.suffix = suffix.lower()
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+        self._next_scan = time.monotonic() + interval
+
+    def _take_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot: Dict[Path, Tuple[int, int]] = {}
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.lower().endswith(self.suffix):
+                    continue
+                path = Path(dirpath) / name
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self, timeout: Optional[float] = None) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            wake = self._next_scan if deadline is None else min(self._next_scan, deadline)
+            if wake > now:
+                time.sleep(wake - now)
+            if time.monotonic() >= self._next_scan:
+                self._next_scan = time.monotonic() + self.interval
+                current = self._take_snapshot()
+                changed = {p for p in current.keys() | self._snapshot.keys()
+                           if current.get(p) != self._snapshot.get(p)}
+                self._snapshot = current
+                if changed:
+                    return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+
+    def close(self) -> None:
+        self._snapshot = {}
+
+
+class InotifyWatcher:
+    """Recursive watcher on top of Linux inotify (via ctypes)."""
+
+    def __init__(self, root: Path):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.root = root
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        self._wd_to_dir: Dict[int, Path] = {}
+        # Move cookie -> directory that left its parent (IN_MOVED_FROM) and has
+        # not arrived anywhere in the tree (IN_MOVED_TO) yet
+        self._moved_from: Dict[int, Path] = {}
+        self._add_tree(root)
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            # The directory may already be gone again; anything else is fatal
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(err, f"inotify_add_watch({directory}) failed: {os.strerror(err)}")
+        self._wd_to_dir[wd] = directory
+
+    def _add_tree(self, directory: Path) -> None:
+        self._add_watch(directory)
+        for dirpath, dirnames, _filenames in os.walk(directory):
+            for name in dirnames:
+                self._add_watch(Path(dirpath) / name)
+
+    def poll(self, timeout: Optional[float] = None) -> Set[Path]:
+        changed: Set[Path] = set()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return changed
+
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, name_len = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b"\0")
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost; ask the caller to rescan everything
+                    changed.add(self.root)
+                    continue
+                directory = self._wd_to_dir.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._wd_to_dir.pop(wd, None)
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    moved_out = [c for c, path in self._moved_from.items() if path == directory]
+                    if mask & IN_MOVE_SELF and moved_out:
+                        # No IN_MOVED_TO re-mapped this wd to a new path: it left the
+                        # tree. (After a rename inside the tree the wd already maps to
+                        # the new path, and the watch stays.)
+                        for c in moved_out:
+                            del self._moved_from[c]
+                        self._drop_tree(directory)
+                    changed.add(directory)
+                    continue
+
+                path = directory / os.fsdecode(name) if name else directory
+                if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                    self._moved_from[cookie] = path
+                if mask & IN_MOVED_TO:
+                    self._moved_from.pop(cookie, None)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files may have landed before the watch existed
+                    self._add_tree(path)
+                changed.add(path)
+        return changed
+
+    def _drop_tree(self, directory: Path) -> None:
+        """Remove the watches of directory and the directories below it."""
+        for wd, path in list(self._wd_to_dir.items()):
+            if path == directory or directory in path.parents:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                self._wd_to_dir.pop(wd, None)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(root: Path, interval: float = 1.0, force_polling: bool = False):
+    """Return an InotifyWatcher when available, otherwise a PollingWatcher."""
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, interval=interval)
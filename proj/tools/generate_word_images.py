@@ -2,10 +2,36 @@
 """
 Generate illustrative images for words using SiliconFlow (硅基流动) image API.
 
-- Input words are read from words.csv generated by scan_words.py
+- Input words come from the shared word corpus (word_corpus.py, cached in
+  proj/words/.scan_cache), in the same order as words.csv; pass --csv to read
+  a words.csv file instead
 - Each word is generated once and saved as a JPEG image
+- <output-dir>/.generation_manifest.json records, per image, a hash of the
+  word and every generation parameter (final prompt, negative_prompt, model,
+  size, guidance_scale, num_inference_steps). --stale-only regenerates
+  exactly the images whose hash no longer matches the current parameters;
+  before each run a plan reports how many images are missing, stale,
+  current, untracked (no manifest record, e.g. made before the manifest
+  existed; --adopt-existing records them as current) or edited (file changed
+  since it was generated, never overwritten without --force), and how many
+  API calls the run will make (--dry-run stops after the plan)
 - Configuration is persisted in a JSON file (apiKey/model/promptConstraints/guidance_scale/num_inference_steps/negative_prompt)
 - Run-time results and statuses are written to a .log file (not JSON)
+- --concurrency N generates N words in parallel. Requests share one adaptive
+  rate limit (rate_limit.AdaptiveRateLimiter): starting at one call per
+  --delay seconds, it halves on 429/5xx, pauses for Retry-After, and ramps
+  back up after successes. Log lines keep the word-list order
+- API calls and image downloads reuse keep-alive connections (http_pool.py,
+  one per worker thread); image bytes are streamed (or base64-decoded) into
+  a temp file next to the output and converted to JPEG from there (JPEG
+  responses are kept as they are, without re-encoding). --variants then
+  refreshes the thumbnail / WebP / progressive JPEG variants
+  (image_variants.py).
+  mock_image_api.py is a local stand-in API with configurable latency for
+  offline benchmarks (--base-url http://127.0.0.1:8799)
+- Run metrics (request latency histograms, HTTP statuses, bytes, retries,
+  throttling, time per phase) are written to tools/metrics/generate_word_images.json and
+  .prom (Prometheus text format); --live-metrics shows a status line on stderr
 
 API key sources (priority):
 1) --api-key argument
@@ -16,7 +42,7 @@ Usage examples:
   python3 generate_word_images.py \
     --limit 50 \
     --model kolors \
-    --csv ../words/words.csv \
+    --words-dir ../words \
     --output-dir ../images/generated
 
   # Initialize or update apiKey in the log JSON
@@ -37,6 +63,13 @@ Usage examples:
   # Override parameters for a single run (without saving to JSON)
   python3 generate_word_images.py --word apple --guidance-scale 4.0 --inference-steps 20
 
+  # After changing promptConstraints etc.: see what is out of date, then regenerate only that
+  python3 generate_word_images.py --stale-only --dry-run
+  python3 generate_word_images.py --stale-only --limit 500
+
+  # Generate 4 words at a time, at most one API call every 0.5 seconds
+  python3 generate_word_images.py --limit 200 --concurrency 4 --delay 0.5
+
 Notes:
 - This script requires Pillow for JPEG conversion if the API returns PNG bytes
   pip install pillow
@@ -47,26 +80,57 @@ from __future__ import annotations
 import argparse
 import base64
 import csv
-import io
+import hashlib
 import json
 import os
 import re
 import sys
+import tempfile
+import threading
 import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
 
 try:
     from PIL import Image  # type: ignore
 except Exception:  # pragma: no cover - optional dependency checked at runtime
     Image = None  # type: ignore
 
-import urllib.request
+import urllib.error
+
+from http_pool import HTTPPool
+from image_variants import build_variants, default_source_dirs, is_jpeg, print_report
+from rate_limit import AdaptiveRateLimiter, parse_retry_after
+from tool_metrics import METRICS_DIR_NAME, Metrics
+from word_corpus import get_corpus
 
 
 WORD_TOKEN = re.compile(r"^[A-Za-z][A-Za-z\-']+[A-Za-z]$|^[A-Za-z]{2,}$")
 
+STREAM_CHUNK_BYTES = 64 * 1024
+# Multiple of 4, so every slice of a base64 string decodes on its own
+B64_CHUNK_CHARS = 4 * 16 * 1024
+
+# Process umask, read once at import (os.umask can only be read by setting it, which is not thread-safe)
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# Keep-alive connections shared by the HTTP helpers unless a pool is passed in
+DEFAULT_POOL = HTTPPool()
+
+MANIFEST_NAME = ".generation_manifest.json"
+MANIFEST_VERSION = 1
+
+# Image states against the generation manifest
+MISSING = "missing"      # no image file
+CURRENT = "current"      # generated with the current parameters
+STALE = "stale"          # generated with other parameters
+UNTRACKED = "untracked"  # image without a manifest record
+EDITED = "edited"        # image file changed since it was generated
+
 
 @dataclass
 class GenerationResult:
@@ -255,22 +319,74 @@ def resolve_negative_prompt(cli_negative: Optional[str], log_data: Dict[str, dic
     return ""
 
 
-def http_post_json(url: str, headers: Dict[str, str], payload: dict, timeout: int = 60) -> dict:
-    req = urllib.request.Request(url=url, data=json.dumps(payload).encode("utf-8"), headers=headers, method="POST")
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        if resp.status < 200 or resp.status >= 300:
-            raise RuntimeError(f"HTTP {resp.status}: {resp.read().decode('utf-8', errors='ignore')}")
-        return json.loads(resp.read().decode("utf-8"))
+def _timed_request(
+    method: str,
+    url: str,
+    endpoint: str,
+    metrics: Optional[Metrics],
+    pool: Optional[HTTPPool] = None,
+    timeout: int = 120,
+    body: Optional[bytes] = None,
+    headers: Optional[Dict[str, str]] = None,
+    sink: Optional[BinaryIO] = None,
+) -> Tuple[int, bytes]:
+    """One request over a keep-alive connection, recording latency, status and size in metrics.
+
+    Returns (status, body); with `sink` the body is streamed into it in
+    chunks instead and the returned body is empty.
+    """
+    started = time.monotonic()
+    nbytes = 0
+    try:
+        with (pool or DEFAULT_POOL).request(method, url, body=body, headers=headers, timeout=timeout) as resp:
+            status = resp.status
+            if sink is None:
+                data = resp.read()
+                nbytes = len(data)
+            else:
+                data = b""
+                for chunk in iter(lambda: resp.read(STREAM_CHUNK_BYTES), b""):
+                    sink.write(chunk)
+                    nbytes += len(chunk)
+    except urllib.error.HTTPError as e:
+        if metrics is not None:
+            metrics.record_request(endpoint, time.monotonic() - started, e.code)
+        raise
+    except Exception:
+        if metrics is not None:
+            metrics.record_request(endpoint, time.monotonic() - started, "error")
+        raise
+    if metrics is not None:
+        metrics.record_request(endpoint, time.monotonic() - started, status, nbytes)
+    return status, data
+
+
+def http_post_json(
+    url: str,
+    headers: Dict[str, str],
+    payload: dict,
+    timeout: int = 60,
+    metrics: Optional[Metrics] = None,
+    pool: Optional[HTTPPool] = None,
+) -> dict:
+    status, body = _timed_request(
+        "POST", url, "images-api", metrics, pool, timeout, body=json.dumps(payload).encode("utf-8"), headers=headers
+    )
+    if status < 200 or status >= 300:
+        raise RuntimeError(f"HTTP {status}: {body.decode('utf-8', errors='ignore')}")
+    return json.loads(body.decode("utf-8"))
 
 
-def _download_bytes(url: str, timeout: int = 120) -> bytes:
-    with urllib.request.urlopen(url, timeout=timeout) as resp:
-        if resp.status < 200 or resp.status >= 300:
-            raise RuntimeError(f"HTTP {resp.status} downloading {url}")
-        return resp.read()
+def _download_to(
+    url: str, sink: BinaryIO, timeout: int = 120, metrics: Optional[Metrics] = None, pool: Optional[HTTPPool] = None
+) -> None:
+    """Stream an image URL into sink without holding it in memory."""
+    status, _ = _timed_request("GET", url, "image-download", metrics, pool, timeout, sink=sink)
+    if status < 200 or status >= 300:
+        raise RuntimeError(f"HTTP {status} downloading {url}")
 
 
-def generate_image_bytes(
+def request_image(
     api_key: str,
     model: str,
     prompt: str,
@@ -281,7 +397,10 @@ def generate_image_bytes(
     base_url: str = "https://api.siliconflow.cn",
     endpoint: str = "/v1/images/generations",
     timeout: int = 120,
-) -> bytes:
+    metrics: Optional[Metrics] = None,
+    pool: Optional[HTTPPool] = None,
+) -> Tuple[str, str]:
+    """Call the generation API; returns ("b64", data) or ("url", image URL)."""
     url = base_url.rstrip("/") + endpoint
     headers = {
         "Content-Type": "application/json",
@@ -299,44 +418,199 @@ def generate_image_bytes(
     # Only add negative_prompt if it's not empty
     if negative_prompt:
         body["negative_prompt"] = negative_prompt
-    data = http_post_json(url, headers, body, timeout=timeout)
+    data = http_post_json(url, headers, body, timeout=timeout, metrics=metrics, pool=pool)
     # Flexible response handling: prefer b64_json, fallback to url (data or images)
     if isinstance(data, dict):
         if "data" in data and isinstance(data["data"], list) and data["data"]:
             first = data["data"][0]
             if isinstance(first, dict):
                 if first.get("b64_json"):
-                    return base64.b64decode(first["b64_json"])  # type: ignore[arg-type]
+                    return "b64", first["b64_json"]  # type: ignore[return-value]
                 if first.get("url"):
-                    return _download_bytes(first["url"], timeout=timeout)  # type: ignore[arg-type]
+                    return "url", first["url"]  # type: ignore[return-value]
         if "images" in data and isinstance(data["images"], list) and data["images"]:
             first_img = data["images"][0]
             if isinstance(first_img, dict) and first_img.get("url"):
-                return _download_bytes(first_img["url"], timeout=timeout)  # type: ignore[arg-type]
+                return "url", first_img["url"]  # type: ignore[return-value]
     raise RuntimeError(f"Unexpected response structure (no b64_json or url): {str(data)[:200]}")
 
 
-def ensure_jpeg(image_bytes: bytes) -> bytes:
+def generate_image_bytes(
+    api_key: str,
+    model: str,
+    prompt: str,
+    size: str = "300x300",
+    guidance_scale: float = 7.5,
+    num_inference_steps: int = 20,
+    negative_prompt: str = "",
+    base_url: str = "https://api.siliconflow.cn",
+    endpoint: str = "/v1/images/generations",
+    timeout: int = 120,
+    metrics: Optional[Metrics] = None,
+    pool: Optional[HTTPPool] = None,
+    *,
+    sink: BinaryIO,
+) -> None:
+    """Generate one image and write its bytes into sink, without holding a downloaded image in memory.
+
+    The API call and the image download reuse keep-alive connections (pool);
+    a base64 response is decoded slice by slice, an image URL is streamed.
+    """
+    kind, value = request_image(
+        api_key, model, prompt, size, guidance_scale, num_inference_steps, negative_prompt,
+        base_url, endpoint, timeout, metrics, pool,
+    )
+    if kind == "b64":
+        for start in range(0, len(value), B64_CHUNK_CHARS):
+            sink.write(base64.b64decode(value[start:start + B64_CHUNK_CHARS]))
+    else:
+        _download_to(value, sink, timeout=timeout, metrics=metrics, pool=pool)
+
+
+def generate_image_file(
+    api_key: str,
+    model: str,
+    prompt: str,
+    dest_dir: Path,
+    size: str = "300x300",
+    guidance_scale: float = 7.5,
+    num_inference_steps: int = 20,
+    negative_prompt: str = "",
+    base_url: str = "https://api.siliconflow.cn",
+    endpoint: str = "/v1/images/generations",
+    timeout: int = 120,
+    metrics: Optional[Metrics] = None,
+    pool: Optional[HTTPPool] = None,
+) -> Path:
+    """generate_image_bytes into a temp file in dest_dir; returns its path, the caller deletes it."""
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=dest_dir, prefix=".", suffix=".download", delete=False) as f:
+        try:
+            generate_image_bytes(
+                api_key, model, prompt, size, guidance_scale, num_inference_steps, negative_prompt,
+                base_url, endpoint, timeout, metrics, pool, sink=f,
+            )
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    return Path(f.name)
+
+
+def save_as_jpeg(source: Path, image_path: Path) -> str:
+    """Decode the image file `source` and atomically write it as JPEG to image_path; returns the JPEG's sha256.
+
+    A source that already is a JPEG is moved into place as it is (no decode, no quality loss).
+    """
+    with source.open("rb") as f:
+        if is_jpeg(f.read(3)):
+            digest = file_sha256(source)
+            # Temp files are created 0600; give the image the mode a normal write would
+            os.chmod(source, 0o666 & ~UMASK)
+            os.replace(source, image_path)
+            return digest
     if Image is None:
         raise RuntimeError("Pillow is required to convert image to JPEG. Install via: pip install pillow")
-    with io.BytesIO(image_bytes) as bio:
-        with Image.open(bio) as img:
-            rgb = img.convert("RGB")
-            out = io.BytesIO()
-            rgb.save(out, format="JPEG", quality=90)
-            return out.getvalue()
+    tmp_path = image_path.with_name(f".{image_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with Image.open(source) as img:
+            with tmp_path.open("wb") as out:
+                img.convert("RGB").save(out, format="JPEG", quality=90)
+        digest = file_sha256(tmp_path)
+        os.replace(tmp_path, image_path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+    return digest
+
+
+def compose_prompt(prompt_template: str, word: str) -> str:
+    """Final prompt for a word.
+
+    - If template contains {word}, replace it
+    - Otherwise, append a clear instruction about the specific word
+    """
+    if "{word}" in prompt_template:
+        return prompt_template.replace("{word}", word)
+    return f"{prompt_template} Represent the English word '{word}'."
+
+
+def generation_key(
+    word: str,
+    prompt: str,
+    negative_prompt: str,
+    model: str,
+    size: str,
+    guidance_scale: float,
+    num_inference_steps: int,
+) -> str:
+    """sha256 over the word and every parameter that affects the generated image."""
+    params = {
+        "word": word,
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "model": model,
+        "size": size,
+        "guidance_scale": float(guidance_scale),
+        "num_inference_steps": int(num_inference_steps),
+    }
+    return hashlib.sha256(json.dumps(params, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, dict]:
+    """word -> {"key", "sha256", "model", "size", "generated"} from the generation manifest."""
+    try:
+        data = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+        return {}
+    images = data.get("images")
+    return {w: r for w, r in images.items() if isinstance(r, dict)} if isinstance(images, dict) else {}
+
+
+def save_manifest(manifest_path: Path, images: Dict[str, dict]) -> None:
+    """Write the manifest atomically (temp file + rename)."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"version": MANIFEST_VERSION, "images": {w: images[w] for w in sorted(images)}}
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    os.replace(tmp_path, manifest_path)
+
+
+def manifest_record(key: str, image_sha256: str, model: str, size: str, generated: float) -> dict:
+    return {"key": key, "sha256": image_sha256, "model": model, "size": size, "generated": round(generated)}
+
+
+def classify_image(image_path: Path, key: str, record: Optional[dict]) -> str:
+    """MISSING, CURRENT, STALE, UNTRACKED or EDITED for one image and its manifest record."""
+    if not image_path.exists():
+        return MISSING
+    if record is None:
+        return UNTRACKED
+    if record.get("sha256") != file_sha256(image_path):
+        return EDITED
+    return CURRENT if record.get("key") == key else STALE
 
 
 def main() -> int:
     script_dir = Path(__file__).resolve().parent
-    default_csv = (script_dir.parent / "words" / "words.csv").resolve()
+    default_words_dir = (script_dir.parent / "words").resolve()
     default_output_dir = (script_dir.parent / "images" / "generated").resolve()
     default_config_path = (script_dir / "generate_word_images.json").resolve()
     default_log_file = (script_dir / "generate_word_images.log").resolve()
     default_csv_log = (script_dir / "generate_word_images_records.csv").resolve()
 
     parser = argparse.ArgumentParser(description="Generate word images via SiliconFlow")
-    parser.add_argument("--csv", type=Path, default=default_csv, help="Path to words.csv")
+    parser.add_argument("--words-dir", type=Path, default=default_words_dir, help="Directory of word JSON files (default: proj/words)")
+    parser.add_argument("--csv", type=Path, default=None, help="Read words from this words.csv instead of the word corpus")
     parser.add_argument("--output-dir", type=Path, default=default_output_dir, help="Directory to save JPEG images")
     parser.add_argument("--log", type=Path, default=default_config_path, help="Path to JSON config file (apiKey/model/promptConstraints)")
     parser.add_argument("--log-file", type=Path, default=default_log_file, help="Path to .log file for run-time statuses")
@@ -347,11 +621,16 @@ def main() -> int:
     parser.add_argument("--set-model", type=str, default=None, help="Persist default model into the log JSON and exit")
     parser.add_argument("--size", type=str, default="300x300", help="Image size, e.g., 300x300")
     parser.add_argument("--limit", type=int, default=20, help="Max number of words to process in this run")
-    parser.add_argument("--delay", type=float, default=1.0, help="Delay seconds between API calls")
+    parser.add_argument("--delay", type=float, default=1.0, help="Minimum seconds between API calls across all workers; lengthens on 429/5xx (0 = no limit)")
+    parser.add_argument("--concurrency", "-j", type=int, default=1, help="Number of words generated in parallel (default: 1)")
     parser.add_argument("--base-url", type=str, default="https://api.siliconflow.cn", help="SiliconFlow base URL")
     parser.add_argument("--endpoint", type=str, default="/v1/images/generations", help="Images generation endpoint path")
     parser.add_argument("--retry", type=int, default=2, help="Number of retries on failure")
     parser.add_argument("--force", action="store_true", help="Force regenerate even if previous result exists")
+    parser.add_argument("--stale-only", action="store_true", help="Only regenerate images whose generation parameters changed (see the manifest)")
+    parser.add_argument("--adopt-existing", action="store_true", help="Record existing images without a manifest entry as generated with the current parameters")
+    parser.add_argument("--variants", action="store_true", help="Afterwards refresh the image variants (thumbnails, WebP, progressive JPEG; see image_variants.py)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan (images and API calls) and exit without generating")
     parser.add_argument("--prompt", type=str, default=None, help="Prompt constraints template, supports {word}")
     parser.add_argument("--set-prompt", type=str, default=None, help="Persist prompt constraints into the log JSON and exit")
     parser.add_argument("--guidance-scale", type=float, default=None, help="Guidance scale (cfg), e.g., 7.5 (overrides log JSON)")
@@ -362,6 +641,8 @@ def main() -> int:
     parser.add_argument("--set-negative-prompt", type=str, default=None, help="Persist negative_prompt into the log JSON and exit")
     parser.add_argument("--words", type=str, default=None, help="Words to generate (bypass CSV), separated by ';' or ','")
     parser.add_argument("--word", action="append", default=None, help="Specify a word (can be repeated)")
+    parser.add_argument("--metrics-dir", type=Path, default=script_dir / METRICS_DIR_NAME, help="Directory for run metrics (JSON and Prometheus text format)")
+    parser.add_argument("--live-metrics", action="store_true", help="Show a live request/latency/error status line on stderr")
 
     args = parser.parse_args()
 
@@ -419,120 +700,288 @@ def main() -> int:
     # Resolve negative_prompt (JSON -> default empty, or CLI override)
     negative_prompt = resolve_negative_prompt(args.negative_prompt, log_data)
 
-    # Resolve words from CLI or CSV
-    if args.words or args.word:
-        cli_words: List[str] = []
-        if args.words:
-            # Split by semicolon or comma (also accept full-width '；')
-            for w in re.split(r"[;,；]", args.words):
-                if w.strip():
-                    cli_words.append(w.strip())
-        if args.word:
-            cli_words.extend([w.strip() for w in args.word if w and w.strip()])
-        all_words = cli_words
-    else:
-        all_words = read_csv_words(args.csv)
-    valid_words = filter_valid_words(all_words)
-
-    args.output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Clear old logs and initialize new ones
-    clear_log(args.log_file)
-    init_csv_log(args.csv_log)
-    print(f"[INFO] Cleared old logs, starting new run")
-
-    processed = 0
-    for word in valid_words:
-        if processed >= args.limit:
-            break
-        image_path = args.output_dir / f"{word}.jpg"
-        if not args.force and image_path.exists():
-            # Skip if file exists and not forcing
-            continue
-
-        # Compose final prompt:
-        # - If template contains {word}, replace it
-        # - Otherwise, append a clear instruction about the specific word
-        if "{word}" in prompt_template:
-            prompt = prompt_template.replace("{word}", word)
-        else:
-            prompt = f"{prompt_template} Represent the English word '{word}'."
-        attempt = 0
-        last_exc: Optional[Exception] = None
-        while attempt <= max(0, args.retry):
-            try:
-                raw_bytes = generate_image_bytes(
-                    api_key=api_key,
-                    model=resolved_model,
-                    prompt=prompt,
-                    size=args.size,
-                    guidance_scale=guidance_scale,
-                    num_inference_steps=num_inference_steps,
-                    negative_prompt=negative_prompt,
-                    base_url=args.base_url,
-                    endpoint=args.endpoint,
-                    timeout=120,
+    metrics = Metrics("generate_word_images")
+    http_pool = HTTPPool(timeout=120)
+    if args.live_metrics:
+        metrics.start_live()
+    try:
+        # Resolve words from CLI, CSV or the shared word corpus
+        with metrics.phase("words"):
+            if args.words or args.word:
+                cli_words: List[str] = []
+                if args.words:
+                    # Split by semicolon or comma (also accept full-width '；')
+                    for w in re.split(r"[;,；]", args.words):
+                        if w.strip():
+                            cli_words.append(w.strip())
+                if args.word:
+                    cli_words.extend([w.strip() for w in args.word if w and w.strip()])
+                all_words = cli_words
+            elif args.csv is not None:
+                all_words = read_csv_words(args.csv)
+            else:
+                all_words = get_corpus(args.words_dir).ordered_words()
+            valid_words = filter_valid_words(all_words)
+
+        # Plan: compare every word's parameter hash with the manifest
+        manifest_path = args.output_dir / MANIFEST_NAME
+        manifest = load_manifest(manifest_path)
+        manifest_dirty = False
+        keys: Dict[str, str] = {}
+        states: Counter = Counter()
+        plan: List[str] = []
+        wanted = STALE if args.stale_only else MISSING
+        with metrics.phase("plan"):
+            for word in valid_words:
+                if word in keys:
+                    continue
+                keys[word] = generation_key(
+                    word, compose_prompt(prompt_template, word), negative_prompt,
+                    resolved_model, args.size, guidance_scale, num_inference_steps,
                 )
-                last_exc = None
-                break
-            except Exception as e:  # noqa: BLE001
-                last_exc = e
-                attempt += 1
-                if attempt > args.retry:
+                image_path = args.output_dir / f"{word}.jpg"
+                state = classify_image(image_path, keys[word], manifest.get(word))
+                states[state] += 1
+                if state == UNTRACKED and args.adopt_existing:
+                    manifest[word] = manifest_record(
+                        keys[word], file_sha256(image_path), resolved_model, args.size, image_path.stat().st_mtime
+                    )
+                    manifest_dirty = True
+                    state = CURRENT
+                if args.force or state == wanted:
+                    plan.append(word)
+        calls = min(len(plan), max(0, args.limit))
+        mode = "force" if args.force else ("stale-only" if args.stale_only else "missing")
+        print(
+            f"[PLAN] {len(keys)} word(s): " + ", ".join(f"{states[s]} {s}" for s in (MISSING, STALE, CURRENT, UNTRACKED, EDITED))
+        )
+        print(f"[PLAN] Mode {mode}: {len(plan)} image(s) to generate, {calls} API call(s) this run (--limit {args.limit}, plus retries)")
+        if args.adopt_existing and manifest_dirty:
+            print(f"[PLAN] Adopted {states[UNTRACKED]} untracked image(s) with the current parameters")
+        elif states[UNTRACKED] and args.stale_only:
+            print("[PLAN] Untracked images are not regenerated; --adopt-existing records them with the current parameters")
+        if args.dry_run:
+            return 0
+        if manifest_dirty:
+            save_manifest(manifest_path, manifest)
+            manifest_dirty = False
+
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Clear old logs and initialize new ones
+        clear_log(args.log_file)
+        init_csv_log(args.csv_log)
+        print(f"[INFO] Cleared old logs, starting new run")
+
+        throttle = AdaptiveRateLimiter(1.0 / args.delay if args.delay > 0 else 0.0)
+        metrics.set("rate_limit_per_second", throttle.rate, endpoint="images-api")
+        stop = threading.Event()
+        # Worker threads and the main thread share the console; whole lines only
+        console_lock = threading.Lock()
+
+        def say(line: str) -> None:
+            with console_lock:
+                print(line, flush=True)
+
+        def process_word(word: str) -> Dict[str, object]:
+            """Generate, convert and save the image for one word; returns its log entry."""
+            image_path = args.output_dir / f"{word}.jpg"
+            prompt = compose_prompt(prompt_template, word)
+            attempt = 0
+            last_exc: Optional[Exception] = None
+            word_started = time.monotonic()
+            while attempt <= max(0, args.retry):
+                if attempt:
+                    metrics.inc("retries_total")
+                waited = time.monotonic()
+                if not throttle.acquire(stop_event=stop):
+                    last_exc = RuntimeError("interrupted")
                     break
-                time.sleep(min(5.0, 0.5 * (2 ** (attempt - 1))))
+                metrics.observe("rate_limit_wait_seconds", time.monotonic() - waited, endpoint="images-api")
+                try:
+                    with metrics.phase("generate"):
+                        raw_path = generate_image_file(
+                            api_key=api_key,
+                            model=resolved_model,
+                            prompt=prompt,
+                            size=args.size,
+                            guidance_scale=guidance_scale,
+                            num_inference_steps=num_inference_steps,
+                            negative_prompt=negative_prompt,
+                            base_url=args.base_url,
+                            endpoint=args.endpoint,
+                            timeout=120,
+                            metrics=metrics,
+                            pool=http_pool,
+                            dest_dir=args.output_dir,
+                        )
+                    last_exc = None
+                    metrics.set("rate_limit_per_second", throttle.on_success(), endpoint="images-api")
+                    break
+                except Exception as e:  # noqa: BLE001
+                    last_exc = e
+                    attempt += 1
+                    if isinstance(e, urllib.error.HTTPError) and (e.code == 429 or e.code >= 500):
+                        # Rate limited or overloaded: slow every worker down; the throttle paces the retry
+                        retry_after = parse_retry_after(e.headers.get("Retry-After") if e.headers else None)
+                        rate = throttle.on_throttle(retry_after)
+                        metrics.inc("throttled_total", status=e.code)
+                        metrics.set("rate_limit_per_second", rate, endpoint="images-api")
+                        say(f"[WARN] {word}: HTTP {e.code}, rate now {rate:.2f}/s"
+                            + (f", retrying after {retry_after:g}s" if retry_after else ""))
+                        continue
+                    if attempt > args.retry:
+                        break
+                    if stop.wait(min(5.0, 0.5 * (2 ** (attempt - 1)))):
+                        break
 
-        if last_exc is not None:
-            print(f"[ERROR] {word}: {last_exc}")
             # 创建完整的提示词（可直接复制到其他 AI 软件使用）
             complete_prompt = f"生成单词对应图片: {word}\n\nPrompt: {prompt}\n\nNegative Prompt: {negative_prompt}"
-            error_entry = {
+            entry: Dict[str, object] = {
                 "ts": time.time(),
                 "word": word,
-                "status": "error",
+                "status": "error" if last_exc is not None else "ok",
                 "complete_prompt": complete_prompt,
+            }
+            if last_exc is not None:
+                metrics.inc("items_total", result="error")
+                metrics.observe("item_duration_seconds", time.monotonic() - word_started)
+                entry.update({
+                    "model": resolved_model,
+                    "size": args.size,
+                    "guidance_scale": guidance_scale,
+                    "num_inference_steps": num_inference_steps,
+                    "prompt": prompt,
+                    "negative_prompt": negative_prompt,
+                    "error": str(last_exc),
+                })
+                return entry
+
+            try:
+                with metrics.phase("convert"):
+                    image_sha256 = save_as_jpeg(raw_path, image_path)
+            finally:
+                if raw_path.exists():
+                    raw_path.unlink()
+
+            entry.update({
+                "ts": time.time(),
+                "image_path": str(image_path),
                 "model": resolved_model,
                 "size": args.size,
                 "guidance_scale": guidance_scale,
                 "num_inference_steps": num_inference_steps,
                 "prompt": prompt,
                 "negative_prompt": negative_prompt,
-                "error": str(last_exc),
-            }
-            append_log(args.log_file, error_entry)
-            append_csv_log(args.csv_log, error_entry)
-            time.sleep(max(0.0, args.delay))
-            continue
-
-        jpeg_bytes = ensure_jpeg(raw_bytes)
-        with image_path.open("wb") as f:
-            f.write(jpeg_bytes)
-
-        # 创建完整的提示词（可直接复制到其他 AI 软件使用）
-        complete_prompt = f"生成单词对应图片: {word}\n\nPrompt: {prompt}\n\nNegative Prompt: {negative_prompt}"
-        success_entry = {
-            "ts": time.time(),
-            "word": word,
-            "status": "ok",
-            "complete_prompt": complete_prompt,
-            "image_path": str(image_path),
-            "model": resolved_model,
-            "size": args.size,
-            "guidance_scale": guidance_scale,
-            "num_inference_steps": num_inference_steps,
-            "prompt": prompt,
-            "negative_prompt": negative_prompt,
-        }
-        append_log(args.log_file, success_entry)
-        append_csv_log(args.csv_log, success_entry)
-        processed += 1
-        print(f"[OK] {word} -> {image_path}")
-        time.sleep(max(0.0, args.delay))
-
-    print(f"[DONE] Processed {processed} word(s)")
-    print(f"[INFO] JSON log: {args.log_file}")
-    print(f"[INFO] CSV log: {args.csv_log}")
-    return 0
+                "params_key": keys[word],
+                "image_sha256": image_sha256,
+            })
+            metrics.inc("items_total", result="ok")
+            metrics.observe("item_duration_seconds", time.monotonic() - word_started)
+            return entry
+
+        candidates = iter(plan)
+        processed = 0
+        pending: Dict[Future, int] = {}
+        # Results are logged in submission (word list) order, whatever order they finish in
+        finished: Dict[int, Dict[str, object]] = {}
+        submitted = 0
+        logged = 0
+
+        def write_logs(upto_gap: bool = True) -> None:
+            nonlocal logged, manifest_dirty
+            order = range(logged, submitted) if upto_gap else sorted(finished)
+            for index in order:
+                if index not in finished:
+                    if upto_gap:
+                        break
+                    continue
+                entry = finished.pop(index)
+                # Result lines are printed here, in word order like the logs
+                if entry["status"] == "ok":
+                    say(f"[OK] {entry['word']} -> {entry['image_path']}")
+                else:
+                    say(f"[ERROR] {entry['word']}: {entry['error']}")
+                append_log(args.log_file, entry)
+                append_csv_log(args.csv_log, entry)
+                logged = index + 1
+                if entry["status"] == "ok":
+                    manifest[entry["word"]] = manifest_record(
+                        entry["params_key"], entry["image_sha256"], resolved_model, args.size, entry["ts"]
+                    )
+                    manifest_dirty = True
+            if manifest_dirty:
+                save_manifest(manifest_path, manifest)
+                manifest_dirty = False
+
+        concurrency = max(1, args.concurrency)
+        if concurrency > 1:
+            print(f"[INFO] {concurrency} workers, at most {throttle.rate:g} request(s)/s" if throttle.rate > 0
+                  else f"[INFO] {concurrency} workers, no rate limit")
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="image-worker")
+        try:
+            while True:
+                # Keep every worker busy, but never start more words than --limit can still use
+                while not stop.is_set() and processed + len(pending) < args.limit:
+                    word = next(candidates, None)
+                    if word is None:
+                        break
+                    pending[pool.submit(process_word, word)] = submitted
+                    submitted += 1
+                if not pending:
+                    break
+                # Short timeout so Ctrl-C reaches the main thread promptly
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    entry = future.result()
+                    finished[index] = entry
+                    if entry["status"] == "ok":
+                        processed += 1
+                write_logs()
+        except BaseException as e:
+            stop.set()
+            for future in pending:
+                future.cancel()
+            if isinstance(e, KeyboardInterrupt):
+                say("[INFO] Interrupted, waiting for in-flight requests to finish...")
+            raise
+        finally:
+            pool.shutdown(wait=True)
+            # After an interruption, log what did finish (still in word order)
+            write_logs(upto_gap=False)
+
+        print(f"[DONE] Processed {processed} word(s)")
+        print(f"[INFO] JSON log: {args.log_file}")
+        print(f"[INFO] CSV log: {args.csv_log}")
+        p50 = metrics.quantile("request_duration_seconds", 0.5)
+        p95 = metrics.quantile("request_duration_seconds", 0.95)
+        if p50 is not None:
+            print(
+                f"[INFO] Requests: {metrics.total('requests_total'):.0f} "
+                f"(p50 {p50:.2f}s, p95 {p95:.2f}s) over {http_pool.connections_opened} connection(s), "
+                f"retries: {metrics.total('retries_total'):.0f}"
+            )
+
+        if args.variants:
+            images_dir = (script_dir.parent / "images").resolve()
+            sources = default_source_dirs(images_dir)
+            if args.output_dir.resolve() not in sources:
+                sources.append(args.output_dir.resolve())
+            with metrics.phase("variants"):
+                try:
+                    index, report = build_variants(sources, images_dir)
+                except RuntimeError as e:
+                    print(f"[ERROR] {e}")
+                    return 1
+            print_report(index, report)
+        return 0
+    finally:
+        http_pool.close()
+        metrics.set("connections_opened", http_pool.connections_opened)
+        metrics.stop_live()
+        json_path, prom_path = metrics.write(args.metrics_dir)
+        print(f"[INFO] Metrics: {json_path}, {prom_path}")
 
 
 if __name__ == "__main__":
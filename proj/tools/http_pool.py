@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Keep-alive HTTP(S) client for the proj/tools scripts that use the standard
+library only (generate_word_images.py).
+
+urllib.request.urlopen opens a new TCP (and TLS) connection for every call.
+HTTPPool keeps one persistent http.client connection per thread and origin
+and reuses it for the following requests, so a run against one API host
+pays the handshake once per worker thread instead of once per request:
+
+    pool = HTTPPool()
+    with pool.request("POST", url, body=data, headers=headers, timeout=60) as resp:
+        body = resp.read()
+    with pool.request("GET", image_url) as resp:
+        for chunk in iter(lambda: resp.read(64 * 1024), b""):
+            ...                  # stream the body, e.g. into a temp file
+    pool.close()
+
+Behaves like urlopen where the scripts rely on it: responses with status
+>= 400 raise urllib.error.HTTPError (with .code and .headers), redirects of
+GET requests are followed, and the http_proxy / https_proxy environment
+variables are honoured. Idle connections the server has closed are
+replaced before use. A request on a reused connection that fails anyway is
+retried once on a fresh connection when that cannot repeat work on the
+server: the request could not be sent, or the method is idempotent (a POST
+whose response was lost may already have been processed, e.g. a paid image
+generation, so that error is raised to the caller). The response must be
+read to the end (or the block left) before the thread's next request.
+"""
+
+from __future__ import annotations
+
+import http.client
+import io
+import select
+import ssl
+import threading
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+# Methods that may be sent again when the response to them was lost
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"))
+
+# Errors that mean a kept-alive connection was closed by the server before it answered
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+Origin = Tuple[str, str, int]
+
+
+def _origin(url: str) -> Tuple[Origin, str]:
+    """((scheme, host, port), path?query) of an absolute http(s) URL."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Unsupported URL: {url}")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    return (parts.scheme, parts.hostname, port), target
+
+
+def _is_dropped(conn: http.client.HTTPConnection) -> bool:
+    """Whether an idle kept-alive connection was closed by the server (it is readable: EOF)."""
+    if conn.sock is None:
+        return False
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class HTTPPool:
+    """Persistent connections, one per (thread, scheme, host, port)."""
+
+    def __init__(self, timeout: float = 120, context: Optional[ssl.SSLContext] = None):
+        self.timeout = timeout
+        self.context = context or ssl.create_default_context()
+        self._local = threading.local()
+        self._all: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._proxies = urllib.request.getproxies()
+        # Connections that carried a response (the rest of the requests reused one)
+        self.connections_opened = 0
+
+    def _connections(self) -> Dict[Origin, Tuple[http.client.HTTPConnection, bool]]:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        return conns
+
+    def _connect(self, origin: Origin, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Connection for origin and whether it goes to an HTTP proxy (absolute request targets)."""
+        scheme, host, port = origin
+        proxy = None if urllib.request.proxy_bypass(host) else self._proxies.get(scheme)
+        if proxy:
+            proxy_parts = urlsplit(proxy if "://" in proxy else "http://" + proxy)
+            proxy_port = proxy_parts.port or 80
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(proxy_parts.hostname, proxy_port, timeout=timeout, context=self.context)
+                conn.set_tunnel(host, port)
+                return conn, False
+            return http.client.HTTPConnection(proxy_parts.hostname, proxy_port, timeout=timeout), True
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self.context), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _send(
+        self, method: str, url: str, body: Optional[bytes], headers: Dict[str, str], timeout: float
+    ) -> http.client.HTTPResponse:
+        origin, target = _origin(url)
+        conns = self._connections()
+        for attempt in (0, 1):
+            entry = conns.get(origin)
+            if entry is not None and _is_dropped(entry[0]):
+                self._discard(origin)
+                entry = None
+            reused = entry is not None
+            if entry is None:
+                conn, absolute = self._connect(origin, timeout)
+                entry = conns[origin] = (conn, absolute)
+                with self._lock:
+                    self._all.append(conn)
+            conn, absolute = entry
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, url if absolute else target, body=body, headers=headers)
+            except _STALE_CONNECTION_ERRORS:
+                # Not sent completely, so the server cannot have acted on it
+                self._discard(origin)
+                if not reused or attempt:
+                    raise
+                continue
+            except BaseException:
+                self._discard(origin)
+                raise
+            try:
+                resp = conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                self._discard(origin)
+                if not reused or attempt or method not in IDEMPOTENT_METHODS:
+                    raise
+                continue
+            except BaseException:
+                self._discard(origin)
+                raise
+            if not reused:
+                with self._lock:
+                    self.connections_opened += 1
+            return resp
+        raise AssertionError("unreachable")
+
+    def _discard(self, origin: Origin) -> None:
+        entry = self._connections().pop(origin, None)
+        if entry is not None:
+            entry[0].close()
+            with self._lock:
+                if entry[0] in self._all:
+                    self._all.remove(entry[0])
+
+    @contextmanager
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[http.client.HTTPResponse]:
+        """Send a request and yield the response; HTTPError for status >= 400."""
+        timeout = self.timeout if timeout is None else timeout
+        headers = dict(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = self._send(method, url, body, headers, timeout)
+            origin, _ = _origin(url)
+            if resp.status in REDIRECT_STATUSES and method in ("GET", "HEAD") and resp.getheader("Location"):
+                resp.read()
+                if resp.will_close:
+                    self._discard(origin)
+                url = urljoin(url, resp.getheader("Location"))
+                continue
+            if resp.status >= 400:
+                payload = resp.read()
+                if resp.will_close:
+                    self._discard(origin)
+                raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(payload))
+            try:
+                yield resp
+                # Drain what the caller left so the connection can be reused
+                resp.read()
+            except BaseException:
+                self._discard(origin)
+                raise
+            if resp.will_close:
+                self._discard(origin)
+            return
+        raise urllib.error.URLError(f"Too many redirects: {url}")
+
+    def close(self) -> None:
+        """Close every connection opened by any thread."""
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Per-library image atlases: the pictures of a vocabulary library packed into
+one (or a few) sprite sheets, so a lesson costs one or two image requests
+instead of one per word.
+
+For each library served to the browser (the files build_word_bundles.py puts
+in the manifest, e.g. daily-phonics/day01.json) the images of its words in
+proj/images/cache are scaled down to --max-image px (longest side; the
+showcase shows them at about 200 px) and placed on sheets of at most
+--sheet-size px with a shelf bin-packing layout (tallest first). The sheets
+are written to proj/images/atlas/<library>-<n>.jpg, and
+proj/images/atlas/index.json records each word's rectangle:
+
+    {
+      "version": 1,
+      "settings": {"max_image": 256, "sheet_size": 2048, "padding": 2, "format": "jpeg", "quality": 85},
+      "libraries": {
+        "daily-phonics/day01": {
+          "key": "...",
+          "sheets": [{"file": "daily-phonics/day01-0.jpg", "width": 1034, "height": 1034, "bytes": 201234}],
+          "frames": {"cat": [0, 0, 0, 256, 256], "hat": [0, 258, 0, 256, 256]},
+          "missing": ["..."],
+          "sources": {"files": 20, "bytes": 912345}
+        }
+      }
+    }
+
+A frame is [sheet, x, y, width, height]; canvas code draws it with
+ctx.drawImage(sheetImage, x, y, width, height, dx, dy, dw, dh) (or a CSS
+background-position). Frames are --padding px apart so smoothing does not
+bleed neighbours into each other. Words are keyed in lower case, like the
+file names the game requests.
+
+Runs are incremental: a library is only re-packed when its images (by
+sha256), its word list or the settings changed, or a sheet file is missing.
+Images still stored as Git LFS pointers (no `git lfs pull` yet) are left
+out. The run ends with the requests and bytes each library saves compared
+with loading its images one by one.
+
+Usage:
+  python3 image_atlas.py                            # build/refresh every atlas
+  python3 image_atlas.py --library daily-phonics/day01
+  python3 image_atlas.py --max-image 200 --sheet-size 4096 --format webp
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image  # type: ignore
+except Exception:  # pragma: no cover - optional dependency checked at runtime
+    Image = None  # type: ignore
+
+from audio_index import parse_lfs_pointer
+from audio_pack import library_id
+from build_word_bundles import category_of, write_if_changed
+from image_variants import FORMAT_SUFFIXES, find_sources
+from word_corpus import get_corpus, map_in_pool
+
+
+ATLAS_DIR_NAME = "atlas"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+BACKGROUND = (44, 62, 80)  # .image-showcase .picture background (#2c3e50)
+
+Size = Tuple[int, int]
+# word -> (sheet, x, y)
+Placement = Dict[str, Tuple[int, int, int]]
+
+
+class AtlasError(Exception):
+    """Atlases cannot be built from the images on disk."""
+
+
+def pack_shelves(sizes: Dict[str, Size], sheet_size: int, padding: int) -> Tuple[List[Size], Placement]:
+    """Shelf bin packing, tallest first; returns ([(width, height)] per sheet, placements).
+
+    Sheets are about square when everything fits on one; otherwise they are
+    sheet_size wide and new sheets are started as the previous ones fill up.
+    """
+    items = sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0]))
+    if not items:
+        return [], {}
+    area = sum((w + padding) * (h + padding) for _, (w, h) in items)
+    widest = max(w for _, (w, _h) in items)
+    width = min(sheet_size, max(widest, math.ceil(math.sqrt(area))))
+
+    sheets: List[Size] = []
+    placements: Placement = {}
+    x = y = shelf_height = used_width = used_height = 0
+    for word, (w, h) in items:
+        if x and x + w > width:
+            y += shelf_height + padding
+            x = shelf_height = 0
+        if y and y + h > sheet_size:
+            sheets.append((used_width, used_height))
+            x = y = shelf_height = used_width = used_height = 0
+        placements[word] = (len(sheets), x, y)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+        used_width = max(used_width, x - padding)
+        used_height = max(used_height, y + h)
+    sheets.append((used_width, used_height))
+    return sheets, placements
+
+
+def encode_sheet(sheet, image_format: str, quality: int) -> bytes:
+    out = io.BytesIO()
+    if image_format == "jpeg":
+        sheet.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        sheet.save(out, format="WEBP", quality=quality, method=6)
+    return out.getvalue()
+
+
+def build_atlas(task: Tuple[List[Tuple[str, str]], dict]) -> dict:
+    """Decode, scale and pack one library's images (runs in a worker process).
+
+    Returns {"sheets": [(bytes, width, height)], "frames": {word: [sheet, x, y, w, h]},
+    "errors": {word: message}}.
+    """
+    images, settings = task
+    max_image = settings["max_image"]
+    decoded = {}
+    errors: Dict[str, str] = {}
+    for word, source in images:
+        try:
+            with Image.open(source) as opened:
+                img = opened.convert("RGB")
+            img.thumbnail((max_image, max_image), Image.LANCZOS)
+            decoded[word] = img
+        except Exception as e:
+            errors[word] = f"{type(e).__name__}: {e}"
+
+    sizes = {word: img.size for word, img in decoded.items()}
+    sheet_sizes, placements = pack_shelves(sizes, settings["sheet_size"], settings["padding"])
+    sheets = [Image.new("RGB", size, BACKGROUND) for size in sheet_sizes]
+    frames: Dict[str, List[int]] = {}
+    for word in sorted(placements):
+        sheet, x, y = placements[word]
+        sheets[sheet].paste(decoded[word], (x, y))
+        frames[word] = [sheet, x, y, *sizes[word]]
+    encoded = [
+        (encode_sheet(sheet, settings["format"], settings["quality"]), *sheet.size) for sheet in sheets
+    ]
+    return {"sheets": encoded, "frames": frames, "errors": errors}
+
+
+def atlas_key(settings: dict, images: List[Tuple[str, str]]) -> str:
+    """Fingerprint of an atlas's inputs: settings plus (word, image sha256) pairs."""
+    payload = json.dumps({"settings": settings, "images": images}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_index(index_path: Path) -> dict:
+    try:
+        data = json.loads(index_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) and data.get("version") == INDEX_VERSION else {}
+
+
+def build_atlases(
+    words_dir: Path,
+    images_dir: Path,
+    settings: dict,
+    only: Optional[List[str]] = None,
+    jobs: int = 0,
+    force: bool = False,
+) -> Tuple[Dict[Path, bytes], dict, dict]:
+    """Compute atlas sheets and the atlas index; returns (sheets to write, index, run report).
+
+    Libraries whose inputs did not change keep their previous index entry and
+    are not part of the returned sheets. Raises AtlasError when images have to
+    be decoded and Pillow is missing.
+    """
+    out_dir = images_dir / ATLAS_DIR_NAME
+    previous = load_index(out_dir / INDEX_NAME).get("libraries", {}) if not force else {}
+    sources, _ = find_sources([images_dir / "cache"], images_dir)
+    corpus = get_corpus(words_dir)
+    suffix = FORMAT_SUFFIXES[settings["format"]]
+
+    libraries: Dict[str, dict] = {}
+    tasks: List[Tuple[List[Tuple[str, str]], dict]] = []
+    pending: List[Tuple[str, dict]] = []
+    lfs_pointers = set()
+    digests: Dict[str, Tuple[int, str]] = {}
+    for entry in sorted(corpus.files, key=lambda f: f.rel):
+        if category_of(entry) is None or not entry.details:
+            continue
+        lib = library_id(entry.rel)
+        if only and lib not in only:
+            continue
+        images: List[Tuple[str, str]] = []
+        fingerprint: List[Tuple[str, str]] = []
+        missing: List[str] = []
+        source_bytes = 0
+        for word in sorted({w.lower() for w in entry.details}):
+            path = sources.get(word)
+            if path is not None and word not in digests:
+                data = path.read_bytes()
+                if parse_lfs_pointer(data) is not None:
+                    lfs_pointers.add(word)
+                digests[word] = (len(data), hashlib.sha256(data).hexdigest())
+            if path is None or word in lfs_pointers:
+                missing.append(word)
+                continue
+            images.append((word, str(path)))
+            fingerprint.append((word, digests[word][1]))
+            source_bytes += digests[word][0]
+        if not images:
+            continue
+        key = atlas_key(settings, fingerprint)
+        old = previous.get(lib)
+        if old is not None and old.get("key") == key and all(
+            (out_dir / sheet["file"]).is_file() and (out_dir / sheet["file"]).stat().st_size == sheet["bytes"]
+            for sheet in old.get("sheets", [])
+        ):
+            libraries[lib] = old
+            continue
+        libraries[lib] = {
+            "key": key,
+            "sheets": [],
+            "frames": {},
+            "missing": missing,
+            "sources": {"files": len(images), "bytes": source_bytes},
+        }
+        tasks.append((images, settings))
+        pending.append((lib, libraries[lib]))
+
+    if tasks and Image is None:
+        raise AtlasError("Pillow is required to build image atlases. Install via: pip install pillow")
+
+    outputs: Dict[Path, bytes] = {}
+    errors: Dict[str, str] = {}
+    for (lib, info), result in zip(pending, map_in_pool(build_atlas, tasks, jobs)):
+        for word, error in result["errors"].items():
+            errors[f"{lib}: {word}"] = error
+            info["missing"] = sorted(info["missing"] + [word])
+        for number, (payload, width, height) in enumerate(result["sheets"]):
+            sheet_rel = f"{lib}-{number}{suffix}"
+            outputs[out_dir / sheet_rel] = payload
+            info["sheets"].append({"file": sheet_rel, "width": width, "height": height, "bytes": len(payload)})
+        info["frames"] = result["frames"]
+        if result["errors"]:
+            # The failed images are neither requested separately nor in the atlas
+            info["key"] = ""
+        if not info["frames"]:
+            del libraries[lib]
+
+    index = {"version": INDEX_VERSION, "settings": settings, "libraries": libraries}
+    report = {"packed": len(pending), "errors": errors, "lfs_pointers": len(lfs_pointers)}
+    return outputs, index, report
+
+
+def print_savings(index: dict) -> None:
+    """Requests and bytes of each library: separate images vs its atlas sheets."""
+    libraries = index["libraries"]
+    if not libraries:
+        return
+    width = max(len(lib) for lib in libraries)
+    print(f"     {'library':<{width}}  requests        bytes (KB)")
+    totals = [0, 0, 0, 0]
+    for lib, info in libraries.items():
+        before = (info["sources"]["files"], info["sources"]["bytes"])
+        after = (len(info["sheets"]), sum(sheet["bytes"] for sheet in info["sheets"]))
+        print(
+            f"     {lib:<{width}}  {before[0]:4d} -> {after[0]:<4d}  "
+            f"{before[1] / 1024:8.1f} -> {after[1] / 1024:8.1f}"
+        )
+        for i, value in enumerate(before + after):
+            totals[i] += value
+    print(
+        f"     {'total':<{width}}  {totals[0]:4d} -> {totals[2]:<4d}  "
+        f"{totals[1] / 1024:8.1f} -> {totals[3] / 1024:8.1f}  "
+        f"(saves {totals[0] - totals[2]} requests, {(totals[1] - totals[3]) / 1024:.1f} KB; plus one {INDEX_NAME})"
+    )
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    default_words_dir = (script_dir.parent / "words").resolve()
+    default_images_dir = (script_dir.parent / "images").resolve()
+
+    parser = argparse.ArgumentParser(description="Pack the word images of each library into atlases (proj/images/atlas)")
+    parser.add_argument("--words-dir", type=Path, default=default_words_dir, help="Vocabulary directory (default: proj/words)")
+    parser.add_argument("--images-dir", type=Path, default=default_images_dir, help="Images directory (default: proj/images)")
+    parser.add_argument("--library", action="append", help="Only build this library (repeatable), e.g. daily-phonics/day01")
+    parser.add_argument("--max-image", type=int, default=256, help="Longest side of an image in the atlas in px (default: 256)")
+    parser.add_argument("--sheet-size", type=int, default=2048, help="Longest side of a sheet in px (default: 2048)")
+    parser.add_argument("--padding", type=int, default=2, help="Space between images in px (default: 2)")
+    parser.add_argument("--format", choices=sorted(FORMAT_SUFFIXES), default="jpeg", help="Sheet format (default: jpeg)")
+    parser.add_argument("--quality", type=int, default=85, help="Sheet encoder quality (default: 85)")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Worker processes (default: all CPUs)")
+    parser.add_argument("--force", action="store_true", help="Re-pack every library")
+    args = parser.parse_args()
+
+    if not 0 < args.max_image <= args.sheet_size:
+        parser.error("--max-image must be between 1 and --sheet-size")
+    if args.padding < 0 or not 1 <= args.quality <= 100:
+        parser.error("--padding must be >= 0 and --quality between 1 and 100")
+
+    images_dir = args.images_dir.resolve()
+    out_dir = images_dir / ATLAS_DIR_NAME
+    settings = {
+        "max_image": args.max_image,
+        "sheet_size": args.sheet_size,
+        "padding": args.padding,
+        "format": args.format,
+        "quality": args.quality,
+    }
+    try:
+        outputs, atlas_index, report = build_atlases(
+            args.words_dir.resolve(), images_dir, settings, args.library, jobs=args.jobs, force=args.force
+        )
+    except AtlasError as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    index_path = out_dir / INDEX_NAME
+    if args.library:
+        # Keep the entries of libraries that were not rebuilt (if built with the same settings)
+        previous = load_index(index_path)
+        if previous.get("settings") == settings:
+            libraries = {**previous.get("libraries", {}), **atlas_index["libraries"]}
+            atlas_index["libraries"] = {k: libraries[k] for k in sorted(libraries)}
+
+    for key, error in sorted(report["errors"].items()):
+        print(f"[ERROR] {key}: {error}")
+    if report["lfs_pointers"]:
+        print(f"[WARN] {report['lfs_pointers']} image(s) are Git LFS pointers; run `git lfs pull` first")
+
+    written = 0
+    for path, payload in outputs.items():
+        if write_if_changed(path, payload):
+            written += 1
+            print(f"[OK] Wrote {path.relative_to(images_dir)} ({len(payload)} bytes)")
+    payload = (json.dumps(atlas_index, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    if write_if_changed(index_path, payload):
+        print(f"[OK] Wrote {index_path.relative_to(images_dir)}")
+
+    if not args.library:
+        # Sheets of libraries that no longer exist, or of an earlier layout
+        expected = {out_dir / s["file"] for info in atlas_index["libraries"].values() for s in info["sheets"]}
+        for path in sorted(out_dir.rglob("*")) if out_dir.is_dir() else []:
+            if path.is_file() and path.suffix in FORMAT_SUFFIXES.values() and path not in expected:
+                path.unlink()
+                print(f"[OK] Removed {path.relative_to(images_dir)}")
+
+    print(f"[OK] {len(atlas_index['libraries'])} atlases ({report['packed']} re-packed, {written} sheet(s) written)")
+    print_savings(atlas_index)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Post-process the word images into smaller and more modern variants.
+
+Every image in proj/images/cache and proj/images/generated (the output of
+generate_word_images.py) is decoded once, in a process pool, and written as
+each configured variant under proj/images/variants/<variant>/<word>.<ext>.
+The defaults are:
+
+    webp          WebP at the original size, quality 80
+    progressive   optimized progressive JPEG at the original size, quality 85
+    thumb-128     WebP thumbnail, longest side 128 px, quality 75
+    thumb-128-jpg progressive JPEG thumbnail for browsers without WebP
+
+--variant NAME:FORMAT[:SIZE[:QUALITY]] replaces the defaults (repeatable;
+FORMAT is jpeg or webp, SIZE the longest side in px or "full"; JPEG
+variants are always optimized and progressive).
+
+proj/images/variants/index.json lists what was produced, with byte sizes:
+
+    {
+      "version": 1,
+      "variants": {"thumb-128": {"format": "webp", "size": 128, "quality": 75}, ...},
+      "images": {
+        "apple": {
+          "source": "cache/apple.jpg", "bytes": 48213, "sha256": "...", "width": 300, "height": 300,
+          "variants": {"thumb-128": {"file": "thumb-128/apple.webp", "bytes": 3120, "width": 128, "height": 128}, ...}
+        }
+      },
+      "totals": {"source": 29123456, "thumb-128": 1876543, ...}
+    }
+
+Runs are incremental: an image is only decoded again when its sha256 or a
+variant's settings changed, or a variant file is missing. Variants of
+images that no longer exist are removed. Images still stored as Git LFS
+pointers (no `git lfs pull` yet) are skipped.
+
+Usage:
+  python3 image_variants.py                         # all sources, default variants
+  python3 image_variants.py --jobs 4 --force
+  python3 image_variants.py --variant thumb-64:webp:64:70 --variant full:jpeg
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image  # type: ignore
+except Exception:  # pragma: no cover - optional dependency checked at runtime
+    Image = None  # type: ignore
+
+from audio_index import parse_lfs_pointer
+from build_word_bundles import write_if_changed
+from word_corpus import map_in_pool
+
+
+VARIANTS_DIR_NAME = "variants"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+# In the order the game tries them (WordTetrisGame.updateImageShowcase)
+SOURCE_SUFFIXES = (".jpeg", ".jpg", ".png", ".webp")
+FORMAT_SUFFIXES = {"jpeg": ".jpg", "webp": ".webp"}
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+
+@dataclass(frozen=True)
+class VariantSpec:
+    name: str
+    format: str
+    # Longest side in px; None keeps the original size
+    size: Optional[int] = None
+    quality: int = 80
+
+    @property
+    def suffix(self) -> str:
+        return FORMAT_SUFFIXES[self.format]
+
+    def settings(self) -> dict:
+        data = asdict(self)
+        del data["name"]
+        return data
+
+
+DEFAULT_VARIANTS = (
+    VariantSpec("webp", "webp", None, 80),
+    VariantSpec("progressive", "jpeg", None, 85),
+    VariantSpec("thumb-128", "webp", 128, 75),
+    VariantSpec("thumb-128-jpg", "jpeg", 128, 80),
+)
+
+
+def parse_variant(text: str) -> VariantSpec:
+    """"NAME:FORMAT[:SIZE[:QUALITY]]" -> VariantSpec; ValueError if malformed."""
+    parts = text.split(":")
+    if len(parts) < 2 or len(parts) > 4 or not parts[0]:
+        raise ValueError(f"Variant must be NAME:FORMAT[:SIZE[:QUALITY]]: {text}")
+    name, fmt = parts[0], parts[1].lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in FORMAT_SUFFIXES:
+        raise ValueError(f"Unknown variant format {parts[1]!r} (jpeg or webp): {text}")
+    if "/" in name or name in (".", ".."):
+        raise ValueError(f"Invalid variant name: {name}")
+    size = None
+    if len(parts) > 2 and parts[2] not in ("", "full"):
+        size = int(parts[2])
+        if size < 1:
+            raise ValueError(f"Variant size must be positive: {text}")
+    quality = int(parts[3]) if len(parts) > 3 else (85 if fmt == "jpeg" and size is None else 80)
+    if not 1 <= quality <= 100:
+        raise ValueError(f"Variant quality must be 1..100: {text}")
+    return VariantSpec(name, fmt, size, quality)
+
+
+def is_jpeg(data: bytes) -> bool:
+    return data[:3] == JPEG_MAGIC
+
+
+def encode_variant(img, spec: VariantSpec) -> Tuple[bytes, int, int]:
+    """Encode an RGB Pillow image as spec; returns (bytes, width, height)."""
+    if spec.size is not None and max(img.size) > spec.size:
+        img = img.copy()
+        img.thumbnail((spec.size, spec.size), Image.LANCZOS)
+    out = io.BytesIO()
+    if spec.format == "jpeg":
+        img.save(out, format="JPEG", quality=spec.quality, optimize=True, progressive=True)
+    else:
+        img.save(out, format="WEBP", quality=spec.quality, method=6)
+    return out.getvalue(), img.size[0], img.size[1]
+
+
+def process_image(task: Tuple[str, List[Tuple[VariantSpec, str]]]) -> dict:
+    """Decode one source image and write the requested variants (runs in a worker process).
+
+    Returns {"width", "height", "variants": {name: {"bytes", "width", "height"}}}
+    or {"error": message}.
+    """
+    source, outputs = task
+    try:
+        with Image.open(source) as opened:
+            img = opened.convert("RGB")
+        result: dict = {"width": img.size[0], "height": img.size[1], "variants": {}}
+        for spec, out_path in outputs:
+            payload, width, height = encode_variant(img, spec)
+            write_if_changed(Path(out_path), payload)
+            result["variants"][spec.name] = {"bytes": len(payload), "width": width, "height": height}
+        return result
+    except Exception as e:  # noqa: BLE001 - reported per image
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def find_sources(source_dirs: List[Path], images_dir: Path) -> Tuple[Dict[str, Path], List[str]]:
+    """word -> source image; earlier directories and suffixes win. Also returns the names shadowed by them."""
+    sources: Dict[str, Path] = {}
+    shadowed: List[str] = []
+    for directory in source_dirs:
+        if not directory.is_dir():
+            continue
+        candidates = [
+            path for path in directory.iterdir()
+            if path.is_file() and path.suffix.lower() in SOURCE_SUFFIXES and not path.name.startswith(".")
+        ]
+        candidates.sort(key=lambda path: (path.stem, SOURCE_SUFFIXES.index(path.suffix.lower())))
+        for path in candidates:
+            word = path.stem
+            if word in sources:
+                shadowed.append(str(path.relative_to(images_dir)) if images_dir in path.parents else str(path))
+                continue
+            sources[word] = path
+    return sources, shadowed
+
+
+def load_index(index_path: Path) -> dict:
+    try:
+        data = json.loads(index_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) and data.get("version") == INDEX_VERSION else {}
+
+
+def build_variants(
+    source_dirs: List[Path],
+    images_dir: Path,
+    specs: Tuple[VariantSpec, ...] = DEFAULT_VARIANTS,
+    jobs: int = 0,
+    force: bool = False,
+) -> Tuple[dict, dict]:
+    """Bring proj/images/variants up to date; returns (written index, run report).
+
+    Raises RuntimeError when an image has to be decoded and Pillow is missing.
+    """
+    out_dir = images_dir / VARIANTS_DIR_NAME
+    index_path = out_dir / INDEX_NAME
+    previous = load_index(index_path)
+    previous_images: Dict[str, dict] = previous.get("images", {}) if not force else {}
+    previous_specs: Dict[str, dict] = previous.get("variants", {})
+
+    sources, shadowed = find_sources(source_dirs, images_dir)
+    images: Dict[str, dict] = {}
+    tasks: List[Tuple[str, List[Tuple[VariantSpec, str]]]] = []
+    pending: List[Tuple[str, dict]] = []
+    lfs_pointers = 0
+    for word, path in sorted(sources.items()):
+        data = path.read_bytes()
+        if parse_lfs_pointer(data) is not None:
+            lfs_pointers += 1
+            continue
+        rel = path.relative_to(images_dir).as_posix() if images_dir in path.parents else str(path)
+        entry = {"source": rel, "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+        old = previous_images.get(word, {})
+        todo: List[Tuple[VariantSpec, str]] = []
+        kept: Dict[str, dict] = {}
+        for spec in specs:
+            file_rel = f"{spec.name}/{word}{spec.suffix}"
+            old_variant = old.get("variants", {}).get(spec.name)
+            up_to_date = (
+                old_variant is not None
+                and old.get("sha256") == entry["sha256"]
+                and previous_specs.get(spec.name) == spec.settings()
+                and (out_dir / file_rel).is_file()
+                and (out_dir / file_rel).stat().st_size == old_variant.get("bytes")
+            )
+            if up_to_date:
+                kept[spec.name] = old_variant
+            else:
+                todo.append((spec, str(out_dir / file_rel)))
+        entry["width"], entry["height"] = old.get("width"), old.get("height")
+        entry["variants"] = kept
+        images[word] = entry
+        if todo:
+            tasks.append((str(path), todo))
+            pending.append((word, entry))
+
+    if tasks and Image is None:
+        raise RuntimeError("Pillow is required to build image variants. Install via: pip install pillow")
+
+    errors: Dict[str, str] = {}
+    for (word, entry), result in zip(pending, map_in_pool(process_image, tasks, jobs)):
+        if "error" in result:
+            errors[word] = result["error"]
+            del images[word]
+            continue
+        entry["width"], entry["height"] = result["width"], result["height"]
+        for name, variant in result["variants"].items():
+            spec = next(s for s in specs if s.name == name)
+            entry["variants"][name] = {"file": f"{name}/{word}{spec.suffix}", **variant}
+    for entry in images.values():
+        entry["variants"] = {s.name: entry["variants"][s.name] for s in specs if s.name in entry["variants"]}
+
+    # Variant files of removed images or variants
+    expected = {out_dir / v["file"] for e in images.values() for v in e["variants"].values()}
+    removed = 0
+    for path in sorted(out_dir.rglob("*")) if out_dir.is_dir() else []:
+        if path.is_file() and path.suffix in FORMAT_SUFFIXES.values() and path not in expected:
+            path.unlink()
+            removed += 1
+
+    totals = {"source": sum(e["bytes"] for e in images.values())}
+    for spec in specs:
+        totals[spec.name] = sum(e["variants"][spec.name]["bytes"] for e in images.values() if spec.name in e["variants"])
+    index = {
+        "version": INDEX_VERSION,
+        "variants": {spec.name: spec.settings() for spec in specs},
+        "images": images,
+        "totals": totals,
+    }
+    payload = (json.dumps(index, ensure_ascii=False, indent=1) + "\n").encode("utf-8")
+    write_if_changed(index_path, payload)
+    report = {
+        "encoded": len(tasks) - len(errors),
+        "errors": errors,
+        "lfs_pointers": lfs_pointers,
+        "shadowed": shadowed,
+        "removed": removed,
+    }
+    return index, report
+
+
+def print_report(index: dict, report: dict) -> None:
+    for word, error in sorted(report["errors"].items()):
+        print(f"[ERROR] {word}: {error}")
+    for name in report["shadowed"]:
+        print(f"[WARN] {name} skipped: another image of the same word takes precedence")
+    if report["lfs_pointers"]:
+        print(f"[WARN] {report['lfs_pointers']} source image(s) are Git LFS pointers; run `git lfs pull` first")
+    totals = index["totals"]
+    print(f"[OK] {len(index['images'])} image(s), {report['encoded']} re-encoded, {report['removed']} stale file(s) removed")
+    source = totals["source"]
+    for name in index["variants"]:
+        share = f" ({totals[name] / source:.0%} of the sources)" if source else ""
+        print(f"     {name:<16} {totals[name] / 1024:10.1f} KB{share}")
+    print(f"     {'source':<16} {source / 1024:10.1f} KB")
+
+
+def default_source_dirs(images_dir: Path) -> List[Path]:
+    return [images_dir / "cache", images_dir / "generated"]
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    default_images_dir = (script_dir.parent / "images").resolve()
+
+    parser = argparse.ArgumentParser(description="Build thumbnail, WebP and progressive JPEG variants of the word images")
+    parser.add_argument("--images-dir", type=Path, default=default_images_dir, help="Images directory (default: proj/images)")
+    parser.add_argument("--source", type=Path, action="append", help="Source directory (repeatable; default: images/cache, images/generated)")
+    parser.add_argument("--variant", action="append", help="NAME:FORMAT[:SIZE[:QUALITY]], replaces the defaults (repeatable)")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Worker processes (default: all CPUs)")
+    parser.add_argument("--force", action="store_true", help="Re-encode every image")
+    args = parser.parse_args()
+
+    images_dir = args.images_dir.resolve()
+    try:
+        specs = tuple(parse_variant(v) for v in args.variant) if args.variant else DEFAULT_VARIANTS
+    except ValueError as e:
+        parser.error(str(e))
+    if len({s.name for s in specs}) != len(specs):
+        parser.error("Variant names must be unique")
+    sources = [p.resolve() for p in args.source] if args.source else default_source_dirs(images_dir)
+
+    try:
+        index, report = build_variants(sources, images_dir, specs, jobs=args.jobs, force=args.force)
+    except RuntimeError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    print_report(index, report)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the SiliconFlow image generation API, for offline
+benchmarks of generate_word_images.py.
+
+POST /v1/images/generations takes the same JSON body as the real endpoint
+and answers, after the configured latency, either with an image URL on this
+server ({"images": [{"url": ...}]}, like SiliconFlow) or, with
+--response b64, with {"data": [{"b64_json": ...}]}. GET /images/<id>.png
+serves the image: a valid PNG of the requested size whose noisy pixels
+(seeded by the prompt) keep it about as large as a real one.
+
+Latency and failures are injected per request:
+
+  --connect-latency  delay before the first request on each new connection,
+                     standing in for the TCP + TLS handshake to a remote API
+  --latency          generation time in ms, plus up to --jitter ms
+  --image-latency    time to first byte of GET /images/... in ms
+  --throttle-rate    share of generation requests answered 429 with
+                     Retry-After: --retry-after seconds
+  --error-rate       share of generation requests answered 503
+
+Request and connection counts are printed on Ctrl-C.
+
+Usage:
+  python3 mock_image_api.py --port 8799 --connect-latency 150 --latency 2000 --jitter 500
+  python3 generate_word_images.py --api-key test --base-url http://127.0.0.1:8799 --concurrency 4 --delay 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+
+GENERATIONS_PATH = "/v1/images/generations"
+IMAGES_PREFIX = "/images/"
+MAX_SIDE = 2048
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def make_png(width: int, height: int, seed: bytes) -> bytes:
+    """RGB PNG of random pixels seeded by seed (compresses poorly, like a photo)."""
+    rng = random.Random(seed)
+    row_bytes = width * 3
+    raw = b"".join(b"\x00" + rng.getrandbits(row_bytes * 8).to_bytes(row_bytes, "big") for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", zlib.compress(raw, 1)) + _png_chunk(b"IEND", b"")
+
+
+def parse_size(size: object) -> Tuple[int, int]:
+    try:
+        width, height = (int(v) for v in str(size).lower().split("x"))
+    except ValueError:
+        return 300, 300
+    return max(1, min(width, MAX_SIDE)), max(1, min(height, MAX_SIDE))
+
+
+class MockImageState:
+    """Injection settings, generated images and counters shared by handler threads."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.images: Dict[str, bytes] = {}
+        self.counts: Counter = Counter()
+        self._rng = random.Random(args.seed)
+        self._lock = threading.Lock()
+
+    def plan(self) -> Tuple[float, Optional[int]]:
+        """(delay in seconds, error status or None) for one generation request."""
+        with self._lock:
+            delay = self.args.latency + self._rng.uniform(0, self.args.jitter)
+            roll = self._rng.random()
+        if roll < self.args.throttle_rate:
+            return 0.0, 429
+        if roll < self.args.throttle_rate + self.args.error_rate:
+            return delay / 1000.0, 503
+        return delay / 1000.0, None
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def store(self, prompt: str, size: object) -> Tuple[str, bytes]:
+        width, height = parse_size(size)
+        image_id = hashlib.sha1(f"{prompt}|{width}x{height}".encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            data = self.images.get(image_id)
+        if data is None:
+            data = make_png(width, height, image_id.encode("ascii"))
+            with self._lock:
+                self.images[image_id] = data
+        return image_id, data
+
+
+class MockImageHandler(BaseHTTPRequestHandler):
+    server_version = "MockImageAPI/1.0"
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def setup(self):
+        super().setup()
+        state: MockImageState = self.server.state
+        state.count("connections")
+        if state.args.connect_latency > 0:
+            time.sleep(state.args.connect_latency / 1000.0)
+
+    def do_POST(self):
+        state: MockImageState = self.server.state
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.split("?")[0] != GENERATIONS_PATH:
+            self._reply(404, b"not found", "text/plain")
+            return
+        try:
+            request = json.loads(body.decode("utf-8"))
+        except ValueError:
+            self._reply(400, b'{"message": "invalid JSON"}', "application/json")
+            return
+
+        delay, error = state.plan()
+        if delay > 0:
+            time.sleep(delay)
+        if error == 429:
+            state.count("generate 429")
+            self._reply(429, b'{"message": "rate limited"}', "application/json",
+                        {"Retry-After": f"{state.args.retry_after:g}"})
+            return
+        if error is not None:
+            state.count(f"generate {error}")
+            self._reply(error, b'{"message": "service unavailable"}', "application/json")
+            return
+
+        image_id, data = state.store(str(request.get("prompt", "")), request.get("size"))
+        if state.args.response == "b64":
+            payload = {"data": [{"b64_json": base64.b64encode(data).decode("ascii")}]}
+        else:
+            host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+            payload = {"images": [{"url": f"http://{host}{IMAGES_PREFIX}{image_id}.png"}], "seed": 0}
+        state.count("generate 200")
+        self._reply(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        state: MockImageState = self.server.state
+        path = self.path.split("?")[0]
+        image_id = path[len(IMAGES_PREFIX):-len(".png")] if path.startswith(IMAGES_PREFIX) and path.endswith(".png") else ""
+        with state._lock:
+            data = state.images.get(image_id)
+        if data is None:
+            self._reply(404, b"not found", "text/plain")
+            return
+        if state.args.image_latency > 0:
+            time.sleep(state.args.image_latency / 1000.0)
+        state.count("image 200")
+        self._reply(200, data, "image/png")
+
+    def _reply(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local stand-in for the SiliconFlow image generation API")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8799, help="Port (default: 8799)")
+    parser.add_argument("--response", choices=("url", "b64"), default="url", help="Return an image URL (default) or b64_json")
+    parser.add_argument("--connect-latency", type=float, default=0.0, metavar="MS", help="Delay per new connection (handshake stand-in)")
+    parser.add_argument("--latency", type=float, default=0.0, metavar="MS", help="Generation time in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, metavar="MS", help="Extra random generation time up to MS")
+    parser.add_argument("--image-latency", type=float, default=0.0, metavar="MS", help="Delay before serving an image URL")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, metavar="P", help="Share of 429 responses, 0..1")
+    parser.add_argument("--retry-after", type=float, default=1.0, metavar="S", help="Retry-After of 429 responses (default 1)")
+    parser.add_argument("--error-rate", type=float, default=0.0, metavar="P", help="Share of 503 responses, 0..1")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible injection")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    state = MockImageState(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockImageHandler)
+    server.daemon_threads = True
+    server.state = state
+    server.verbose = args.verbose
+    print(f"[OK] Mock image API on http://{args.host}:{server.server_address[1]}{GENERATIONS_PATH} ({args.response})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    if state.counts:
+        print("[OK] " + ", ".join(f"{key} {n}" for key, n in sorted(state.counts.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the online TTS endpoints, for offline download benchmarks.
+
+Serves the same paths and query parameters as the providers in
+tts_providers.py (/dictvoice?audio=, /gettts?text=, /translate_tts?q=), so
+the downloader only needs --base-url to talk to it. Every word gets a
+deterministic, valid MP3 clip (it passes audio_index.check_mp3) that differs
+per provider and word, with a strong ETag, and If-None-Match is answered with
+304 like a CDN would.
+
+Latency and failures are injected per request, globally or per provider
+(PROVIDER=VALUE, options are repeatable):
+
+  --latency      base response time in ms
+  --jitter       extra uniform random delay, 0..jitter ms
+  --tail-rate    share of requests that get --tail-latency ms on top (slow tail)
+  --error-rate   share of requests answered with 503
+
+Request counts per provider are printed on Ctrl-C.
+
+Usage:
+  python3 mock_tts_server.py --port 8765 --latency 80 --jitter 40
+  python3 mock_tts_server.py --latency youdao=150 --tail-rate youdao=0.05 --tail-latency 2000 --error-rate baidu=0.1
+  python3 download_word_audio.py --providers youdao,baidu --hedge-ms 300 --base-url http://127.0.0.1:8765
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from tts_providers import PROVIDERS
+
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, no padding: 417-byte frames of 1152 samples
+FRAME_HEADER = b"\xff\xfb\x90\x00"
+FRAME_BYTES = 417
+
+
+def provider_routes() -> Dict[str, Tuple[str, str]]:
+    """URL path -> (provider name, query parameter holding the word)."""
+    routes = {}
+    for provider in PROVIDERS.values():
+        parts = urlsplit(provider.url_template)
+        param = next(key for key, values in parse_qs(parts.query).items() if values == ["{word}"])
+        routes[parts.path] = (provider.name, param)
+    return routes
+
+
+def make_clip(provider: str, word: str, frames: int) -> bytes:
+    """Deterministic MP3 clip for a provider and word (non-silent frame payloads)."""
+    seed = hashlib.sha256(f"{provider}:{word}".encode("utf-8")).digest()
+    payload_bytes = FRAME_BYTES - len(FRAME_HEADER)
+    payload = (seed * (payload_bytes // len(seed) + 1))[:payload_bytes]
+    return (FRAME_HEADER + payload) * frames
+
+
+class Setting:
+    """A numeric option with optional per-provider overrides ("80" or "youdao=150")."""
+
+    def __init__(self, values: Optional[List[str]], default: float):
+        self.default = default
+        self.overrides: Dict[str, float] = {}
+        for value in values or []:
+            name, sep, number = value.rpartition("=")
+            if not sep:
+                self.default = float(number)
+            elif name in PROVIDERS:
+                self.overrides[name] = float(number)
+            else:
+                raise ValueError(f"Unknown TTS provider in {value!r}")
+
+    def __call__(self, provider: str) -> float:
+        return self.overrides.get(provider, self.default)
+
+
+class MockTTSState:
+    """Injection settings, random source and request counters shared by handler threads."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.latency = Setting(args.latency, 0.0)
+        self.jitter = Setting(args.jitter, 0.0)
+        self.tail_rate = Setting(args.tail_rate, 0.0)
+        self.tail_latency = Setting(args.tail_latency, 1000.0)
+        self.error_rate = Setting(args.error_rate, 0.0)
+        self.frames = args.frames
+        self.routes = provider_routes()
+        self.counts: Counter = Counter()
+        self._rng = random.Random(args.seed)
+        self._lock = threading.Lock()
+
+    def plan(self, provider: str) -> Tuple[float, bool]:
+        """(delay in seconds, fail?) for one request."""
+        with self._lock:
+            delay = self.latency(provider) + self._rng.uniform(0, self.jitter(provider))
+            if self._rng.random() < self.tail_rate(provider):
+                delay += self.tail_latency(provider)
+            fail = self._rng.random() < self.error_rate(provider)
+        return delay / 1000.0, fail
+
+    def count(self, provider: str, outcome: str) -> None:
+        with self._lock:
+            self.counts[(provider, outcome)] += 1
+
+
+class MockTTSHandler(BaseHTTPRequestHandler):
+    server_version = "MockTTS/1.0"
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+
+    def do_GET(self):
+        state: MockTTSState = self.server.state
+        parts = urlsplit(self.path)
+        route = state.routes.get(parts.path)
+        word = parse_qs(parts.query).get(route[1], [""])[0].strip() if route else ""
+        if not word:
+            self._reply(404, b"not found", "text/plain")
+            return
+        provider = route[0]
+
+        delay, fail = state.plan(provider)
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            state.count(provider, "error")
+            self._reply(503, b"service unavailable", "text/plain")
+            return
+
+        clip = make_clip(provider, word, state.frames)
+        etag = '"%s"' % hashlib.sha256(clip).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            state.count(provider, "not-modified")
+            self._reply(304, b"", None, {"ETag": etag})
+            return
+        state.count(provider, "ok")
+        self._reply(200, clip, "audio/mpeg", {"ETag": etag})
+
+    def _reply(self, status: int, body: bytes, content_type: Optional[str], headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def main() -> int:
+    setting_help = "[PROVIDER=]VALUE, repeatable"
+    parser = argparse.ArgumentParser(description="Local stand-in for the online TTS endpoints")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    parser.add_argument("--latency", action="append", metavar="MS", help=f"Base response time in ms ({setting_help})")
+    parser.add_argument("--jitter", action="append", metavar="MS", help=f"Extra random delay up to MS ({setting_help})")
+    parser.add_argument("--tail-rate", action="append", metavar="P", help=f"Share of slow requests, 0..1 ({setting_help})")
+    parser.add_argument("--tail-latency", action="append", metavar="MS", help=f"Extra delay of slow requests (default 1000; {setting_help})")
+    parser.add_argument("--error-rate", action="append", metavar="P", help=f"Share of 503 responses, 0..1 ({setting_help})")
+    parser.add_argument("--frames", type=int, default=20, help="MP3 frames per clip (default 20, about 0.5 s)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible injection")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    try:
+        state = MockTTSState(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = ThreadingHTTPServer((args.host, args.port), MockTTSHandler)
+    server.daemon_threads = True
+    server.state = state
+    server.verbose = args.verbose
+    print(f"[OK] Mock TTS server on http://{args.host}:{server.server_address[1]} ({', '.join(PROVIDERS)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    for provider in PROVIDERS:
+        counts = {outcome: n for (name, outcome), n in sorted(state.counts.items()) if name == provider}
+        if counts:
+            print(f"[OK] {provider}: " + ", ".join(f"{outcome} {n}" for outcome, n in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
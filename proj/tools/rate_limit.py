@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Shared request rate limiting for the proj/tools network scripts.
+
+TokenBucket is thread-safe: any number of worker threads call acquire()
+before each request, and together they never exceed `rate` requests per
+second (after an initial burst of at most `capacity`). Waiting is done
+outside the lock and can be cut short with a threading.Event, so Ctrl-C
+handling does not have to wait for the bucket to refill.
+
+    bucket = TokenBucket(rate=5, capacity=5)
+    if bucket.acquire(stop_event=stop):
+        ...  # send one request
+
+AdaptiveRateLimiter wraps a TokenBucket whose rate follows the server
+(additive increase, multiplicative decrease): callers report throttling
+responses (429/5xx, with their Retry-After) and successes.
+
+    limiter = AdaptiveRateLimiter(max_rate=1.0)
+    if limiter.acquire(stop_event=stop):
+        ...  # on 429: limiter.on_throttle(parse_retry_after(headers.get("Retry-After")))
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `capacity` banked; rate <= 0 means unlimited."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available and return 0, else return the seconds to wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, stop_event: Optional[threading.Event] = None) -> bool:
+        """Block until tokens are taken; returns False if stop_event was set meanwhile."""
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if stop_event is not None:
+                stop_event.wait(wait)
+            else:
+                time.sleep(wait)
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate (e.g. adaptive throttling); banked tokens are kept."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """A TokenBucket whose rate backs off on throttling and ramps back up on success.
+
+    on_throttle() multiplies the rate by `decrease` (not below `min_rate`)
+    and, given a Retry-After delay, holds every acquire() until it has
+    passed; on_success() adds `step` back, up to `max_rate`. With
+    max_rate <= 0 the limiter starts unlimited: the first throttle drops
+    to `fallback_rate`, and the limit is lifted again once the rate has
+    recovered to it.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        min_rate: float = 0.05,
+        decrease: float = 0.5,
+        step: Optional[float] = None,
+        fallback_rate: float = 1.0,
+    ):
+        self.max_rate = float(max_rate)
+        self.min_rate = min_rate
+        self.decrease = decrease
+        self.fallback_rate = fallback_rate
+        self.step = step if step is not None else (self.max_rate if self.max_rate > 0 else fallback_rate) / 10
+        # Capacity 1: requests are spread evenly instead of bursting after a pause
+        self.bucket = TokenBucket(self.max_rate, capacity=1)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """Wait out any Retry-After pause, then take a token; False if stop_event was set."""
+        while True:
+            with self._lock:
+                pause = self._paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            if stop_event is not None:
+                if stop_event.wait(pause):
+                    return False
+            else:
+                time.sleep(pause)
+        return self.bucket.acquire(stop_event=stop_event)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> float:
+        """The server pushed back (429/5xx); returns the new rate."""
+        with self._lock:
+            current = self.bucket.rate if self.bucket.rate > 0 else self.fallback_rate
+            rate = max(self.min_rate, current * self.decrease)
+            if retry_after is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self.bucket.set_rate(rate)
+            return rate
+
+    def on_success(self) -> float:
+        """A request went through; returns the new rate (0 = unlimited)."""
+        with self._lock:
+            rate = self.bucket.rate
+            if rate <= 0:
+                return rate
+            rate += self.step
+            if self.max_rate > 0:
+                rate = min(rate, self.max_rate)
+            elif rate >= self.fallback_rate:
+                rate = 0.0
+            self.bucket.set_rate(rate)
+            return rate
@@ -14,149 +14,241 @@ CSV format:
   __summary__, files, <N>
   __summary__, total_words, <M>
 
+Alongside the CSV a binary word -> files index (words.idx) is written; query it
+with word_index.py instead of re-splitting CSV rows.
+
 Usage:
   python3 scan_words.py
   python3 scan_words.py --input /absolute/path/to/words --output /absolute/path/to/words.csv
+  python3 scan_words.py --jobs 8   # parse files across 8 worker processes (0 = all CPUs)
+  python3 scan_words.py --no-cache # ignore and do not update the incremental scan cache
+  python3 scan_words.py --no-index # skip the word -> files index (words.idx)
+  python3 scan_words.py --watch    # keep words.csv up to date as JSON files change
+
+Incremental cache:
+- By default a `.scan_cache` file is kept next to the output CSV
+- It stores each JSON file's size, mtime, content hash and extracted words
+- On rerun only new/changed files are parsed, deleted files are dropped,
+  and the CSV is rewritten from the cache
+- The same snapshot is shared by download_word_audio.py and
+  generate_word_images.py through word_corpus.py
 """
 
 from __future__ import annotations
 
 import argparse
-import json
-import re
+import os
+import time
 from pathlib import Path
 import csv
-from typing import Iterable, Set, Any
-
+from typing import List, Optional, Set, Tuple
 
-WORD_PATTERN = re.compile(r"[A-Za-z]+(?:[-'][A-Za-z]+)*")
+# Extraction rules live in word_extractor; the names are re-exported here for
+# callers that historically imported them from scan_words.
+from word_extractor import (
+    WORD_PATTERN,
+    extract_words_from_json_data,
+    extract_words_from_json_file,
+    extract_words_from_text,
+    read_text_file,
+)
+from fs_watch import create_watcher
+from word_corpus import SNAPSHOT_NAME, WordCorpus, list_json_files
+from word_index import write_word_index
 
 
-def extract_words_from_text(text: str) -> Set[str]:
-    """Extract candidate English words from free text using a conservative regex.
+def iter_json_files(input_dir: Path, output_path: Path) -> List[Path]:
+    """List the JSON files to scan, in a stable (sorted) order.
 
-    This is retained only for fallback when a JSON file fails to parse.
-    We additionally filter out single-letter tokens to avoid noise like 'y'/'z'.
+    - Only .json files are considered
+    - The output file itself is explicitly skipped if present
     """
-    candidates = WORD_PATTERN.findall(text)
-    return {w.lower() for w in candidates if w and len(w) >= 2}
+    return list_json_files(input_dir, [output_path])
 
 
-def extract_words_from_json_data(data: Any) -> Set[str]:
-    """Recursively collect ONLY vocabulary items from JSON schemas.
+def scan_json_file(path: Path) -> Set[str]:
+    """Read and parse a single JSON file and return its vocabulary words.
 
-    Rules:
-    - If an object contains a key 'word' whose value is a string, collect that value
-    - Lists are traversed recursively
-    - All other string values (ids, names, filenames, descriptions, categories, etc.) are ignored
-    - Single-letter tokens are filtered out
+    Large files are parsed with the streaming engine (see word_extractor).
     """
-    collected: Set[str] = set()
-
-    if data is None:
-        return collected
-
-    if isinstance(data, dict):
-        # If this dict directly defines a word item
-        if "word" in data and isinstance(data["word"], str):
-            w = data["word"].strip().lower()
-            if len(w) >= 2 and WORD_PATTERN.fullmatch(w.replace("'", "'") if True else w):
-                collected.add(w)
-        # Recurse into other nested structures
-        for value in data.values():
-            if isinstance(value, (dict, list)):
-                collected |= extract_words_from_json_data(value)
-        return collected
-
-    if isinstance(data, list):
-        for item in data:
-            collected |= extract_words_from_json_data(item)
-        return collected
-
-    # Primitive strings without key context are ignored
-    return collected
-
-
-def read_text_file(path: Path) -> str:
-    try:
-        return path.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return ""
+    return extract_words_from_json_file(path)
 
 
-def collect_words_per_file(input_dir: Path, output_path: Path) -> dict[Path, Set[str]]:
-    """Walk the directory and collect words per JSON file.
+def collect_words_per_file(input_dir: Path, output_path: Path, jobs: int = 1) -> dict[Path, Set[str]]:
+    """Walk the directory and collect words per JSON file (no snapshot).
 
-    - Only .json files are considered
-    - The output file itself is explicitly skipped if present
-    - For invalid JSON, we fall back to conservative text extraction (still per-file)
+    - With jobs > 1, reading/parsing/extraction is spread over a process pool
+    - Results are merged in the sorted file order, so the output is identical
+      to a serial run regardless of worker scheduling
     """
-    file_to_words: dict[Path, Set[str]] = {}
+    corpus = WordCorpus(input_dir, None, exclude=[output_path])
+    corpus.refresh(jobs)
+    return corpus.words_by_file()
 
-    for path in input_dir.rglob("*"):
-        if not path.is_file():
-            continue
 
-        # Skip the generated output file if present
-        try:
-            if path.resolve() == output_path.resolve():
-                continue
-        except Exception:
-            # In case of permission or resolution issues, also skip by common names
-            if path.name in {"words.csv", "words.txt"}:
-                continue
+def collect_words_per_file_cached(
+    input_dir: Path,
+    output_path: Path,
+    cache_path: Path,
+    jobs: int = 1,
+) -> Tuple[dict[Path, Set[str]], int]:
+    """Like collect_words_per_file, but reuse unchanged files from the corpus snapshot.
+
+    See word_corpus.WordCorpus for the invalidation rules. Returns
+    (file_to_words, number_of_files_parsed).
+    """
+    corpus = WordCorpus(input_dir, cache_path, exclude=[output_path])
+    parsed = corpus.refresh(jobs)
+    return corpus.words_by_file(), parsed
 
-        if path.suffix.lower() != ".json":
-            # Ignore non-JSON files to avoid pulling in README/config noise
-            continue
 
-        text = read_text_file(path)
-        if not text:
-            continue
+def sorted_output_files(input_dir: Path, file_to_words: dict[Path, Set[str]]) -> List[Path]:
+    """Files in CSV row order: basename (case-insensitive), then relative path."""
+    def sort_key(p: Path) -> tuple[str, str]:
+        return (p.name.lower(), str(p.relative_to(input_dir)))
 
-        words_for_file: Set[str] = set()
-        try:
-            data = json.loads(text)
-        except Exception:
-            words_for_file |= extract_words_from_text(text)
-        else:
-            words_for_file |= extract_words_from_json_data(data)
+    return sorted(file_to_words.keys(), key=sort_key)
 
-        if words_for_file:
-            file_to_words[path] = words_for_file
 
-    return file_to_words
+def render_row(path: Path, words: Set[str]) -> List[str]:
+    """CSV row: file, count, words (space-separated)."""
+    words_sorted = sorted(words, key=lambda s: (s.lower(), s))
+    return [path.name, str(len(words_sorted)), " ".join(words_sorted)]
 
 
 def write_words_per_file(
     input_dir: Path,
     file_to_words: dict[Path, Set[str]],
     output_file: Path,
+    row_cache: Optional[dict[Path, List[str]]] = None,
 ) -> None:
-    output_file.parent.mkdir(parents=True, exist_ok=True)
+    """Write words.csv atomically (temp file + rename).
 
-    # Sort files by basename (case-insensitive), fallback to relative path
-    def sort_key(p: Path) -> tuple[str, str]:
-        return (p.name.lower(), str(p.relative_to(input_dir)))
+    row_cache, if given, holds already-rendered rows; only files missing from
+    it are rendered (watch mode invalidates just the rows that changed).
+    """
+    output_file.parent.mkdir(parents=True, exist_ok=True)
 
     total_files = len(file_to_words)
     total_words = 0
 
-    with output_file.open("w", encoding="utf-8", newline="") as f:
+    tmp_file = output_file.with_name(output_file.name + ".tmp")
+    with tmp_file.open("w", encoding="utf-8", newline="") as f:
         writer = csv.writer(f)
         # Header row
         writer.writerow(["file", "count", "words"])
-        for path in sorted(file_to_words.keys(), key=sort_key):
-            words_sorted = sorted(file_to_words[path], key=lambda s: (s.lower(), s))
-            count = len(words_sorted)
-            total_words += count
-
-            # CSV row: file, count, words (space-separated)
-            writer.writerow([path.name, str(count), " ".join(words_sorted)])
+        for path in sorted_output_files(input_dir, file_to_words):
+            row = row_cache.get(path) if row_cache is not None else None
+            if row is None:
+                row = render_row(path, file_to_words[path])
+                if row_cache is not None:
+                    row_cache[path] = row
+            total_words += int(row[1])
+            writer.writerow(row)
 
         # Final summary rows
         writer.writerow(["__summary__", "files", str(total_files)])
         writer.writerow(["__summary__", "total_words", str(total_words)])
+    os.replace(tmp_file, output_file)
+
+
+def write_inverted_index(input_dir: Path, file_to_words: dict[Path, Set[str]], index_file: Path) -> None:
+    """Emit the word -> files index (see word_index.py) in CSV row order."""
+    ordered = {
+        path.relative_to(input_dir).as_posix(): file_to_words[path]
+        for path in sorted_output_files(input_dir, file_to_words)
+    }
+    write_word_index(index_file, ordered)
+
+
+def write_outputs(
+    input_dir: Path,
+    file_to_words: dict[Path, Set[str]],
+    output_file: Path,
+    index_file: Optional[Path],
+    row_cache: Optional[dict[Path, List[str]]] = None,
+) -> None:
+    write_words_per_file(input_dir, file_to_words, output_file, row_cache)
+    if index_file is not None:
+        write_inverted_index(input_dir, file_to_words, index_file)
+
+
+def expand_changed_paths(
+    input_dir: Path,
+    output_file: Path,
+    changed: Set[Path],
+    tracked: Set[Path],
+) -> Set[Path]:
+    """Turn watcher paths (files or directories) into the JSON files to re-check.
+
+    A directory path covers every JSON file now below it plus every tracked
+    file that used to be below it (e.g. a chapter folder that was removed).
+    """
+    affected: Set[Path] = set()
+    for path in changed:
+        if path.is_dir():
+            affected.update(iter_json_files(path, output_file))
+        elif path.suffix.lower() == ".json" and path != output_file:
+            affected.add(path)
+        affected.update(t for t in tracked if path in t.parents)
+    return {p for p in affected if p == input_dir or input_dir in p.parents}
+
+
+def watch_words(
+    input_dir: Path,
+    output_file: Path,
+    index_file: Optional[Path],
+    cache_path: Optional[Path],
+    jobs: int,
+    debounce: float,
+    poll_interval: float,
+    force_polling: bool,
+) -> int:
+    """Keep words.csv (and words.idx / .scan_cache) up to date until Ctrl-C.
+
+    The parsed corpus (word_corpus.WordCorpus) stays in memory. Each burst
+    of filesystem events is coalesced (until `debounce` seconds pass without
+    new events), only the affected files are re-parsed, and the outputs are
+    rewritten atomically.
+    """
+    corpus = WordCorpus(input_dir, cache_path, exclude=[output_file])
+    corpus.refresh(jobs)
+    per_file = corpus.words_by_file()
+    row_cache: dict[Path, List[str]] = {}
+    write_outputs(input_dir, per_file, output_file, index_file, row_cache)
+
+    watcher = create_watcher(input_dir, interval=poll_interval, force_polling=force_polling)
+    print(f"[WATCH] {len(per_file)} file(s) loaded; watching {input_dir} "
+          f"with {type(watcher).__name__} (Ctrl-C to stop)")
+
+    try:
+        while True:
+            changed = watcher.poll(None)
+            # Coalesce a burst of saves/renames into one rewrite
+            while True:
+                more = watcher.poll(debounce)
+                if not more:
+                    break
+                changed |= more
+
+            tracked = {f.path for f in corpus.files}
+            affected = expand_changed_paths(input_dir, output_file, changed, tracked)
+            if not affected:
+                continue
+
+            updated, removed = corpus.update_paths(affected, jobs)
+            for path in affected:
+                row_cache.pop(path, None)
+            per_file = corpus.words_by_file()
+            write_outputs(input_dir, per_file, output_file, index_file, row_cache)
+            total_words = sum(len(v) for v in per_file.values())
+            print(f"[WATCH] {time.strftime('%H:%M:%S')} updated {updated}, removed {removed} "
+                  f"-> {len(per_file)} files, {total_words} words")
+    except KeyboardInterrupt:
+        print("\n[WATCH] Stopped")
+    finally:
+        watcher.close()
+    return 0
 
 
 def main() -> int:
@@ -179,6 +271,57 @@ def main() -> int:
         default=default_output,
         help="Output file path for words.csv (default: proj/words/words.csv)",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes for parsing JSON files (default: 1, 0 = all CPUs)",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="Incremental scan cache path (default: .scan_cache next to the output file)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the incremental scan cache and parse every file",
+    )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=None,
+        help="Word -> files index path (default: words.idx next to the output file)",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Do not write the word -> files index",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rewrite the outputs whenever JSON files change",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.5,
+        help="Watch mode: seconds of quiet before a burst of changes is written (default: 0.5)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Watch mode: polling interval when inotify is unavailable (default: 1.0)",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Watch mode: force stat polling even where inotify is available",
+    )
 
     args = parser.parse_args()
 
@@ -189,16 +332,39 @@ def main() -> int:
         print(f"[ERROR] Input directory does not exist or is not a directory: {input_dir}")
         return 1
 
-    per_file = collect_words_per_file(input_dir, output_file)
-    write_words_per_file(input_dir, per_file, output_file)
+    index_file: Optional[Path] = None if args.no_index else (args.index or output_file.with_suffix(".idx"))
+    cache_path: Optional[Path] = None if args.no_cache else (args.cache or output_file.parent / SNAPSHOT_NAME)
+
+    if args.watch:
+        return watch_words(
+            input_dir,
+            output_file,
+            index_file,
+            cache_path,
+            jobs=args.jobs,
+            debounce=args.debounce,
+            poll_interval=args.poll_interval,
+            force_polling=args.poll,
+        )
+
+    parsed: Optional[int] = None
+    if cache_path is None:
+        per_file = collect_words_per_file(input_dir, output_file, jobs=args.jobs)
+    else:
+        per_file, parsed = collect_words_per_file_cached(input_dir, output_file, cache_path, jobs=args.jobs)
+    write_outputs(input_dir, per_file, output_file, index_file)
 
     # Compute stats for console output (same as file summary)
     total_files = len(per_file)
     total_words = sum(len(v) for v in per_file.values())
 
     print(f"[OK] Scanned JSON files: {total_files}")
+    if parsed is not None:
+        print(f"[OK] Parsed new/changed files: {parsed} (others reused from cache)")
     print(f"[OK] Total words (per-file sum): {total_words}")
     print(f"[OK] Wrote to: {output_file}")
+    if index_file is not None:
+        print(f"[OK] Wrote index: {index_file}")
     return 0
 
 
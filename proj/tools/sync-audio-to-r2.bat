@@ -81,6 +81,13 @@ echo.
 echo [成功] 音频下载完成！
 echo.
 
+REM 生成词库音频包（audio/packs，一个请求加载整个词库的音频）
+python audio_pack.py
+if %errorlevel% neq 0 (
+    echo [警告] 音频包生成失败，仅上传单个音频文件
+)
+echo.
+
 REM ============================================
 REM 步骤 3：上传到 R2
 REM ============================================
@@ -92,6 +92,12 @@ echo ""
 echo -e "${GREEN}✅ 音频下载完成！${NC}"
 echo ""
 
+# 生成词库音频包（audio/packs，一个请求加载整个词库的音频）
+if ! $PYTHON_CMD audio_pack.py; then
+    echo -e "${YELLOW}⚠️  音频包生成失败，仅上传单个音频文件${NC}"
+fi
+echo ""
+
 # ============================================
 # 步骤 3：上传到 R2
 # ============================================
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for AudioIndex.put, refresh and the aliases of a file whose content changes.
+
+Run from proj/tools:
+  python3 -m unittest test_audio_index
+"""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from audio_index import AudioIndex
+
+
+BOARD = b"board audio" * 50
+THIRD = b"third audio" * 50
+NEW = b"new board audio" * 50
+
+
+class PutAliasesTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.audio_dir = Path(self._tmp.name)
+        self.index = AudioIndex(self.audio_dir)
+        self.store("board_youdao.mp3", BOARD)
+        self.store("third_youdao.mp3", THIRD)
+        # bored has the same audio as board, so it is indexed as an alias of it
+        self.store("bored_youdao.mp3", BOARD)
+        self.assertEqual(self.index.get("bored_youdao.mp3").file, "board_youdao.mp3")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def store(self, name: str, data: bytes) -> None:
+        """Index data for name and write the file the way the downloader does."""
+        self.index.put(name, data)
+        (self.audio_dir / name).write_bytes(data)
+
+    def assert_audio(self, name: str, data: bytes) -> None:
+        path = self.index.stored_path(name)
+        self.assertIsNotNone(path)
+        self.assertEqual(path.read_bytes(), data)
+
+    def test_new_content_matches_another_file(self):
+        self.store("board_youdao.mp3", THIRD)
+
+        self.assertEqual(self.index.get("board_youdao.mp3").file, "third_youdao.mp3")
+        self.assertEqual(self.index.get("bored_youdao.mp3").file, "bored_youdao.mp3")
+        self.assert_audio("bored_youdao.mp3", BOARD)
+        self.assertEqual(self.index.refresh(), (0, 0))
+        self.assert_audio("bored_youdao.mp3", BOARD)
+
+    def test_new_content_is_stored(self):
+        self.store("board_youdao.mp3", NEW)
+
+        self.assert_audio("board_youdao.mp3", NEW)
+        self.assertEqual(self.index.get("bored_youdao.mp3").file, "bored_youdao.mp3")
+        self.assert_audio("bored_youdao.mp3", BOARD)
+        self.assertEqual(self.index.refresh(), (0, 0))
+        self.assert_audio("bored_youdao.mp3", BOARD)
+
+    def test_alias_with_the_new_content_follows_it(self):
+        self.store("board_youdao.mp3", NEW)
+        self.store("bored_youdao.mp3", NEW)
+        self.store("board_youdao.mp3", THIRD)
+
+        self.assertEqual(self.index.get("bored_youdao.mp3").file, "bored_youdao.mp3")
+        self.assert_audio("bored_youdao.mp3", NEW)
+
+    def test_refresh_keeps_alias_copies(self):
+        self.index.save()
+        index = AudioIndex(self.audio_dir).load()
+
+        self.assertEqual(index.refresh(verify=True), (0, 0))
+        self.assertEqual(index.get("bored_youdao.mp3").file, "board_youdao.mp3")
+        self.assert_audio("bored_youdao.mp3", BOARD)
+
+    def test_stored_file_removed_promotes_alias_copy(self):
+        (self.audio_dir / "board_youdao.mp3").unlink()
+
+        self.assertEqual(self.index.refresh(), (0, 1))
+        self.assertIsNone(self.index.get("board_youdao.mp3"))
+        self.assertEqual(self.index.get("bored_youdao.mp3").file, "bored_youdao.mp3")
+        self.assert_audio("bored_youdao.mp3", BOARD)
+
+    def test_dedupe_keeps_files(self):
+        # Written by another process: refresh indexes it as a second stored copy
+        (self.audio_dir / "dup_youdao.mp3").write_bytes(THIRD)
+        self.assertEqual(self.index.refresh(), (1, 0))
+
+        self.assertEqual(self.index.dedupe(), ["third_youdao.mp3"])
+        self.assertEqual(self.index.get("third_youdao.mp3").file, "dup_youdao.mp3")
+        self.assertTrue((self.audio_dir / "dup_youdao.mp3").exists())
+        self.assertEqual(self.index.refresh(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the directory watchers behind `scan_words.py --watch`.
+
+Run from proj/tools:
+  python3 -m unittest test_fs_watch
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Set
+
+from fs_watch import InotifyWatcher, PollingWatcher
+
+
+def collect(watcher, wanted: Path, timeout: float = 3.0) -> Set[Path]:
+    """Poll until `wanted` (or a directory above it) is reported, or timeout passes."""
+    seen: Set[Path] = set()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        seen |= watcher.poll(0.2)
+        if any(path == wanted or path in wanted.parents for path in seen):
+            break
+    return seen
+
+
+def drain(watcher) -> None:
+    while watcher.poll(0.3):
+        pass
+
+
+class WatcherTests:
+    """Shared cases; subclasses provide make_watcher()."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self._tmp.name)
+        self.root = self.base / "words"
+        self.root.mkdir()
+        self.watcher = self.make_watcher(self.root)
+
+    def tearDown(self):
+        self.watcher.close()
+        self._tmp.cleanup()
+
+    def assert_reported(self, path: Path) -> None:
+        seen = collect(self.watcher, path)
+        self.assertTrue(
+            any(p == path or p in path.parents for p in seen),
+            f"{path} not reported, got {sorted(map(str, seen))}",
+        )
+
+    def test_new_file(self):
+        target = self.root / "day01.json"
+        target.write_text("{}", encoding="utf-8")
+        self.assert_reported(target)
+
+    def test_rename_then_create(self):
+        (self.root / "a").mkdir()
+        drain(self.watcher)
+        os.rename(self.root / "a", self.root / "b")
+        drain(self.watcher)
+
+        target = self.root / "b" / "x.json"
+        target.write_text("{}", encoding="utf-8")
+        self.assert_reported(target)
+
+    def test_rename_nested_then_create(self):
+        (self.root / "a" / "sub").mkdir(parents=True)
+        drain(self.watcher)
+        os.rename(self.root / "a", self.root / "b")
+        drain(self.watcher)
+
+        target = self.root / "b" / "sub" / "x.json"
+        target.write_text("{}", encoding="utf-8")
+        self.assert_reported(target)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class InotifyWatcherTest(WatcherTests, unittest.TestCase):
+    def make_watcher(self, root: Path):
+        return InotifyWatcher(root)
+
+    def test_moved_out_of_tree_is_unwatched(self):
+        (self.root / "a" / "sub").mkdir(parents=True)
+        drain(self.watcher)
+        outside = self.base / "outside"
+        shutil.move(str(self.root / "a"), str(outside))
+        drain(self.watcher)
+
+        (outside / "x.json").write_text("{}", encoding="utf-8")
+        (outside / "sub" / "y.json").write_text("{}", encoding="utf-8")
+        self.assertEqual(self.watcher.poll(0.5), set())
+        self.assertEqual(set(self.watcher._wd_to_dir.values()), {self.root})
+
+
+class PollingWatcherTest(WatcherTests, unittest.TestCase):
+    def make_watcher(self, root: Path):
+        return PollingWatcher(root, interval=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
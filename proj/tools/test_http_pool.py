@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for HTTPPool connection reuse and its retry rule: a request whose
+response was lost on a reused connection is sent again only if its method
+is idempotent.
+
+Run from proj/tools:
+  python3 -m unittest test_http_pool
+"""
+
+from __future__ import annotations
+
+import http.client
+import socket
+import threading
+import unittest
+import urllib.error
+from typing import List
+
+from http_pool import HTTPPool
+
+
+class RawServer:
+    """Minimal HTTP/1.1 server on a raw socket, so tests control when connections drop.
+
+    `drop_on` is the request number on a connection (1-based) after which the
+    connection is closed without a response; `close_after` closes it right
+    after that response (without "Connection: close", like an idle timeout).
+    """
+
+    def __init__(self, drop_on: int = 0, close_after: int = 0, status: int = 200):
+        self.drop_on = drop_on
+        self.close_after = close_after
+        self.status = status
+        self.received: List[str] = []
+        # Set whenever the server has closed a connection
+        self.closed = threading.Event()
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen()
+        self.url = f"http://127.0.0.1:{self._sock.getsockname()[1]}/x"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        try:
+            self._answer(conn)
+        finally:
+            self.closed.set()
+
+    def _answer(self, conn: socket.socket) -> None:
+        with conn, conn.makefile("rb") as f:
+            count = 0
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                length = 0
+                while True:
+                    header = f.readline()
+                    if header in (b"\r\n", b""):
+                        break
+                    if header.lower().startswith(b"content-length:"):
+                        length = int(header.split(b":", 1)[1])
+                f.read(length)
+                self.received.append(line.split()[0].decode())
+                count += 1
+                if count == self.drop_on:
+                    return
+                conn.sendall(f"HTTP/1.1 {self.status} X\r\nContent-Length: 2\r\n\r\nok".encode())
+                if count == self.close_after:
+                    return
+
+
+class HTTPPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = HTTPPool(timeout=5)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def serve(self, **kwargs) -> RawServer:
+        server = RawServer(**kwargs)
+        self.addCleanup(server.close)
+        return server
+
+    def fetch(self, method: str, url: str) -> bytes:
+        body = b"{}" if method == "POST" else None
+        with self.pool.request(method, url, body=body) as resp:
+            return resp.read()
+
+    def test_connection_is_reused(self):
+        server = self.serve()
+        for _ in range(5):
+            self.assertEqual(self.fetch("GET", server.url), b"ok")
+        self.assertEqual(self.pool.connections_opened, 1)
+        self.assertEqual(len(self.pool._all), 1)
+
+    def test_lost_response_to_get_is_retried(self):
+        server = self.serve(drop_on=2)
+        self.fetch("GET", server.url)
+
+        self.assertEqual(self.fetch("GET", server.url), b"ok")
+        self.assertEqual(server.received, ["GET", "GET", "GET"])
+        self.assertEqual(len(self.pool._all), 1)
+
+    def test_lost_response_to_post_is_not_retried(self):
+        server = self.serve(drop_on=2)
+        self.fetch("POST", server.url)
+
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.fetch("POST", server.url)
+        self.assertEqual(server.received, ["POST", "POST"])
+        self.assertEqual(len(self.pool._all), 0)
+
+    def test_post_on_idle_connection_closed_by_server(self):
+        server = self.serve(close_after=1)
+        self.fetch("POST", server.url)
+        self.assertTrue(server.closed.wait(5))
+
+        self.assertEqual(self.fetch("POST", server.url), b"ok")
+        self.assertEqual(server.received, ["POST", "POST"])
+        self.assertEqual(self.pool.connections_opened, 2)
+        self.assertEqual(len(self.pool._all), 1)
+
+    def test_error_status_raises_http_error(self):
+        server = self.serve(status=503)
+        with self.assertRaises(urllib.error.HTTPError) as caught:
+            self.fetch("GET", server.url)
+        self.assertEqual(caught.exception.code, 503)
+        self.assertEqual(caught.exception.read(), b"ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
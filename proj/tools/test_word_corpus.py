@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the .scan_cache snapshot behind WordCorpus (scan_words.py and the
+asset tools): which files a refresh parses again and which it drops.
+
+Run from proj/tools:
+  python3 -m unittest test_word_corpus
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict
+
+from word_corpus import SNAPSHOT_NAME, WordCorpus
+
+
+def vocabulary(*words: str) -> str:
+    return json.dumps({"words": [{"word": w, "phonetic": f"[{w}]", "meaning": w.upper()} for w in words]})
+
+
+class ScanCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        (self.root / "daily-phonics").mkdir()
+        self.write("daily-phonics/day01.json", vocabulary("cat", "hat"))
+        self.write("daily-phonics/day02.json", vocabulary("dog"))
+        self.assertEqual(self.corpus().refresh(), 2)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, rel: str, text: str) -> Path:
+        path = self.root / rel
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def corpus(self) -> WordCorpus:
+        """A new corpus on the snapshot, like the next run of a tool."""
+        return WordCorpus(self.root, self.root / SNAPSHOT_NAME)
+
+    def words_by_rel(self, corpus: WordCorpus) -> Dict[str, set]:
+        return {f.rel: f.words for f in corpus.files}
+
+    def test_unchanged_files_are_not_parsed(self):
+        corpus = self.corpus()
+        self.assertEqual(corpus.refresh(), 0)
+        self.assertEqual(corpus.all_words(), {"cat", "hat", "dog"})
+        self.assertEqual(corpus.details("cat"), ("[cat]", "CAT"))
+
+    def test_changed_content_is_parsed(self):
+        self.write("daily-phonics/day02.json", vocabulary("dog", "frog"))
+
+        corpus = self.corpus()
+        self.assertEqual(corpus.refresh(), 1)
+        self.assertEqual(self.words_by_rel(corpus)["daily-phonics/day02.json"], {"dog", "frog"})
+        self.assertEqual(self.corpus().refresh(), 0)
+
+    def test_touched_file_with_same_content_is_not_parsed(self):
+        path = self.root / "daily-phonics/day01.json"
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+        corpus = self.corpus()
+        self.assertEqual(corpus.refresh(), 0)
+        self.assertEqual(self.words_by_rel(corpus)["daily-phonics/day01.json"], {"cat", "hat"})
+
+    def test_deleted_file_is_dropped(self):
+        (self.root / "daily-phonics/day02.json").unlink()
+
+        corpus = self.corpus()
+        self.assertEqual(corpus.refresh(), 0)
+        self.assertEqual(corpus.all_words(), {"cat", "hat"})
+        snapshot = json.loads((self.root / SNAPSHOT_NAME).read_text(encoding="utf-8"))
+        self.assertEqual(list(snapshot["files"]), ["daily-phonics/day01.json"])
+
+    def test_snapshot_of_another_version_is_ignored(self):
+        snapshot_path = self.root / SNAPSHOT_NAME
+        snapshot = json.loads(snapshot_path.read_text(encoding="utf-8"))
+        snapshot["version"] -= 1
+        snapshot_path.write_text(json.dumps(snapshot), encoding="utf-8")
+
+        self.assertEqual(self.corpus().refresh(), 2)
+
+    def test_update_paths(self):
+        corpus = self.corpus()
+        corpus.refresh()
+        added = self.write("daily-phonics/day03.json", vocabulary("sun"))
+        removed = self.root / "daily-phonics/day01.json"
+        removed.unlink()
+
+        self.assertEqual(corpus.update_paths([added, removed]), (1, 1))
+        self.assertEqual(corpus.all_words(), {"dog", "sun"})
+        self.assertEqual(self.corpus().refresh(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
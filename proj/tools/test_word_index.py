@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the words.idx inverted index (write_word_index / WordIndex).
+
+Run from proj/tools:
+  python3 -m unittest test_word_index
+"""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from word_index import WordIndex, write_word_index
+
+
+FILES = {
+    "daily-phonics/day01.json": ["cat", "hat", "ice cream"],
+    "daily-phonics/day02.json": ["dog", "cat"],
+    "grade-based/grade3.json": ["café", "dog", "zebra"],
+}
+
+
+class WordIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "words.idx"
+        write_word_index(self.path, FILES)
+        self.index = WordIndex(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        self._tmp.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(self.index.n_files, 3)
+        self.assertEqual(self.index.n_words, 6)
+        for name, words in FILES.items():
+            for word in words:
+                self.assertIn(name, self.index.lookup(word))
+
+    def test_postings_follow_file_order(self):
+        self.assertEqual(self.index.lookup("cat"), ["daily-phonics/day01.json", "daily-phonics/day02.json"])
+        self.assertEqual(self.index.lookup("dog"), ["daily-phonics/day02.json", "grade-based/grade3.json"])
+
+    def test_lookup_normalizes_the_query(self):
+        self.assertEqual(self.index.lookup("  Zebra "), ["grade-based/grade3.json"])
+        self.assertEqual(self.index.lookup("CAFÉ"), ["grade-based/grade3.json"])
+        self.assertEqual(self.index.lookup("ice cream"), ["daily-phonics/day01.json"])
+
+    def test_missing_words(self):
+        for word in ("", "a", "ca", "cats", "zzz"):
+            self.assertEqual(self.index.lookup(word), [])
+            self.assertNotIn(word, self.index)
+        self.assertIn("hat", self.index)
+
+    def test_lookup_many(self):
+        self.assertEqual(
+            self.index.lookup_many(["hat", "nope", "hat"]),
+            {"hat": ["daily-phonics/day01.json"], "nope": []},
+        )
+
+    def test_rejects_other_files(self):
+        other = self.path.with_name("other.idx")
+        other.write_bytes(b"not an index" * 10)
+        with self.assertRaises(ValueError):
+            WordIndex(other)
+        other.write_bytes(b"")
+        with self.assertRaises(ValueError):
+            WordIndex(other)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Run metrics for the proj/tools network scripts (audio downloader, image generator).
+
+A Metrics object collects, thread-safely:
+
+- counters      requests_total{endpoint,status}, response_bytes_total{endpoint},
+                retries_total, items_total{result}, phase_seconds_total{phase}, ...
+- gauges        e.g. rate_limit_per_second{endpoint}
+- histograms    request_duration_seconds{endpoint}, item_duration_seconds,
+                rate_limit_wait_seconds{endpoint}, ...
+
+At the end of a run write() stores a JSON summary (<tool>.json: counters,
+gauges, and per histogram count/sum/mean/p50/p95/p99/max plus cumulative
+buckets) and the same data in Prometheus text format (<tool>.prom, metric
+names prefixed with "wordpractice_", every series labelled with the tool), so
+runs can be compared or scraped via the node_exporter textfile collector.
+start_live() prints a one-line status to stderr every second.
+
+    metrics = Metrics("download_word_audio")
+    with metrics.phase("scan"):
+        ...
+    metrics.record_request("youdao", seconds, 200, len(body))
+    metrics.write(Path("metrics"))
+
+Histograms keep their observations (a run makes at most some 100k requests),
+so the reported quantiles are exact rather than interpolated from buckets.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+
+PROMETHEUS_PREFIX = "wordpractice_"
+METRICS_DIR_NAME = "metrics"
+
+# Upper bounds in seconds, from fast CDN hits to slow image generation
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "requests_total": "HTTP requests by endpoint and status (\"error\" = no response)",
+    "request_duration_seconds": "HTTP request latency",
+    "response_bytes_total": "Response body bytes received",
+    "retries_total": "Retried attempts",
+    "extra_requests_total": "Additional requests to the next endpoint (hedged or failover)",
+    "items_total": "Processed items (words) by result",
+    "item_duration_seconds": "Time per item including retries",
+    "phase_seconds_total": "Wall time spent in each phase",
+    "rate_limit_wait_seconds": "Time spent waiting for a rate-limit token",
+    "rate_limit_per_second": "Current request rate limit (0 = unlimited)",
+    "connections_opened": "HTTP connections opened (requests beyond this reused a keep-alive connection)",
+    "throttled_total": "Responses that made the client slow down (429/5xx)",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def quantile(ordered: List[float], q: float) -> float:
+    """Nearest-rank quantile of sorted values (q in 0..1)."""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class Metrics:
+    """Counters, gauges and histograms for one tool run."""
+
+    def __init__(self, tool: str, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.tool = tool
+        self.buckets = buckets
+        self.started = time.time()
+        self._start_monotonic = time.monotonic()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._lock = threading.Lock()
+        self._live_stop: Optional[threading.Event] = None
+        self._live_thread: Optional[threading.Thread] = None
+
+    # ---- recording ------------------------------------------------------------------
+
+    def inc(self, name: str, value: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: object) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = float(value)
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._histograms.setdefault(name, {}).setdefault(key, []).append(float(value))
+
+    def record_request(self, endpoint: str, seconds: float, status: object, nbytes: int = 0) -> None:
+        """One HTTP request: latency, status (int or "error") and body size."""
+        self.observe("request_duration_seconds", seconds, endpoint=endpoint)
+        self.inc("requests_total", endpoint=endpoint, status=status)
+        if nbytes:
+            self.inc("response_bytes_total", nbytes, endpoint=endpoint)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the wall time of the block to phase_seconds_total{phase=name} (accumulates)."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.inc("phase_seconds_total", time.monotonic() - started, phase=name)
+
+    # ---- queries -----------------------------------------------------------------------
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start_monotonic
+
+    def total(self, name: str, **labels: object) -> float:
+        """Sum of a counter over all series matching the given labels."""
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(v for k, v in self._counters.get(name, {}).items() if wanted <= set(k))
+
+    def values(self, name: str, **labels: object) -> List[float]:
+        """Sorted observations of a histogram over all series matching the given labels."""
+        wanted = set(_label_key(labels))
+        with self._lock:
+            series = [v for k, vs in self._histograms.get(name, {}).items() if wanted <= set(k) for v in vs]
+        return sorted(series)
+
+    def quantile(self, name: str, q: float, **labels: object) -> Optional[float]:
+        ordered = self.values(name, **labels)
+        return quantile(ordered, q) if ordered else None
+
+    # ---- export ------------------------------------------------------------------------
+
+    def _histogram_summary(self, values: List[float]) -> dict:
+        ordered = sorted(values)
+        cumulative = {}
+        i = 0
+        for bound in self.buckets:
+            while i < len(ordered) and ordered[i] <= bound:
+                i += 1
+            cumulative[f"{bound:g}"] = i
+        cumulative["+Inf"] = len(ordered)
+        return {
+            "count": len(ordered),
+            "sum": round(sum(ordered), 6),
+            "mean": round(sum(ordered) / len(ordered), 6) if ordered else None,
+            "p50": round(quantile(ordered, 0.5), 6) if ordered else None,
+            "p95": round(quantile(ordered, 0.95), 6) if ordered else None,
+            "p99": round(quantile(ordered, 0.99), 6) if ordered else None,
+            "max": round(ordered[-1], 6) if ordered else None,
+            "buckets": cumulative,
+        }
+
+    def summary(self) -> dict:
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            gauges = {n: dict(s) for n, s in self._gauges.items()}
+            histograms = {n: {k: list(v) for k, v in s.items()} for n, s in self._histograms.items()}
+
+        def series(data: Dict[LabelKey, object]) -> List[dict]:
+            return [{"labels": dict(k), "value": round(v, 6)} for k, v in sorted(data.items())]
+
+        return {
+            "tool": self.tool,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "counters": {n: series(s) for n, s in sorted(counters.items())},
+            "gauges": {n: series(s) for n, s in sorted(gauges.items())},
+            "histograms": {
+                n: [{"labels": dict(k), **self._histogram_summary(v)} for k, v in sorted(s.items())]
+                for n, s in sorted(histograms.items())
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        summary = self.summary()
+        lines: List[str] = []
+
+        def labels_text(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = [("tool", self.tool), *sorted(labels.items())] + ([extra] if extra else [])
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+        def header(name: str, kind: str) -> str:
+            full = PROMETHEUS_PREFIX + name
+            lines.append(f"# HELP {full} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        for kind, section in (("counter", "counters"), ("gauge", "gauges")):
+            for name, items in summary[section].items():
+                full = header(name, kind)
+                for item in items:
+                    lines.append(f"{full}{labels_text(item['labels'])} {item['value']:g}")
+        for name, items in summary["histograms"].items():
+            full = header(name, "histogram")
+            for item in items:
+                for bound, count in item["buckets"].items():
+                    lines.append(f"{full}_bucket{labels_text(item['labels'], ('le', bound))} {count}")
+                lines.append(f"{full}_sum{labels_text(item['labels'])} {item['sum']:g}")
+                lines.append(f"{full}_count{labels_text(item['labels'])} {item['count']}")
+        full = header("run_elapsed_seconds", "gauge")
+        lines.append(f"{full}{labels_text({})} {summary['elapsed_seconds']:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, out_dir: Path) -> Tuple[Path, Path]:
+        """Write <tool>.json and <tool>.prom atomically; returns both paths."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        json_path = out_dir / f"{self.tool}.json"
+        prom_path = out_dir / f"{self.tool}.prom"
+        for path, text in (
+            (json_path, json.dumps(self.summary(), ensure_ascii=False, indent=2) + "\n"),
+            (prom_path, self.to_prometheus()),
+        ):
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_text(text, encoding="utf-8")
+            os.replace(tmp_path, path)
+        return json_path, prom_path
+
+    # ---- live status line ----------------------------------------------------------------
+
+    def status_line(self) -> str:
+        elapsed = self.elapsed
+        requests = self.total("requests_total")
+        errors = requests - sum(
+            self.total("requests_total", status=s) for s in ("200", "206", "304")
+        )
+        p50 = self.quantile("request_duration_seconds", 0.5)
+        p95 = self.quantile("request_duration_seconds", 0.95)
+        latency = f"p50 {p50 * 1000:.0f} ms p95 {p95 * 1000:.0f} ms" if p50 is not None else "p50 - p95 -"
+        mb = self.total("response_bytes_total") / (1024 * 1024)
+        return (
+            f"[{self.tool}] {elapsed:6.1f}s  items {self.total('items_total'):.0f}  "
+            f"req {requests:.0f} ({requests / elapsed if elapsed > 0 else 0:.1f}/s)  "
+            f"{latency}  err {errors:.0f}  retry {self.total('retries_total'):.0f}  {mb:.1f} MB"
+        )
+
+    def start_live(self, interval: float = 1.0, stream: TextIO = sys.stderr) -> None:
+        """Rewrite a status line on stream every interval seconds until stop_live()."""
+        if self._live_thread is not None:
+            return
+        stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.wait(interval):
+                stream.write("\r\033[K" + self.status_line())
+                stream.flush()
+            stream.write("\r\033[K" + self.status_line() + "\n")
+            stream.flush()
+
+        self._live_stop = stop
+        self._live_thread = threading.Thread(target=loop, name="metrics-live", daemon=True)
+        self._live_thread.start()
+
+    def stop_live(self) -> None:
+        if self._live_thread is None:
+            return
+        self._live_stop.set()
+        self._live_thread.join()
+        self._live_thread = None
+        self._live_stop = None
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Online TTS endpoints the audio downloader can fetch word audio from.
+
+These are the same endpoints src/utils/TTSService.js plays from, and the
+provider names are the same tags the browser uses for cached files
+(AudioCacheManager: "<word>_<provider>.mp3"), so a file downloaded from any
+provider is picked up by the game as-is.
+
+    providers = resolve_providers(["youdao", "baidu"])
+    url = providers[0].url("ice cream")
+
+`base_url` points every provider at another origin with the same paths and
+query strings, e.g. mock_tts_server.py for offline benchmarks:
+
+    resolve_providers(["youdao", "baidu"], base_url="http://127.0.0.1:8765")
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+from urllib.parse import quote, urlsplit, urlunsplit
+
+
+@dataclass(frozen=True)
+class TTSProvider:
+    """One TTS endpoint; `url_template` has a {word} placeholder (URL-quoted on use)."""
+
+    name: str
+    url_template: str
+
+    def url(self, word: str) -> str:
+        return self.url_template.format(word=quote(word))
+
+    def with_base(self, base_url: str) -> "TTSProvider":
+        """Same path and query on another origin (scheme://host:port)."""
+        base = urlsplit(base_url)
+        parts = urlsplit(self.url_template)
+        template = urlunsplit((base.scheme, base.netloc, parts.path, parts.query, ""))
+        return TTSProvider(self.name, template)
+
+
+# In the order TTSService.js prefers them on desktop browsers
+PROVIDERS = {
+    "youdao": TTSProvider("youdao", "https://dict.youdao.com/dictvoice?audio={word}&type=1"),
+    "baidu": TTSProvider("baidu", "https://fanyi.baidu.com/gettts?lan=en&text={word}&spd=5&source=web"),
+    "google": TTSProvider("google", "https://translate.google.com/translate_tts?ie=UTF-8&tl=en&client=tw-ob&q={word}"),
+}
+DEFAULT_PROVIDER = "youdao"
+
+
+def resolve_providers(names: List[str], base_url: Optional[str] = None) -> List[TTSProvider]:
+    """Providers by name, in the given order; ValueError for unknown or repeated names."""
+    providers: List[TTSProvider] = []
+    for name in names:
+        key = name.strip().lower()
+        if key not in PROVIDERS:
+            raise ValueError(f"Unknown TTS provider: {name} (known: {', '.join(PROVIDERS)})")
+        if any(p.name == key for p in providers):
+            raise ValueError(f"TTS provider listed twice: {name}")
+        provider = PROVIDERS[key]
+        providers.append(provider.with_base(base_url) if base_url else provider)
+    if not providers:
+        raise ValueError("No TTS provider given")
+    return providers
@@ -12,6 +12,8 @@
  * - 本地保存上传记录，大大减少 API 请求
  * - 自动同步服务器状态（发现服务器已有但本地未记录的文件会补充记录）
  * - 检测文件修改时间，自动重新上传变更的文件
+ * - 音频目录按 audio/index.json 上传：只上传实际存储的文件，按 sha256 判断是否变更，
+ *   内容相同的别名（如 deer → dear）在 R2 上用服务端复制生成，不重复上传
  * 
  * 使用方法：
  * 1. 安装依赖：npm install
@@ -19,7 +21,7 @@
  * 3. 运行：node upload-to-r2.js
  */
 
-const { S3Client, PutObjectCommand, HeadObjectCommand } = require('@aws-sdk/client-s3');
+const { S3Client, PutObjectCommand, HeadObjectCommand, CopyObjectCommand } = require('@aws-sdk/client-s3');
 const fs = require('fs');
 const path = require('path');
 const mime = require('mime-types');
@@ -40,7 +42,13 @@ const config = {
     // 上传图片和音频文件
     uploadDirs: [
         { local: path.join(__dirname, '../images/cache'), remote: 'images/cache' },
-        { local: path.join(__dirname, '../audio'), remote: 'audio' }
+        { local: path.join(__dirname, '../audio'), remote: 'audio' },
+        // 词库音频包（tools/audio_pack.py 生成）
+        { local: path.join(__dirname, '../audio/packs'), remote: 'audio/packs' },
+        // 图片变体：缩略图 / WebP / 渐进式 JPEG（tools/image_variants.py 生成）
+        { local: path.join(__dirname, '../images/variants'), remote: 'images/variants' },
+        // 词库图片图集（tools/image_atlas.py 生成）
+        { local: path.join(__dirname, '../images/atlas'), remote: 'images/atlas' }
     ],
     
     // 本地上传记录缓存文件
@@ -106,13 +114,18 @@ class UploadCache {
     
     /**
      * 检查文件是否已上传（基于本地记录）
+     * 提供 sha256 时按内容哈希判断，不受 git checkout 改变修改时间的影响
      */
-    isUploaded(remotePath, localStat) {
+    isUploaded(remotePath, localStat, sha256 = null) {
         const record = this.cache.files[remotePath];
         if (!record || !record.uploaded) {
             return false;
         }
         
+        if (sha256 && record.sha256) {
+            return record.sha256 === sha256;
+        }
+        
         // 检查文件是否被修改（通过修改时间和大小）
         if (record.size !== localStat.size || record.mtime !== localStat.mtimeMs) {
             return false;
@@ -124,13 +137,16 @@ class UploadCache {
     /**
      * 标记文件已上传
      */
-    markUploaded(remotePath, localStat) {
+    markUploaded(remotePath, localStat, sha256 = null) {
         this.cache.files[remotePath] = {
             uploaded: true,
             size: localStat.size,
             mtime: localStat.mtimeMs,
             uploadedAt: new Date().toISOString()
         };
+        if (sha256) {
+            this.cache.files[remotePath].sha256 = sha256;
+        }
         this.modified = true;
     }
     
@@ -201,6 +217,11 @@ function getAllFiles(dir, fileList = []) {
         const filePath = path.join(dir, file);
         const stat = fs.statSync(filePath);
         
+        // 跳过隐藏文件（下载日志等本地状态）和未完成的临时文件
+        if (file.startsWith('.') || file.endsWith('.part')) {
+            return;
+        }
+        
         if (stat.isDirectory()) {
             getAllFiles(filePath, fileList);
         } else {
@@ -211,6 +232,25 @@ function getAllFiles(dir, fileList = []) {
     return fileList;
 }
 
+/**
+ * 读取音频索引（audio/index.json，由 tools/audio_index.py 维护）
+ * 返回 文件名 -> { word, file, bytes, sha256, duration }，没有索引时返回 null
+ */
+function loadAudioIndex(localDir) {
+    const indexPath = path.join(localDir, 'index.json');
+    if (!fs.existsSync(indexPath)) {
+        return null;
+    }
+    try {
+        const files = JSON.parse(fs.readFileSync(indexPath, 'utf-8')).files;
+        console.log(`📋 加载音频索引: ${Object.keys(files).length} 个文件`);
+        return files;
+    } catch (error) {
+        console.warn('⚠️  音频索引文件损坏，改为扫描目录');
+        return null;
+    }
+}
+
 /**
  * 检查文件是否已存在于 R2
  */
@@ -244,6 +284,20 @@ async function uploadFile(client, bucketName, localPath, remotePath) {
     }));
 }
 
+/**
+ * 在 R2 内复制对象（别名音频，不重新上传内容）
+ */
+async function copyInR2(client, bucketName, sourceKey, targetKey) {
+    const encodedSource = sourceKey.split('/').map(part => encodeURIComponent(part)).join('/');
+    await client.send(new CopyObjectCommand({
+        Bucket: bucketName,
+        CopySource: `${bucketName}/${encodedSource}`,
+        Key: targetKey,
+        ContentType: mime.lookup(targetKey) || 'application/octet-stream',
+        MetadataDirective: 'REPLACE',
+    }));
+}
+
 /**
  * 格式化文件大小
  */
@@ -257,13 +311,28 @@ function formatSize(bytes) {
 // 主上传逻辑（优化版）
 // ============================================
 
-async function uploadDirectory(client, localDir, remotePrefix, uploadCache) {
-    console.log(`\n📁 扫描目录: ${localDir}`);
-    
-    const files = getAllFiles(localDir);
+async function uploadDirectory(client, localDir, remotePrefix, uploadCache, audioIndex = null) {
+    let files;
+    const hashes = {};
+    if (audioIndex) {
+        // 有索引时只上传实际存储的文件（加上索引本身），不扫描目录
+        console.log(`\n📁 按音频索引上传: ${localDir}`);
+        const stored = new Set(['index.json']);
+        for (const entry of Object.values(audioIndex)) {
+            stored.add(entry.file);
+            hashes[entry.file] = entry.sha256;
+        }
+        files = [...stored].sort()
+            .map(name => path.join(localDir, name))
+            .filter(filePath => fs.existsSync(filePath));
+    } else {
+        console.log(`\n📁 扫描目录: ${localDir}`);
+        files = getAllFiles(localDir);
+    }
     console.log(`✅ 找到 ${files.length} 个文件`);
     
     let uploaded = 0;
+    let copied = 0;        // 别名：R2 服务端复制
     let skippedCache = 0;  // 通过本地缓存跳过
     let skippedServer = 0; // 通过服务器查询跳过
     let failed = 0;
@@ -277,6 +346,7 @@ async function uploadDirectory(client, localDir, remotePrefix, uploadCache) {
         
         const stat = fs.statSync(localPath);
         const fileSize = stat.size;
+        const sha256 = hashes[relativePath] || null;
         
         try {
             // 强制上传模式：直接上传所有文件
@@ -285,13 +355,13 @@ async function uploadDirectory(client, localDir, remotePrefix, uploadCache) {
                 apiCalls++;
                 uploaded++;
                 totalSize += fileSize;
-                uploadCache.markUploaded(remotePath, stat);
+                uploadCache.markUploaded(remotePath, stat, sha256);
                 console.log(`✅ [${i + 1}/${files.length}] 强制上传: ${remotePath} (${formatSize(fileSize)})`);
                 continue;
             }
             
             // 1. 先检查本地缓存
-            if (uploadCache.isUploaded(remotePath, stat)) {
+            if (uploadCache.isUploaded(remotePath, stat, sha256)) {
                 skippedCache++;
                 console.log(`⚡ [${i + 1}/${files.length}] 缓存跳过: ${remotePath}`);
                 continue;
@@ -304,7 +374,7 @@ async function uploadDirectory(client, localDir, remotePrefix, uploadCache) {
             if (existsInR2) {
                 // 服务器已有文件，补充到本地缓存
                 skippedServer++;
-                uploadCache.markUploaded(remotePath, stat);
+                uploadCache.markUploaded(remotePath, stat, sha256);
                 console.log(`🔄 [${i + 1}/${files.length}] 同步记录: ${remotePath}`);
                 continue;
             }
@@ -314,7 +384,7 @@ async function uploadDirectory(client, localDir, remotePrefix, uploadCache) {
             apiCalls++;
             uploaded++;
             totalSize += fileSize;
-            uploadCache.markUploaded(remotePath, stat);
+            uploadCache.markUploaded(remotePath, stat, sha256);
             console.log(`✅ [${i + 1}/${files.length}] 上传成功: ${remotePath} (${formatSize(fileSize)})`);
             
         } catch (error) {
@@ -323,7 +393,30 @@ async function uploadDirectory(client, localDir, remotePrefix, uploadCache) {
         }
     }
     
-    return { uploaded, skippedCache, skippedServer, failed, totalSize, apiCalls };
+    // 别名：浏览器仍按 {单词}_youdao.mp3 请求，在 R2 上从存储文件复制一份
+    const aliases = audioIndex ? Object.entries(audioIndex).filter(([name, entry]) => entry.file !== name) : [];
+    for (const [name, entry] of aliases) {
+        const remotePath = `${remotePrefix}/${name}`;
+        const sourcePath = `${remotePrefix}/${entry.file}`;
+        const aliasStat = { size: entry.bytes, mtimeMs: 0 };
+        try {
+            if (!config.forceUpload && uploadCache.isUploaded(remotePath, aliasStat, entry.sha256)) {
+                skippedCache++;
+                console.log(`⚡ 缓存跳过别名: ${remotePath}`);
+                continue;
+            }
+            await copyInR2(client, config.bucketName, sourcePath, remotePath);
+            apiCalls++;
+            copied++;
+            uploadCache.markUploaded(remotePath, aliasStat, entry.sha256);
+            console.log(`🔗 复制别名: ${sourcePath} → ${remotePath}`);
+        } catch (error) {
+            failed++;
+            console.error(`❌ 复制别名失败: ${remotePath}`, error.message);
+        }
+    }
+    
+    return { uploaded, copied, skippedCache, skippedServer, failed, totalSize, apiCalls };
 }
 
 async function main() {
@@ -348,6 +441,7 @@ async function main() {
     // 上传所有目录
     let totalStats = {
         uploaded: 0,
+        copied: 0,
         skippedCache: 0,
         skippedServer: 0,
         failed: 0,
@@ -361,8 +455,10 @@ async function main() {
             continue;
         }
         
-        const stats = await uploadDirectory(client, dir.local, dir.remote, uploadCache);
+        const audioIndex = dir.remote === 'audio' ? loadAudioIndex(dir.local) : null;
+        const stats = await uploadDirectory(client, dir.local, dir.remote, uploadCache, audioIndex);
         totalStats.uploaded += stats.uploaded;
+        totalStats.copied += stats.copied;
         totalStats.skippedCache += stats.skippedCache;
         totalStats.skippedServer += stats.skippedServer;
         totalStats.failed += stats.failed;
@@ -377,13 +473,14 @@ async function main() {
     console.log('\n' + '='.repeat(50));
     console.log('📊 上传统计：');
     console.log(`   ✅ 上传成功: ${totalStats.uploaded} 个文件`);
+    console.log(`   🔗 别名复制: ${totalStats.copied} 个文件`);
     console.log(`   ⚡ 缓存跳过: ${totalStats.skippedCache} 个文件`);
     console.log(`   🔄 同步记录: ${totalStats.skippedServer} 个文件`);
     console.log(`   ❌ 失败: ${totalStats.failed} 个文件`);
     console.log(`   📦 总大小: ${formatSize(totalStats.totalSize)}`);
     console.log(`   🌐 API 调用: ${totalStats.apiCalls} 次`);
     
-    const totalFiles = totalStats.uploaded + totalStats.skippedCache + totalStats.skippedServer + totalStats.failed;
+    const totalFiles = totalStats.uploaded + totalStats.copied + totalStats.skippedCache + totalStats.skippedServer + totalStats.failed;
     const savedCalls = totalFiles - totalStats.apiCalls;
     if (savedCalls > 0) {
         console.log(`   ⚡ 节省请求: ${savedCalls} 次 (通过本地缓存)`);
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Validate the MP3 files in proj/audio from their frame headers.
+
+Each stored file is checked with audio_index.check_mp3 (frame sync, sample
+rate consistency, frame coverage, truncated last frame, duration, likely
+silence) across a process pool. Results are written to the "check" and
+"duration" fields of proj/audio/index.json, so files whose content has not
+changed since their last check are not read again; pass --all to re-check
+everything.
+
+Files that fail are listed (exit status 1), or with --quarantine moved to
+proj/audio/quarantine/ and dropped from the index together with their
+aliases, so the next download_word_audio.py run fetches them again.
+
+Git LFS pointer files cannot be checked; they are reported as skipped.
+
+Usage:
+  python3 validate_audio.py
+  python3 validate_audio.py --all --jobs 8
+  python3 validate_audio.py --quarantine
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from audio_index import CHECK_OK, AudioIndex, describe_file
+from word_corpus import map_in_pool
+
+
+QUARANTINE_DIR_NAME = "quarantine"
+
+
+def files_to_check(index: AudioIndex, check_all: bool) -> List[str]:
+    """Stored file names that have no check result yet (or all of them)."""
+    return sorted(
+        name for name, entry in index.entries.items()
+        if entry.file == name and (check_all or entry.check is None)
+    )
+
+
+def quarantine(index: AudioIndex, name: str) -> List[str]:
+    """Move a stored file and its alias copies to quarantine/ and drop them from the index."""
+    target_dir = index.audio_dir / QUARANTINE_DIR_NAME
+    target_dir.mkdir(parents=True, exist_ok=True)
+    removed = index.remove_stored(name)
+    for other in removed:
+        path = index.audio_dir / other
+        if path.exists():
+            os.replace(path, target_dir / other)
+    return removed
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    default_audio_dir = (script_dir.parent / "audio").resolve()
+
+    parser = argparse.ArgumentParser(description="Check MP3 integrity and duration in proj/audio")
+    parser.add_argument("--audio-dir", type=Path, default=default_audio_dir, help="Audio directory (default: proj/audio)")
+    parser.add_argument("--all", action="store_true", help="Re-check files that already have a result")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Worker processes (default 0 = all CPUs)")
+    parser.add_argument("--quarantine", action="store_true", help="Move failing files to audio/quarantine/ and unindex them")
+    args = parser.parse_args()
+
+    audio_dir = args.audio_dir.resolve()
+    if not audio_dir.is_dir():
+        print(f"[ERROR] Audio directory not found: {audio_dir}")
+        return 1
+
+    index = AudioIndex(audio_dir).load()
+    # New and changed files are hashed and checked here, in the pool
+    index.refresh(jobs=args.jobs)
+    refreshed, _ = index.changes()
+    names = files_to_check(index, args.all)
+    results = map_in_pool(describe_file, [audio_dir / name for name in names], args.jobs)
+    for name, described in zip(names, results):
+        index.set_description(name, described)
+
+    skipped = sum(1 for name, entry in index.entries.items() if entry.file == name and entry.check is None)
+    # A file described by refresh() is listed again by --all; count it once
+    checked = sum(
+        1 for name in set(refreshed) | set(names)
+        if name in index.entries and index.entries[name].file == name and index.entries[name].check is not None
+    )
+    failures: Dict[str, str] = {
+        name: entry.check for name, entry in sorted(index.entries.items())
+        if entry.file == name and entry.check not in (None, CHECK_OK)
+    }
+    for name, status in failures.items():
+        entry = index.entries[name]
+        duration = f"{entry.duration:.2f}s" if entry.duration is not None else "-"
+        print(f"[FAIL] {name}: {status} ({entry.bytes} bytes, {duration})")
+        if args.quarantine:
+            dropped = quarantine(index, name)
+            print(f"       moved to {QUARANTINE_DIR_NAME}/, unindexed: {', '.join(dropped)}")
+
+    # Merge with what a download_word_audio.py run may have saved in the meantime
+    index.save(merge=True)
+    stored = sum(1 for name, entry in index.entries.items() if entry.file == name)
+    print(
+        f"[OK] Checked {checked} files ({skipped} LFS pointers skipped); "
+        f"{stored} stored files, {len(failures)} failed"
+    )
+    if failures and not args.quarantine:
+        print("[WARN] Run with --quarantine to move failing files aside so they are downloaded again")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
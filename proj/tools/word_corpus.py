@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Shared, cached loader for the proj/words vocabulary corpus.
+
+scan_words.py, download_word_audio.py and generate_word_images.py all need
+the same thing: every vocabulary item in every JSON file under proj/words.
+WordCorpus parses each file at most once and keeps the result in a
+persistent snapshot (`proj/words/.scan_cache`) so the whole asset pipeline
+shares one parse:
+
+- Files whose size and mtime match the snapshot are not read at all
+- Files whose stat changed are hashed; only a different sha1 triggers parsing
+- Files that disappeared are dropped
+- Within one process, get_corpus() hands out the same instance
+
+In-memory API (files are listed in words.csv row order):
+
+    corpus = get_corpus(words_dir)
+    corpus.files                 # List[CorpusFile]
+    corpus.words_by_file()       # {Path: Set[str]} (files with words only)
+    corpus.all_words()           # Set[str]
+    corpus.ordered_words()       # unique words, CSV order
+    corpus.phonetic("tree")      # "[triː]"
+    corpus.meaning("tree")       # "树"
+
+Streaming API, for consumers that can start work before the whole tree has
+been scanned (download_word_audio.py):
+
+    corpus = open_corpus(words_dir)
+    for f in corpus.stream(first=lambda rel: rel.startswith("daily-phonics/")):
+        ...                      # each CorpusFile as soon as it is up to date
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from word_extractor import extract_word_details_from_json_file, file_sha1
+
+
+# Bump when the extraction rules or snapshot layout change so stale entries are discarded
+SNAPSHOT_VERSION = 2
+SNAPSHOT_NAME = ".scan_cache"
+# Generated by build_word_bundles.py; copies of the vocabulary files, never scanned
+BUNDLES_DIR_NAME = "bundles"
+
+Details = Dict[str, Tuple[str, str]]
+
+
+@dataclass
+class CorpusFile:
+    path: Path
+    rel: str
+    size: int
+    mtime_ns: int
+    sha1: str
+    # word -> (phonetic, meaning)
+    details: Details = field(default_factory=dict)
+    # False when the file is not valid JSON and words came from the free-text fallback
+    valid_json: bool = True
+
+    @property
+    def words(self) -> Set[str]:
+        return set(self.details)
+
+    def to_json(self) -> dict:
+        return {
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "sha1": self.sha1,
+            "valid": self.valid_json,
+            "words": {w: list(self.details[w]) for w in sorted(self.details)},
+        }
+
+    @classmethod
+    def from_json(cls, path: Path, rel: str, data: dict) -> Optional["CorpusFile"]:
+        try:
+            words = data["words"]
+            return cls(
+                path=path,
+                rel=rel,
+                size=int(data["size"]),
+                mtime_ns=int(data["mtime_ns"]),
+                sha1=str(data["sha1"]),
+                details={w: (v[0], v[1]) for w, v in words.items()},
+                valid_json=bool(data.get("valid", True)),
+            )
+        except Exception:
+            return None
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Normalize a --jobs value: 0 or negative means "use all CPUs"."""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def map_in_pool(func: Callable, items: list, jobs: int) -> list:
+    """Apply func to items, optionally across a process pool, preserving order."""
+    jobs = resolve_jobs(jobs)
+    if jobs > 1 and len(items) > 1:
+        workers = min(jobs, len(items))
+        # A few chunks per worker keeps IPC overhead low while still balancing load
+        chunksize = max(1, len(items) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, items, chunksize=chunksize))
+    return [func(item) for item in items]
+
+
+def list_json_files(root: Path, exclude: Iterable[Path] = ()) -> List[Path]:
+    """List the JSON files below root in a stable (sorted) order.
+
+    Paths in `exclude` (e.g. a generated output file) and the generated
+    bundles directory are skipped.
+    """
+    excluded: Set[Path] = set()
+    for path in exclude:
+        try:
+            excluded.add(path.resolve())
+        except Exception:
+            pass
+
+    json_files: List[Path] = []
+    for path in root.rglob("*"):
+        if path.suffix.lower() != ".json" or not path.is_file() or is_generated_path(root, path):
+            continue
+        if excluded:
+            try:
+                if path.resolve() in excluded:
+                    continue
+            except Exception:
+                # In case of permission or resolution issues, skip by common names
+                if path.name in {"words.csv", "words.txt"}:
+                    continue
+        json_files.append(path)
+
+    json_files.sort()
+    return json_files
+
+
+def is_generated_path(root: Path, path: Path) -> bool:
+    """True for files inside root/bundles (build output, not vocabulary sources)."""
+    try:
+        parts = path.relative_to(root).parts
+    except ValueError:
+        return False
+    return len(parts) > 1 and parts[0] == BUNDLES_DIR_NAME
+
+
+def csv_order_key(root: Path) -> Callable[[Path], Tuple[str, str]]:
+    """Sort key used for words.csv rows: basename (case-insensitive), then relative path."""
+    def sort_key(p: Path) -> Tuple[str, str]:
+        return (p.name.lower(), str(p.relative_to(root)))
+
+    return sort_key
+
+
+def parse_corpus_file(task: Tuple[Path, Optional[str]]) -> Tuple[str, Optional[Details], bool]:
+    """Hash one file and parse it only if the hash differs from the known one.
+
+    Returns (sha1, details, valid_json), where details is None when the
+    content hash matched and the snapshot entry can be reused. Module level
+    so it can be shipped to worker processes.
+    """
+    path, known_digest = task
+    try:
+        digest = file_sha1(path)
+    except Exception:
+        digest = ""
+    if digest and digest == known_digest:
+        return digest, None, True
+    try:
+        return digest, extract_word_details_from_json_file(path, fallback_to_text=False), True
+    except ValueError:
+        return digest, extract_word_details_from_json_file(path), False
+
+
+class WordCorpus:
+    """Parsed view of every JSON vocabulary file below `root`."""
+
+    def __init__(
+        self,
+        root: Path,
+        snapshot_path: Optional[Path] = None,
+        exclude: Iterable[Path] = (),
+    ):
+        self.root = root
+        self.snapshot_path = snapshot_path
+        self.exclude = list(exclude)
+        self._files: Dict[str, CorpusFile] = {}
+        self._loaded_snapshot = False
+        # Number of files actually parsed by the last refresh()/update_paths()
+        self.last_parsed = 0
+
+    # ---- snapshot persistence -------------------------------------------------
+
+    def _load_snapshot(self) -> Dict[str, dict]:
+        if self.snapshot_path is None:
+            return {}
+        try:
+            data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            return {}
+        if data.get("input") != str(self.root.resolve()):
+            return {}
+        files = data.get("files")
+        return files if isinstance(files, dict) else {}
+
+    def save(self) -> None:
+        """Write the snapshot atomically (temp file + rename)."""
+        if self.snapshot_path is None:
+            return
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "input": str(self.root.resolve()),
+            "files": {rel: self._files[rel].to_json() for rel in sorted(self._files)},
+        }
+        # Per-process temp name: sharded downloaders may save the same snapshot concurrently
+        tmp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, self.snapshot_path)
+
+    # ---- loading ----------------------------------------------------------------
+
+    def _rel(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
+
+    def _ensure_snapshot(self) -> None:
+        if not self._loaded_snapshot:
+            self._loaded_snapshot = True
+            for rel, data in self._load_snapshot().items():
+                entry = CorpusFile.from_json(self.root / rel, rel, data)
+                if entry is not None:
+                    self._files[rel] = entry
+
+    def _drop_stale(self, json_files: List[Path]) -> int:
+        stale = set(self._files) - {self._rel(p) for p in json_files}
+        for rel in stale:
+            del self._files[rel]
+        return len(stale)
+
+    def refresh(self, jobs: int = 1) -> int:
+        """Bring the corpus in line with the filesystem; returns files parsed."""
+        self._ensure_snapshot()
+        json_files = list_json_files(self.root, self.exclude)
+        changed = self._sync(json_files, jobs)
+        stale = self._drop_stale(json_files)
+        if changed or stale:
+            self.save()
+        return self.last_parsed
+
+    def stream(self, first: Optional[Callable[[str], bool]] = None) -> Iterator[CorpusFile]:
+        """Refresh file by file, yielding each CorpusFile as soon as it is up to date.
+
+        Files for which first(rel) is true come before the rest; otherwise
+        files are in words.csv row order. The snapshot is saved once the
+        iteration completes; last_parsed counts the files parsed so far.
+        """
+        self._ensure_snapshot()
+        json_files = list_json_files(self.root, self.exclude)
+        key = csv_order_key(self.root)
+        json_files.sort(key=lambda p: (not first(self._rel(p)) if first else False, key(p)))
+
+        changed = parsed = 0
+        for path in json_files:
+            changed += self._sync([path], 1)
+            parsed += self.last_parsed
+            self.last_parsed = parsed
+            entry = self._files.get(self._rel(path))
+            if entry is not None:
+                yield entry
+        stale = self._drop_stale(json_files)
+        if changed or stale:
+            self.save()
+
+    def update_paths(self, paths: Iterable[Path], jobs: int = 1) -> Tuple[int, int]:
+        """Re-check specific files (watch mode); returns (updated, removed)."""
+        present: List[Path] = []
+        removed = 0
+        for path in paths:
+            if is_generated_path(self.root, path):
+                continue
+            if path.is_file() and path.suffix.lower() == ".json":
+                present.append(path)
+            elif self._files.pop(self._rel(path), None) is not None:
+                removed += 1
+        changed = self._sync(sorted(present), jobs)
+        if changed or removed:
+            self.save()
+        return changed, removed
+
+    def _sync(self, paths: List[Path], jobs: int) -> int:
+        """Stat paths, hash/parse the ones whose stat changed; returns entries changed."""
+        stats: Dict[str, Tuple[int, int]] = {}
+        to_check: List[Path] = []
+        for path in paths:
+            rel = self._rel(path)
+            try:
+                st = path.stat()
+            except OSError:
+                self._files.pop(rel, None)
+                continue
+            stats[rel] = (st.st_size, st.st_mtime_ns)
+            entry = self._files.get(rel)
+            if entry is None or (entry.size, entry.mtime_ns) != stats[rel]:
+                to_check.append(path)
+
+        tasks = [(p, getattr(self._files.get(self._rel(p)), "sha1", None)) for p in to_check]
+        self.last_parsed = 0
+        for path, (digest, details, valid_json) in zip(to_check, map_in_pool(parse_corpus_file, tasks, jobs)):
+            rel = self._rel(path)
+            size, mtime_ns = stats[rel]
+            if details is None:
+                details = self._files[rel].details
+                valid_json = self._files[rel].valid_json
+            else:
+                self.last_parsed += 1
+            self._files[rel] = CorpusFile(path, rel, size, mtime_ns, digest, details, valid_json)
+        return len(to_check)
+
+    # ---- query API ----------------------------------------------------------------
+
+    @property
+    def files(self) -> List[CorpusFile]:
+        """All JSON files (with or without words), in words.csv row order."""
+        key = csv_order_key(self.root)
+        return sorted(self._files.values(), key=lambda f: key(f.path))
+
+    def words_by_file(self) -> Dict[Path, Set[str]]:
+        return {f.path: f.words for f in self.files if f.details}
+
+    def all_words(self) -> Set[str]:
+        words: Set[str] = set()
+        for f in self._files.values():
+            words.update(f.details)
+        return words
+
+    def ordered_words(self) -> List[str]:
+        """Unique words in words.csv order (file rows, then words sorted per row)."""
+        seen: Set[str] = set()
+        ordered: List[str] = []
+        for f in self.files:
+            for w in sorted(f.details):
+                if w not in seen:
+                    seen.add(w)
+                    ordered.append(w)
+        return ordered
+
+    def details(self, word: str) -> Tuple[str, str]:
+        """(phonetic, meaning) for a word: first non-empty value in CSV file order."""
+        phonetic = meaning = ""
+        w = word.strip().lower()
+        for f in self.files:
+            found = f.details.get(w)
+            if found is None:
+                continue
+            phonetic = phonetic or found[0]
+            meaning = meaning or found[1]
+            if phonetic and meaning:
+                break
+        return phonetic, meaning
+
+    def phonetic(self, word: str) -> str:
+        return self.details(word)[0]
+
+    def meaning(self, word: str) -> str:
+        return self.details(word)[1]
+
+
+_CORPORA: Dict[Tuple[Path, Optional[Path]], WordCorpus] = {}
+
+
+def get_corpus(
+    root: Path,
+    snapshot_path: Optional[Path] = None,
+    jobs: int = 1,
+    use_snapshot: bool = True,
+) -> WordCorpus:
+    """Return the (refreshed) corpus for root, shared within this process.
+
+    snapshot_path defaults to root/.scan_cache; pass use_snapshot=False for a
+    purely in-memory corpus.
+    """
+    corpus = open_corpus(root, snapshot_path, use_snapshot)
+    corpus.refresh(jobs)
+    return corpus
+
+
+def open_corpus(
+    root: Path,
+    snapshot_path: Optional[Path] = None,
+    use_snapshot: bool = True,
+) -> WordCorpus:
+    """Like get_corpus() but without refreshing, e.g. to use WordCorpus.stream()."""
+    if use_snapshot and snapshot_path is None:
+        snapshot_path = root / SNAPSHOT_NAME
+    if not use_snapshot:
+        snapshot_path = None
+    key = (root.resolve(), snapshot_path.resolve() if snapshot_path else None)
+    corpus = _CORPORA.get(key)
+    if corpus is None:
+        corpus = WordCorpus(root, snapshot_path)
+        _CORPORA[key] = corpus
+    return corpus
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Shared vocabulary extraction used by the proj/tools scripts.
+
+scan_words.py and download_word_audio.py both collect the "word" values from
+the JSON vocabulary files under proj/words. This module is the single
+implementation of those rules:
+
+- An object that has a "word" key with a string value contributes that value
+- Values are stripped and lower-cased; single-letter tokens are dropped
+- Every other string (ids, names, descriptions, stories, ...) is ignored
+
+Two engines are provided:
+
+- extract_words_from_json_data(): walks an already-parsed document with an
+  explicit stack and adds into a single output set (no recursion limit, no
+  intermediate sets)
+- iter_json_words_streaming(): reads a JSON file piece by piece and yields the
+  "word" values without ever materialising the document
+
+Both have a "details" variant that also returns each word's phonetic and
+meaning (extract_word_details_from_json_data / iter_json_word_items_streaming).
+
+extract_words_from_json_file() picks between them based on file size and
+falls back to conservative free-text extraction for invalid JSON.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+
+WORD_PATTERN = re.compile(r"[A-Za-z]+(?:[-'][A-Za-z]+)*")
+
+# Files at least this large are parsed with the streaming engine by default
+STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+STREAM_CHUNK_CHARS = 64 * 1024
+
+# One JSON token, optionally preceded by whitespace. A string that is cut off
+# at the end of the buffer simply fails to match, which signals "read more".
+_JSON_TOKEN = re.compile(
+    r'\s*(?:(?P<punct>[{}\[\]:,])|(?P<string>"(?:[^"\\]|\\.)*")|(?P<scalar>[^\s{}\[\]:,"]+))',
+    re.DOTALL,
+)
+_JSON_SCALAR = re.compile(r"true|false|null|-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?")
+# Object keys captured per vocabulary item, keyed by their raw JSON token
+_CAPTURE_KEY_TOKENS = {'"word"': "word", '"phonetic"': "phonetic", '"meaning"': "meaning"}
+
+
+def normalize_word(value: str) -> Optional[str]:
+    """Apply the vocabulary rules to a raw "word" value; None if rejected."""
+    w = value.strip().lower()
+    if len(w) >= 2 and WORD_PATTERN.fullmatch(w):
+        return w
+    return None
+
+
+def extract_words_from_text(text: str) -> Set[str]:
+    """Extract candidate English words from free text using a conservative regex.
+
+    This is retained only for fallback when a JSON file fails to parse.
+    We additionally filter out single-letter tokens to avoid noise like 'y'/'z'.
+    """
+    candidates = WORD_PATTERN.findall(text)
+    return {w.lower() for w in candidates if w and len(w) >= 2}
+
+
+def extract_words_from_json_data(data: Any, out: Optional[Set[str]] = None) -> Set[str]:
+    """Collect ONLY vocabulary items from a parsed JSON document.
+
+    The structure is walked with an explicit stack, so arbitrarily deep
+    documents are fine, and every word is added straight into one set.
+    Pass `out` to accumulate several documents into the same set.
+    """
+    collected: Set[str] = set() if out is None else out
+    stack: List[Any] = [data]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        node = pop()
+        if isinstance(node, dict):
+            value = node.get("word")
+            if isinstance(value, str):
+                w = normalize_word(value)
+                if w is not None:
+                    collected.add(w)
+            for child in node.values():
+                if isinstance(child, (dict, list)):
+                    push(child)
+        elif isinstance(node, list):
+            for child in node:
+                if isinstance(child, (dict, list)):
+                    push(child)
+
+    return collected
+
+
+def extract_word_details_from_json_data(data: Any) -> Dict[str, Tuple[str, str]]:
+    """Like extract_words_from_json_data, but map each word to (phonetic, meaning).
+
+    When a word occurs several times in a document, the first occurrence
+    that carries a non-empty value wins for each field.
+    """
+    details: Dict[str, Tuple[str, str]] = {}
+    stack: List[Any] = [data]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        node = pop()
+        if isinstance(node, dict):
+            value = node.get("word")
+            if isinstance(value, str):
+                w = normalize_word(value)
+                if w is not None:
+                    phonetic = node.get("phonetic")
+                    meaning = node.get("meaning")
+                    merge_word_details(
+                        details,
+                        w,
+                        phonetic if isinstance(phonetic, str) else "",
+                        meaning if isinstance(meaning, str) else "",
+                    )
+            # Reverse keeps the walk in document order for "first wins"
+            for child in reversed(list(node.values())):
+                if isinstance(child, (dict, list)):
+                    push(child)
+        elif isinstance(node, list):
+            for child in reversed(node):
+                if isinstance(child, (dict, list)):
+                    push(child)
+
+    return details
+
+
+def merge_word_details(details: Dict[str, Tuple[str, str]], word: str, phonetic: str, meaning: str) -> None:
+    """Record (phonetic, meaning) for word, keeping earlier non-empty values."""
+    known = details.get(word)
+    if known is None:
+        details[word] = (phonetic, meaning)
+    elif not (known[0] and known[1]):
+        details[word] = (known[0] or phonetic, known[1] or meaning)
+
+
+def iter_json_word_items_streaming(
+    fp: TextIO,
+    chunk_chars: int = STREAM_CHUNK_CHARS,
+) -> Iterator[Tuple[str, str, str]]:
+    """Yield (word, phonetic, meaning) from a JSON text stream, chunk by chunk.
+
+    Only the current token and one small record per open container are held
+    in memory. An item is emitted when its object closes; phonetic/meaning
+    are "" when absent. Structural errors raise ValueError so callers can
+    fall back the same way they would for json.loads.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    # One entry per open container: captured fields for objects, None for arrays
+    containers: List[Optional[Dict[str, str]]] = []
+    expect_key = False
+    pending_field: Optional[str] = None
+    seen_value = False
+    next_token = _JSON_TOKEN.match
+
+    while True:
+        match = next_token(buf, pos)
+        if match is None or (match.end() == len(buf) and not eof):
+            if eof:
+                if buf[pos:].strip():
+                    raise ValueError(f"Invalid JSON near: {buf[pos:pos + 40]!r}")
+                break
+            chunk = fp.read(chunk_chars)
+            if not chunk:
+                eof = True
+            # Drop consumed text so the buffer stays about one chunk long
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+
+        pos = match.end()
+        kind = match.lastgroup
+        token = match.group(kind)
+
+        if kind == "punct":
+            if token == "{":
+                containers.append({})
+                expect_key = True
+                # A container value after "word" is not a word
+                pending_field = None
+                seen_value = True
+            elif token == "[":
+                containers.append(None)
+                expect_key = False
+                pending_field = None
+                seen_value = True
+            elif token == "}" or token == "]":
+                if not containers:
+                    raise ValueError(f"Unbalanced {token!r} in JSON stream")
+                fields = containers.pop()
+                if (fields is not None) != (token == "}"):
+                    raise ValueError(f"Unbalanced {token!r} in JSON stream")
+                if fields and "word" in fields:
+                    w = normalize_word(fields["word"])
+                    if w is not None:
+                        yield w, fields.get("phonetic", ""), fields.get("meaning", "")
+                expect_key = False
+                pending_field = None
+            elif token == ",":
+                expect_key = bool(containers) and containers[-1] is not None
+                pending_field = None
+            # ":" carries no information for extraction
+        elif kind == "string":
+            if expect_key:
+                pending_field = _CAPTURE_KEY_TOKENS.get(token)
+                if pending_field is None and "\\" in token:
+                    pending_field = _CAPTURE_KEY_TOKENS.get(json.dumps(json.loads(token)))
+                expect_key = False
+            else:
+                if pending_field is not None:
+                    containers[-1][pending_field] = json.loads(token)  # type: ignore[index]
+                    pending_field = None
+                seen_value = True
+        else:
+            if not _JSON_SCALAR.fullmatch(token):
+                raise ValueError(f"Invalid JSON literal: {token[:40]!r}")
+            pending_field = None
+            seen_value = True
+
+    if containers or not seen_value:
+        raise ValueError("Truncated or empty JSON stream")
+
+
+def iter_json_words_streaming(fp: TextIO, chunk_chars: int = STREAM_CHUNK_CHARS) -> Iterator[str]:
+    """Yield normalized "word" values from a JSON text stream, chunk by chunk."""
+    for word, _phonetic, _meaning in iter_json_word_items_streaming(fp, chunk_chars):
+        yield word
+
+
+def extract_words_from_json_file(path: Path, stream: Optional[bool] = None) -> Set[str]:
+    """Read one JSON vocabulary file and return its words.
+
+    - stream=None streams files of STREAM_THRESHOLD_BYTES or more, else loads
+    - Invalid JSON falls back to extract_words_from_text on the raw text
+    - Unreadable files yield an empty set
+    """
+    try:
+        if stream is None:
+            stream = path.stat().st_size >= STREAM_THRESHOLD_BYTES
+        if stream:
+            with path.open("r", encoding="utf-8", errors="ignore") as f:
+                return set(iter_json_words_streaming(f))
+        text = path.read_text(encoding="utf-8", errors="ignore")
+    except ValueError:
+        text = read_text_file(path)
+    except Exception:
+        return set()
+
+    if not text:
+        return set()
+    try:
+        data = json.loads(text)
+    except Exception:
+        return extract_words_from_text(text)
+    return extract_words_from_json_data(data)
+
+
+def extract_word_details_from_json_file(
+    path: Path,
+    stream: Optional[bool] = None,
+    fallback_to_text: bool = True,
+) -> Dict[str, Tuple[str, str]]:
+    """Read one JSON vocabulary file and map its words to (phonetic, meaning).
+
+    Same size-based engine choice and fallbacks as extract_words_from_json_file;
+    words recovered by the free-text fallback have empty details. With
+    fallback_to_text=False, invalid JSON raises ValueError instead.
+    """
+    try:
+        if stream is None:
+            stream = path.stat().st_size >= STREAM_THRESHOLD_BYTES
+        if stream:
+            details: Dict[str, Tuple[str, str]] = {}
+            with path.open("r", encoding="utf-8", errors="ignore") as f:
+                for word, phonetic, meaning in iter_json_word_items_streaming(f):
+                    merge_word_details(details, word, phonetic, meaning)
+            return details
+        text = path.read_text(encoding="utf-8", errors="ignore")
+    except ValueError:
+        text = read_text_file(path)
+    except Exception:
+        return {}
+
+    if not text:
+        return {}
+    try:
+        data = json.loads(text)
+    except Exception:
+        if not fallback_to_text:
+            raise ValueError(f"Invalid JSON: {path}")
+        return {w: ("", "") for w in extract_words_from_text(text)}
+    return extract_word_details_from_json_data(data)
+
+
+def read_text_file(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8", errors="ignore")
+    except Exception:
+        return ""
+
+
+def file_sha1(path: Path, chunk_bytes: int = 1024 * 1024) -> str:
+    """Hex sha1 of a file, read in chunks so large files stay out of memory."""
+    digest = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
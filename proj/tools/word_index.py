@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Compact word -> files inverted index emitted alongside words.csv.
+
+scan_words.py writes `words.idx` next to `words.csv`. Lookups binary-search the
+memory-mapped index, so answering "which files contain X?" touches a handful
+of pages instead of re-splitting every CSV row.
+
+File layout (all integers little-endian):
+
+  header   : magic b"WIDX", version u16, reserved u16,
+             n_files u32, n_words u32, n_postings u32,
+             files_off u32, words_off u32, postings_off u32, strings_off u32
+  files    : n_files  x (name_off u32, name_len u32)
+  words    : n_words  x (word_off u32, word_len u32, postings_start u32, postings_count u32)
+             sorted by the UTF-8 bytes of the word
+  postings : n_postings x file_id u32 (ascending within each word)
+  strings  : UTF-8 pool for file names and words (offsets relative to strings_off)
+
+File names are POSIX paths relative to the scanned words directory.
+
+Usage:
+  python3 word_index.py apple banana
+  python3 word_index.py --batch new-words.txt        # one word per line, '-' for stdin
+  python3 word_index.py --index /path/to/words.idx --json cat
+
+Exit status is 0 when every word was found and 3 when some were not, so the
+CLI can be used directly as a "does any file already contain X?" check.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+MAGIC = b"WIDX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIIIII")
+FILE_ENTRY = struct.Struct("<II")
+WORD_ENTRY = struct.Struct("<IIII")
+POSTING = struct.Struct("<I")
+
+
+def write_word_index(index_path: Path, file_to_words: Mapping[str, Iterable[str]]) -> None:
+    """Write the inverted index for {relative file name: words} atomically.
+
+    File ids follow the iteration order of file_to_words, so pass an ordered
+    mapping (scan_words.py uses the same order as the CSV rows).
+    """
+    file_names = list(file_to_words.keys())
+    postings_by_word: Dict[str, List[int]] = {}
+    for file_id, name in enumerate(file_names):
+        for word in file_to_words[name]:
+            postings_by_word.setdefault(word, []).append(file_id)
+
+    words_sorted = sorted(postings_by_word, key=lambda w: w.encode("utf-8"))
+
+    strings = bytearray()
+    files_table = bytearray()
+    for name in file_names:
+        raw = name.encode("utf-8")
+        files_table += FILE_ENTRY.pack(len(strings), len(raw))
+        strings += raw
+
+    words_table = bytearray()
+    postings = bytearray()
+    n_postings = 0
+    for word in words_sorted:
+        raw = word.encode("utf-8")
+        ids = sorted(set(postings_by_word[word]))
+        words_table += WORD_ENTRY.pack(len(strings), len(raw), n_postings, len(ids))
+        strings += raw
+        for file_id in ids:
+            postings += POSTING.pack(file_id)
+        n_postings += len(ids)
+
+    files_off = HEADER.size
+    words_off = files_off + len(files_table)
+    postings_off = words_off + len(words_table)
+    strings_off = postings_off + len(postings)
+    header = HEADER.pack(
+        MAGIC, VERSION, 0,
+        len(file_names), len(words_sorted), n_postings,
+        files_off, words_off, postings_off, strings_off,
+    )
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(header)
+        f.write(files_table)
+        f.write(words_table)
+        f.write(postings)
+        f.write(strings)
+    os.replace(tmp_path, index_path)
+
+
+class WordIndex:
+    """Read-only, memory-mapped view of a words.idx file.
+
+    Usage:
+        with WordIndex(Path("words.idx")) as idx:
+            idx.lookup("apple")          # -> ['daily-phonics/day21.json', ...]
+            idx.lookup_many(["a", "b"])  # -> {'a': [...], 'b': [...]}
+    """
+
+    def __init__(self, index_path: Path):
+        self.path = index_path
+        self._file = index_path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            self._file.close()
+            raise ValueError(f"Empty index file: {index_path}")
+
+        (magic, version, _reserved, self.n_files, self.n_words, self.n_postings,
+         self._files_off, self._words_off, self._postings_off, self._strings_off) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a words.idx v{VERSION} file: {index_path}")
+        self._file_names: Dict[int, str] = {}
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "WordIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _string(self, off: int, length: int) -> bytes:
+        start = self._strings_off + off
+        return self._mm[start:start + length]
+
+    def file_name(self, file_id: int) -> str:
+        name = self._file_names.get(file_id)
+        if name is None:
+            off, length = FILE_ENTRY.unpack_from(self._mm, self._files_off + file_id * FILE_ENTRY.size)
+            name = self._string(off, length).decode("utf-8")
+            self._file_names[file_id] = name
+        return name
+
+    def _find(self, key: bytes) -> Optional[int]:
+        lo, hi = 0, self.n_words
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off, length, _, _ = WORD_ENTRY.unpack_from(self._mm, self._words_off + mid * WORD_ENTRY.size)
+            probe = self._string(off, length)
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def lookup(self, word: str) -> List[str]:
+        """Files containing the word (case-insensitive), in CSV row order."""
+        slot = self._find(word.strip().lower().encode("utf-8"))
+        if slot is None:
+            return []
+        _, _, start, count = WORD_ENTRY.unpack_from(self._mm, self._words_off + slot * WORD_ENTRY.size)
+        base = self._postings_off + start * POSTING.size
+        return [self.file_name(POSTING.unpack_from(self._mm, base + i * POSTING.size)[0]) for i in range(count)]
+
+    def lookup_many(self, words: Iterable[str]) -> Dict[str, List[str]]:
+        """Batch lookup; duplicate query words are answered once."""
+        results: Dict[str, List[str]] = {}
+        for word in words:
+            if word not in results:
+                results[word] = self.lookup(word)
+        return results
+
+    def __contains__(self, word: str) -> bool:
+        return self._find(word.strip().lower().encode("utf-8")) is not None
+
+
+def read_batch_words(source: str) -> List[str]:
+    stream = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        return [line.strip() for line in stream if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    default_index = (script_dir.parent / "words" / "words.idx").resolve()
+
+    parser = argparse.ArgumentParser(description="Look up which word files contain given words")
+    parser.add_argument("words", nargs="*", help="Words to look up")
+    parser.add_argument("--index", type=Path, default=default_index, help="Path to words.idx (default: proj/words/words.idx)")
+    parser.add_argument("--batch", type=str, default=None, help="File with one word per line ('-' for stdin)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    query: List[str] = list(args.words)
+    if args.batch:
+        query.extend(read_batch_words(args.batch))
+    if not query:
+        parser.error("no words given (pass words or --batch)")
+
+    if not args.index.exists():
+        print(f"[ERROR] Index not found: {args.index} (run scan_words.py first)")
+        return 1
+
+    with WordIndex(args.index) as idx:
+        results = idx.lookup_many(query)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for word, files in results.items():
+            print(f"{word}\t{' '.join(files) if files else '-'}")
+
+    missing: Set[str] = {w for w, files in results.items() if not files}
+    return 0 if not missing else 3
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())